@@ -0,0 +1,281 @@
+"""Admission control: eşzamanlılık sınırları, rate limit ve yük atma.
+
+Aşırı yükte istekler uvicorn içinde birikip istemci zaman aşımına uğrayana kadar
+beklemesin diye her istek route'una başlamadan önce buradan geçer:
+
+- Toplam ``max_in_flight`` slot vardır. Öncelik sınıfları bu slotların ancak bir
+  kısmını kullanabilir (``CLASS_SHARES``), böylece ``/login`` gibi pahalı route'lar
+  doluyken bile ``/health`` ve ``GET /events/`` için yer kalır.
+- Route bazında eşzamanlılık sınırı (``RoutePolicy.max_concurrency``) tanımlanabilir.
+- Slot yoksa istek öncelik sırasıyla bekler; sınıfın kuyruk süresi (``queue_timeouts``)
+  dolarsa beklemeden ``503`` + ``Retry-After`` döner.
+- Kullanıcı (JWT ``sub``) ya da IP bazında token bucket rate limit aşıldığında ``429``
+  + ``Retry-After`` döner.
+
+Uzun süre açık kalan stream'ler (SSE) slot saymaz (``counted=False``).
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+from starlette.routing import Match
+
+HIGH = 0
+NORMAL = 1
+LOW = 2
+PRIORITY_NAMES = {HIGH: "high", NORMAL: "normal", LOW: "low"}
+
+# Sınıfın kullanabileceği en fazla slot oranı
+CLASS_SHARES = {HIGH: 1.0, NORMAL: 0.8, LOW: 0.5}
+
+
+class RoutePolicy(NamedTuple):
+    priority: int = NORMAL
+    max_concurrency: Optional[int] = None
+    # Uzun süreli stream'ler slot tutmaz; sadece rate limit uygulanır
+    counted: bool = True
+    # Route'a özel rate limit (saniyede istek, anahtar başına); 0 ise kapalı
+    rate: float = 0.0
+    burst: int = 0
+
+
+class Rejection(NamedTuple):
+    status: int
+    retry_after: float
+    detail: str
+
+
+DEFAULT_POLICY = RoutePolicy()
+BUSY = "Sunucu yoğun, lütfen tekrar deneyin"
+TOO_MANY = "Çok fazla istek, lütfen daha sonra tekrar deneyin"
+
+
+class RateLimiter:
+    """Anahtar başına token bucket; en az kullanılan anahtarlar ``max_keys`` aşılınca atılır."""
+
+    def __init__(self, rate: float, burst: int = 0, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate * 2))
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def acquire(self, key: str, now: float) -> float:
+        """Token varsa 0, yoksa bir sonraki token'a kalan süreyi (saniye) döndürür."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+
+class AdmissionController:
+    """Slot sayaçları, bekleme kuyruğu ve rate limit'ler; sadece event loop thread'inden kullanılır."""
+
+    def __init__(
+        self,
+        policies: Dict[str, RoutePolicy],
+        max_in_flight: int = 256,
+        queue_timeouts: Optional[Dict[int, float]] = None,
+        max_waiting: int = 1024,
+        rate: float = 0.0,
+        burst: int = 0,
+        enabled: bool = True,
+    ):
+        self.policies = policies
+        self.max_in_flight = max_in_flight
+        self.queue_timeouts = queue_timeouts or {HIGH: 1.0, NORMAL: 0.5, LOW: 0.1}
+        self.max_waiting = max_waiting
+        self.enabled = enabled
+        self.rate_limiter = RateLimiter(rate, burst) if rate > 0 else None
+        self.route_limiters = {
+            label: RateLimiter(policy.rate, policy.burst) for label, policy in policies.items() if policy.rate > 0
+        }
+        self.in_flight = 0
+        self._route_in_flight: Dict[str, int] = {}
+        self._waiters: List[Tuple[int, int, asyncio.Future, str, RoutePolicy]] = []
+        self._waiting = {priority: 0 for priority in PRIORITY_NAMES}
+        self._sequence = itertools.count()
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.rate_limited = 0
+
+    def needs_key(self, label: str) -> bool:
+        return self.rate_limiter is not None or label in self.route_limiters
+
+    def resolve(self, scope) -> Tuple[str, RoutePolicy, Any]:
+        """İsteği uygulamanın route'larıyla eşleştirir (örn. ``GET /events/{event_id}``)."""
+        app = scope.get("app")
+        for route in getattr(getattr(app, "router", None), "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                label = f"{scope['method']} {route.path}"
+                return label, self.policies.get(label, DEFAULT_POLICY), route
+        return "unmatched", DEFAULT_POLICY, None
+
+    def _can_start(self, label: str, policy: RoutePolicy) -> bool:
+        if self.in_flight >= self.max_in_flight * CLASS_SHARES[policy.priority]:
+            return False
+        return policy.max_concurrency is None or self._route_in_flight.get(label, 0) < policy.max_concurrency
+
+    def _waiting_ahead(self, priority: int) -> bool:
+        # Aynı ya da daha yüksek öncelikte, şu an başlayabilecek bir bekleyen varsa sıraya girilir.
+        # Route sınırına takılıp bekleyenler (örn. dolu /login) diğer route'ları bekletmez.
+        if not any(self._waiting[other] for other in PRIORITY_NAMES if other <= priority):
+            return False
+        return any(
+            waiter_priority <= priority and not future.done() and self._can_start(label, policy)
+            for waiter_priority, _, future, label, policy in self._waiters
+        )
+
+    def _start(self, label: str) -> None:
+        self.in_flight += 1
+        self._route_in_flight[label] = self._route_in_flight.get(label, 0) + 1
+        self.admitted += 1
+
+    def _rate_limit(self, label: str, key: Optional[str], now: float) -> Optional[Rejection]:
+        if key is None:
+            return None
+        waits = []
+        if self.rate_limiter is not None:
+            waits.append(self.rate_limiter.acquire(key, now))
+        limiter = self.route_limiters.get(label)
+        if limiter is not None:
+            waits.append(limiter.acquire(key, now))
+        wait = max(waits, default=0.0)
+        if wait > 0:
+            self.rate_limited += 1
+            return Rejection(429, wait, TOO_MANY)
+        return None
+
+    async def admit(self, label: str, policy: RoutePolicy, key: Optional[str] = None) -> Optional[Rejection]:
+        """İsteği başlatır ya da sırasını bekletir; reddedilirse nedenini döndürür."""
+        rejection = self._rate_limit(label, key, time.monotonic())
+        if rejection is not None or not policy.counted:
+            return rejection
+
+        if self._can_start(label, policy) and not self._waiting_ahead(policy.priority):
+            self._start(label)
+            return None
+
+        timeout = self.queue_timeouts.get(policy.priority, 0)
+        if timeout <= 0 or len(self._waiters) >= self.max_waiting:
+            self.shed += 1
+            return Rejection(503, 1, BUSY)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (policy.priority, next(self._sequence), future, label, policy))
+        self._waiting[policy.priority] += 1
+        self.queued += 1
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._waiting[policy.priority] -= 1
+            self.shed += 1
+            return Rejection(503, max(1, math.ceil(timeout)), BUSY)
+        except asyncio.CancelledError:
+            # İstemci beklerken ayrıldı; slot tam o anda verildiyse geri bırakılır
+            if future.done() and not future.cancelled():
+                self.release(label, policy)
+            else:
+                self._waiting[policy.priority] -= 1
+            raise
+        return None
+
+    def release(self, label: str, policy: RoutePolicy) -> None:
+        self.in_flight -= 1
+        self._route_in_flight[label] -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        # Boşalan slot(lar) öncelik ve geliş sırasıyla bekleyenlere verilir
+        blocked = []
+        while self._waiters:
+            entry = heapq.heappop(self._waiters)
+            priority, _, future, label, policy = entry
+            if future.done():
+                continue
+            if not self._can_start(label, policy):
+                blocked.append(entry)
+                # Toplam slotlar dolduysa daha düşük öncelikliler de başlayamaz
+                if self.in_flight >= self.max_in_flight:
+                    break
+                continue
+            self._start(label)
+            self._waiting[priority] -= 1
+            future.set_result(None)
+        for entry in blocked:
+            heapq.heappush(self._waiters, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "waiting": {PRIORITY_NAMES[priority]: count for priority, count in self._waiting.items()},
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class AdmissionMiddleware:
+    """Saf ASGI middleware; reddedilen istekler route'a hiç ulaşmaz.
+
+    ``key_func(scope)`` rate limit anahtarını döndürür (örn. ``user:<sub>`` ya da ``ip:<adres>``);
+    sadece rate limit açıkken çağrılır.
+    """
+
+    def __init__(self, app, controller: AdmissionController, key_func: Callable[[Dict[str, Any]], str]):
+        self.app = app
+        self.controller = controller
+        self.key_func = key_func
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller
+        if scope["type"] != "http" or not controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        label, policy, route = controller.resolve(scope)
+        if route is not None:
+            # Reddedilen istekler de metriklerde route şablonuyla görünsün
+            scope["route"] = route
+        key = self.key_func(scope) if controller.needs_key(label) else None
+        rejection = await controller.admit(label, policy, key)
+        if rejection is not None:
+            await self._reject(send, rejection)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if policy.counted:
+                controller.release(label, policy)
+
+    @staticmethod
+    async def _reject(send, rejection: Rejection) -> None:
+        body = orjson.dumps({"detail": rejection.detail})
+        await send({
+            "type": "http.response.start",
+            "status": rejection.status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(rejection.retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
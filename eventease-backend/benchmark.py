@@ -0,0 +1,382 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import httpx
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+from pymongo.errors import PyMongoError
+from pymongo.mongo_client import MongoClient
+
+import main
+from repository import MongoRepository
+
+# Uygulamayı uvicorn olmadan, ASGI üzerinden süreç içinde çalıştıran benchmark
+BASE_URL = "http://benchmark"
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+ROUNDS = 20
+TOKEN_ITERATIONS = 20000
+LOGIN_STORM_SIZE = 64
+PROBE_INTERVAL = 0.01
+FLASH_JOIN_USERS = 500
+FLASH_JOIN_CAPACITY = 100
+WRITE_BEHIND_JOINS = 5000
+WRITE_BEHIND_DATABASE = "eventease_benchmark"
+SERIALIZATION_EVENTS = 10000
+SERIALIZATION_ROUNDS = 5
+COLD_START_RUNS = 3
+OVERLOAD_EVENTS = 3000
+OVERLOAD_SEARCHES = 400
+OVERLOAD_LOGINS = 64
+OVERLOAD_SLOTS = 16
+# Alt süreçte uygulamayı import edip lifespan'i çalıştırır; ölçümler stderr'e yazılır
+COLD_START_SCRIPT = """
+import asyncio, json, sys, main
+async def run():
+    async with main.lifespan(main.app):
+        print(json.dumps(main.startup_stats), file=sys.stderr)
+asyncio.run(run())
+"""
+
+
+def make_token(user_id="bench-user"):
+    token_data = {"sub": user_id, "email": f"{user_id}@bench.local", "name": user_id, "role": "USER"}
+    return jwt.encode(token_data, main.SECRET_KEY, algorithm=main.ALGORITHM)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, samples):
+    print(
+        f"{name:<32} n={len(samples):<5} "
+        f"p50={percentile(samples, 50) * 1000:7.2f}ms "
+        f"p95={percentile(samples, 95) * 1000:7.2f}ms "
+        f"p99={percentile(samples, 99) * 1000:7.2f}ms "
+        f"mean={statistics.mean(samples) * 1000:7.2f}ms"
+    )
+
+
+@asynccontextmanager
+async def database():
+    # Lifespan'deki gibi MongoDB'ye bağlanmayı dener; erişilemezse bellek içi store kullanılır
+    await main.mongo.start()
+    print(f"Backend: {'MongoDB' if isinstance(main.repo, MongoRepository) else 'mock'}")
+    try:
+        yield
+    finally:
+        await main.mongo.close()
+
+
+async def timed_get(client, path, samples):
+    start = time.perf_counter()
+    response = await client.get(path)
+    samples.append(time.perf_counter() - start)
+    return response
+
+
+async def bench_concurrency(client, event_id):
+    # Paralel istek sayısı arttıkça p99'un sabit kalması, DB çağrılarının loop'u bloklamadığını gösterir
+    for level in CONCURRENCY_LEVELS:
+        event_samples = []
+        health_samples = []
+        for _ in range(ROUNDS):
+            await asyncio.gather(
+                timed_get(client, "/health", health_samples),
+                *(timed_get(client, f"/events/{event_id}", event_samples) for _ in range(level)),
+            )
+        report(f"GET /events/{{id}} c={level}", event_samples)
+        report(f"GET /health c={level}", health_samples)
+
+
+def bench_token_cache():
+    # get_current_user maliyeti: her istekte jwt.decode vs. doğrulanmış claim cache'i
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=make_token())
+    for enabled in (False, True):
+        main.token_cache.enabled = enabled
+        main.token_cache.clear()
+        samples = []
+        for _ in range(TOKEN_ITERATIONS):
+            start = time.perf_counter()
+            main.get_current_user(credentials)
+            samples.append(time.perf_counter() - start)
+        report(f"get_current_user cache={'on' if enabled else 'off'}", samples)
+    print(f"Token cache: {main.token_cache.stats()}")
+
+
+async def run_concurrency():
+    transport = httpx.ASGITransport(app=main.app)
+    headers = {"Authorization": f"Bearer {make_token()}"}
+    async with database(), httpx.AsyncClient(transport=transport, base_url=BASE_URL, headers=headers) as client:
+        response = await client.post("/events/", json={
+            "title": "Benchmark Event",
+            "description": "Benchmark",
+            "date": "2030-01-01T10:00:00",
+            "location": "Benchmark",
+        })
+        event_id = response.json()["id"]
+        # GET /events/{id} normalde EventCache'ten döner; ölçülen yol thread havuzundaki DB çağrısı olsun
+        max_entries = main.event_cache.max_entries
+        main.event_cache.max_entries = 0
+        main.event_cache.clear()
+        try:
+            await bench_concurrency(client, event_id)
+        finally:
+            main.event_cache.max_entries = max_entries
+        await client.delete(f"/events/{event_id}")
+
+
+async def run_login_storm():
+    # Login fırtınası sırasında GET /events/ gecikmesi; bcrypt loop'u bloklamamalı
+    transport = httpx.ASGITransport(app=main.app)
+    async with database(), httpx.AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        credentials = {"email": "storm@bench.local", "password": "benchmark-password"}
+        await client.post("/users/", json={"name": "Storm", **credentials})
+
+        idle_samples = []
+        for _ in range(ROUNDS):
+            await timed_get(client, "/events/", idle_samples)
+        report("GET /events/ idle", idle_samples)
+
+        storm_samples = []
+        logins = [asyncio.create_task(client.post("/login", json=credentials)) for _ in range(LOGIN_STORM_SIZE)]
+        while not all(task.done() for task in logins):
+            await timed_get(client, "/events/", storm_samples)
+            # Bellek içi backend'de istek hiç askıya alınmayabilir; login task'larına sıra ver
+            await asyncio.sleep(PROBE_INTERVAL)
+        report(f"GET /events/ login storm={LOGIN_STORM_SIZE}", storm_samples)
+
+        statuses = [task.result().status_code for task in logins]
+        print(f"Login sonuçları: {dict((code, statuses.count(code)) for code in sorted(set(statuses)))}")
+        print(f"Password pool: {main.password_hasher.stats()}")
+
+
+async def run_flash_join():
+    # Kontenjanı sınırlı bir etkinliğe aynı anda katılımın gecikmesi; her kullanıcı iki kez dener.
+    # Kontenjan/tekrar doğruluğu tests/test_flash_join.py'de tüm repository'ler için test edilir.
+    transport = httpx.ASGITransport(app=main.app)
+    async with database(), httpx.AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        organizer = {"Authorization": f"Bearer {make_token('flash-organizer')}"}
+        response = await client.post("/events/", headers=organizer, json={
+            "title": "Flash Join",
+            "description": "Benchmark",
+            "date": "2030-01-01T10:00:00",
+            "location": "Benchmark",
+            "max_attendees": FLASH_JOIN_CAPACITY,
+        })
+        event_id = response.json()["id"]
+
+        async def join(user_id):
+            headers = {"Authorization": f"Bearer {make_token(user_id)}"}
+            start = time.perf_counter()
+            response = await client.post(f"/events/{event_id}/join", headers=headers)
+            samples.append(time.perf_counter() - start)
+            return user_id, response.status_code
+
+        samples = []
+        users = [f"flash-user-{i}" for i in range(FLASH_JOIN_USERS)]
+        results = await asyncio.gather(*(join(user_id) for user_id in users * 2))
+        report(f"POST /events/{{id}}/join x{len(results)}", samples)
+
+        joined = [user_id for user_id, code in results if code == 200]
+        attendee_count = (await client.get(f"/events/{event_id}")).json()["attendee_count"]
+        print(f"Kabul edilen: {len(joined)}, attendee_count: {attendee_count}, kontenjan: {FLASH_JOIN_CAPACITY}")
+        await client.delete(f"/events/{event_id}", headers=organizer)
+
+
+async def run_write_behind():
+    # Aynı etkinliğe eşzamanlı katılım: istek başına insert_one vs. insert_many batch'leri (gerçek mongod gerekir)
+    client = MongoClient(main.DATABASE_URL or "mongodb://localhost:27017", serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        print(f"MongoDB erişilemiyor, atlandı: {e}")
+        return
+    db = client[WRITE_BEHIND_DATABASE]
+    try:
+        for label, batch_size in (("insert_one", 0), ("write-behind", 500)):
+            client.drop_database(WRITE_BEHIND_DATABASE)
+            repo = MongoRepository(db, attendance_batch_size=batch_size)
+            await repo.ensure_indexes()
+            now = datetime.now()
+            event_id = await repo.insert_event({
+                "title": "Write Behind", "description": "Benchmark", "date": now, "location": "Benchmark",
+                "max_attendees": None, "is_public": True, "creator_id": "bench", "attendee_count": 0,
+                "created_at": now, "updated_at": now,
+            })
+
+            async def join(user_id):
+                start = time.perf_counter()
+                result = await repo.join_event({"user_id": user_id, "event_id": event_id, "joined_at": datetime.now()})
+                samples.append(time.perf_counter() - start)
+                return result
+
+            samples = []
+            # Her kullanıcının %10'u ikinci kez dener; tekrarlar kayıt bazında reddedilmeli
+            users = [f"wb-user-{i}" for i in range(WRITE_BEHIND_JOINS)]
+            attempts = users + users[::10]
+            start = time.perf_counter()
+            results = await asyncio.gather(*(join(user_id) for user_id in attempts))
+            elapsed = time.perf_counter() - start
+            await repo.drain()
+            report(f"{label:<12} join x{len(attempts)}", samples)
+            attendee_count = (await repo.get_event(event_id))["attendee_count"]
+            stored = db.attendances.count_documents({"event_id": event_id})
+            print(
+                f"{label:<12} {len(attempts) / elapsed:9.0f} join/s  sonuçlar={dict(Counter(results))} "
+                f"attendee_count={attendee_count} kayıt={stored}"
+            )
+            if repo.attendance_writer is not None:
+                print(f"{label:<12} {repo.attendance_writer.stats()}")
+            repo.close()
+            if attendee_count != WRITE_BEHIND_JOINS or stored != WRITE_BEHIND_JOINS:
+                sys.exit("HATA: attendee_count ya da katılım kayıtları tutarsız")
+    finally:
+        client.drop_database(WRITE_BEHIND_DATABASE)
+        client.close()
+
+
+async def run_overload():
+    # Kapasitenin çok üstünde arama + login yükü altında ucuz route'ların gecikmesi:
+    # admission control kapalıyken her şey kabul edilir, açıkken fazlası hemen 503 alır
+    transport = httpx.ASGITransport(app=main.app)
+    async with database(), httpx.AsyncClient(transport=transport, base_url=BASE_URL) as client:
+        docs = make_event_docs(OVERLOAD_EVENTS)
+        for doc in docs:
+            doc.pop("id")
+        event_ids = await main.repo.insert_events(docs)
+        credentials = {"email": "overload@bench.local", "password": "benchmark-password"}
+        await client.post("/users/", json={"name": "Overload", **credentials})
+        enabled, max_in_flight = main.admission.enabled, main.admission.max_in_flight
+        try:
+            for label, admission_enabled in (("admission=off", False), ("admission=on", True)):
+                main.admission.enabled = admission_enabled
+                main.admission.max_in_flight = OVERLOAD_SLOTS
+                main.event_cache.clear()
+
+                route_samples = {"GET /events/search": [], "POST /login": []}
+
+                async def call(route, request):
+                    started = time.perf_counter()
+                    response = await request
+                    route_samples[route].append(time.perf_counter() - started)
+                    return route, response.status_code
+
+                start = time.perf_counter()
+                load = [
+                    *(asyncio.create_task(call("GET /events/search", client.get("/events/search", params={"q": "etkinlik"})))
+                      for _ in range(OVERLOAD_SEARCHES)),
+                    *(asyncio.create_task(call("POST /login", client.post("/login", json=credentials)))
+                      for _ in range(OVERLOAD_LOGINS)),
+                ]
+                probe_samples = []
+                probe_statuses = []
+                while not all(task.done() for task in load):
+                    for path in ("/health", "/events/?limit=10"):
+                        probe_statuses.append((await timed_get(client, path, probe_samples)).status_code)
+                    await asyncio.sleep(PROBE_INTERVAL)
+                elapsed = time.perf_counter() - start
+                report(f"probe (/health, /events/) {label}", probe_samples)
+                results = Counter(await asyncio.gather(*load))
+                for route, samples in route_samples.items():
+                    report(f"{route} {label}", samples)
+                    print(f"{label:<14} {route:<20} {dict(sorted((code, n) for (r, code), n in results.items() if r == route))}")
+                print(f"{label:<14} probe durumları={dict(Counter(probe_statuses))} süre={elapsed:.2f}s")
+            print(f"Admission: {main.admission.stats()}")
+            if any(code != 200 for code in probe_statuses):
+                sys.exit("HATA: admission açıkken ucuz route'lar reddedildi")
+        finally:
+            main.admission.enabled, main.admission.max_in_flight = enabled, max_in_flight
+            for event_id in event_ids:
+                await main.repo.delete_event(event_id)
+
+
+def make_event_docs(count):
+    now = datetime.now()
+    return [
+        {
+            "id": f"{i:024x}",
+            "title": f"Etkinlik {i}",
+            "description": "Benchmark etkinliği",
+            "date": now + timedelta(hours=i),
+            "location": "İstanbul",
+            "max_attendees": 100,
+            "is_public": True,
+            "creator_id": "bench-user",
+            "attendee_count": i % 100,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def bench_serialization():
+    # 10k etkinliğin JSON'a çevrilmesi: Pydantic + response_model yolu vs. wire dönüştürücü + orjson
+    docs = make_event_docs(SERIALIZATION_EVENTS)
+    paths = {
+        "pydantic + jsonable_encoder": lambda: json.dumps(jsonable_encoder([main.Event(**doc) for doc in docs])),
+        "wire + orjson": lambda: orjson.dumps([main.event_to_wire(doc) for doc in docs]),
+    }
+    for name, serialize in paths.items():
+        samples = []
+        for _ in range(SERIALIZATION_ROUNDS):
+            start = time.perf_counter()
+            serialize()
+            samples.append(time.perf_counter() - start)
+        print(f"{name:<32} {SERIALIZATION_EVENTS / statistics.mean(samples):12.0f} etkinlik/s")
+
+
+def bench_cold_start():
+    # Yeni bir süreçte import + lifespan açılışı; MongoDB yavaşsa açılış en fazla server selection timeout kadar uzar
+    for _ in range(COLD_START_RUNS):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT],
+            capture_output=True, text=True, env={**os.environ, "LOG_LEVEL": "ERROR"},
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            sys.exit(f"HATA: uygulama açılamadı\n{result.stderr}")
+        stats = json.loads(result.stderr.strip().splitlines()[-1])
+        print(
+            f"süreç={wall_ms:8.1f}ms import={stats['import_ms']:8.1f}ms "
+            f"db_connect={stats['db_connect_ms']:8.1f}ms ready={stats['ready_ms']:8.1f}ms"
+        )
+
+
+BENCHMARKS = {
+    "concurrency": lambda: asyncio.run(run_concurrency()),
+    "token-cache": bench_token_cache,
+    "login-storm": lambda: asyncio.run(run_login_storm()),
+    "flash-join": lambda: asyncio.run(run_flash_join()),
+    "write-behind": lambda: asyncio.run(run_write_behind()),
+    "overload": lambda: asyncio.run(run_overload()),
+    "serialization": bench_serialization,
+    "cold-start": bench_cold_start,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EventEase benchmark")
+    parser.add_argument("benchmarks", nargs="*", help=f"çalıştırılacak benchmark'lar: {', '.join(BENCHMARKS)} (varsayılan: hepsi)")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"bilinmeyen benchmark: {', '.join(sorted(unknown))}")
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"== {name}")
+        BENCHMARKS[name]()
@@ -0,0 +1,160 @@
+"""MongoDB bağlantısının açılması ve arka planda sağlık takibi.
+
+Bağlantı import sırasında değil, uygulamanın lifespan'inde açılır; açılış en fazla
+``server_selection_timeout_ms`` kadar bekler. MongoDB o anda erişilemezse uygulama
+bellek içi store ile açılır ve ``health_interval`` saniyede bir yeniden denenir.
+MongoDB ilk kez erişilebilir olduğunda ``on_available`` çağrılır ve route'lar
+MongoDB repository'sine geçer. Geçişten sonra yaşanan kesintilerde bellek içi
+store'a dönülmez; pymongo yeniden bağlanır, durum ``/health``'te görünür.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo.mongo_client import MongoClient
+from pymongo.server_api import ServerApi
+
+from db_metrics import DbCommandListener, PoolStats
+from repository import MongoRepository
+
+logger = logging.getLogger("eventease.db")
+
+CONNECTING = "connecting"
+UP = "up"
+DOWN = "down"
+
+
+class MongoConnection:
+    def __init__(
+        self,
+        url: Optional[str],
+        on_available: Callable[[MongoRepository], Awaitable[None]],
+        database: str = "eventease",
+        max_pool_size: int = 32,
+        min_pool_size: int = 0,
+        connect_timeout_ms: int = 3000,
+        server_selection_timeout_ms: int = 3000,
+        socket_timeout_ms: int = 10000,
+        health_interval: float = 10.0,
+        repo_options: Optional[Dict[str, Any]] = None,
+    ):
+        self.url = url
+        self.on_available = on_available
+        self.database = database
+        self.max_pool_size = max_pool_size
+        self.client_options = {
+            "maxPoolSize": max_pool_size,
+            "minPoolSize": min_pool_size,
+            "connectTimeoutMS": connect_timeout_ms,
+            "serverSelectionTimeoutMS": server_selection_timeout_ms,
+            "socketTimeoutMS": socket_timeout_ms,
+        }
+        self.health_interval = health_interval
+        # MongoRepository'ye aktarılan ayarlar (örn. write-behind)
+        self.repo_options = repo_options or {}
+        self.pool_stats = PoolStats()
+        self.client: Optional[MongoClient] = None
+        self.repo: Optional[MongoRepository] = None
+        self.status = CONNECTING
+        self.last_check: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.ping_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self._monitor_task: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> bool:
+        return self.repo is not None and self.status == UP
+
+    def _connect(self) -> None:
+        # mongodb+srv adreslerinde DNS çözümlemesi constructor'da yapılır; bu yüzden thread'de çalışır
+        if self.client is None:
+            self.client = MongoClient(
+                self.url,
+                server_api=ServerApi("1"),
+                event_listeners=[DbCommandListener(), self.pool_stats],
+                **self.client_options,
+            )
+        self.client.admin.command("ping")
+
+    async def check(self) -> bool:
+        """Bir ping atar; MongoDB ilk kez erişilebilir olduğunda repository'yi devreye alır."""
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._connect)
+        except Exception as e:
+            if self.status != DOWN:
+                logger.warning("MongoDB erişilemiyor", extra={"error": str(e)})
+            self.status = DOWN
+            self.last_error = str(e)
+            self.consecutive_failures += 1
+            return False
+        finally:
+            self.last_check = datetime.now()
+
+        self.ping_ms = round((time.perf_counter() - started) * 1000, 2)
+        if self.status != UP:
+            logger.info("MongoDB bağlantısı başarılı", extra={"ping_ms": self.ping_ms})
+        self.status = UP
+        self.consecutive_failures = 0
+        if self.repo is None:
+            repo = MongoRepository(self.client[self.database], max_workers=self.max_pool_size, **self.repo_options)
+            try:
+                await self.on_available(repo)
+            except Exception:
+                repo.close()
+                raise
+            self.repo = repo
+        return True
+
+    async def _monitor(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check()
+            except Exception:
+                # on_available içindeki hatalar (örn. indeks oluşturma) izleme döngüsünü durdurmamalı
+                logger.exception("MongoDB sağlık kontrolü başarısız")
+
+    async def start(self) -> bool:
+        """İlk bağlantı denemesini yapar ve arka plan sağlık kontrolünü başlatır."""
+        try:
+            connected = await self.check()
+        except Exception:
+            logger.exception("MongoDB repository devreye alınamadı")
+            connected = False
+        self._monitor_task = asyncio.create_task(self._monitor())
+        return connected
+
+    async def close(self) -> None:
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            try:
+                await self._monitor_task
+            except asyncio.CancelledError:
+                pass
+            self._monitor_task = None
+        if self.repo is not None:
+            await self.repo.drain()
+            self.repo.close()
+            self.repo = None
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+        self.status = CONNECTING
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "last_check": self.last_check,
+            "last_error": self.last_error if self.status != UP else None,
+            "ping_ms": self.ping_ms,
+            "consecutive_failures": self.consecutive_failures,
+            "pool": {"max_size": self.max_pool_size, **self.pool_stats.snapshot()},
+            "attendance_writes": (
+                self.repo.attendance_writer.stats()
+                if self.repo is not None and self.repo.attendance_writer is not None else None
+            ),
+        }
@@ -0,0 +1,207 @@
+"""İstek bazlı MongoDB komut sayımı ve sorgu bütçesi kontrolü.
+
+pymongo'nun ``CommandListener``'ı her komutu, o komutu çalıştıran isteğe
+(contextvar üzerinden) bağlar. Repository thread havuzuna geçerken context'i
+kopyaladığı için komutlar thread'lerde de doğru isteğe yazılır.
+
+``DbMetricsMiddleware`` her yanıta ``X-DB-Queries`` ve ``X-DB-Time`` (ms)
+header'larını ekler, route bazında toplam/en yavaş komut istatistiği tutar
+ve route için tanımlı sorgu bütçesi aşıldığında log yazar ya da hata fırlatır.
+"""
+import contextvars
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from pymongo import monitoring
+
+logger = logging.getLogger("eventease.db")
+
+# Route handler'ı bu isteğin bütçesini scope'a yazarak değiştirebilir (örn. stream edilen
+# yanıtlarda batch sayısına göre); ``None`` bu istek için bütçe kontrolünü kapatır
+BUDGET_SCOPE_KEY = "eventease.db_query_budget"
+
+
+class QueryBudgetExceeded(Exception):
+    """Bir route beklenenden fazla MongoDB komutu çalıştırdı."""
+
+
+class RequestDbStats:
+    __slots__ = ("queries", "total_ms", "slowest_ms", "slowest_command")
+
+    def __init__(self):
+        self.queries = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_command: Optional[str] = None
+
+    def record(self, command_name: str, duration_ms: float) -> None:
+        self.queries += 1
+        self.total_ms += duration_ms
+        if duration_ms >= self.slowest_ms:
+            self.slowest_ms = duration_ms
+            self.slowest_command = command_name
+
+
+current_request_stats: contextvars.ContextVar[Optional[RequestDbStats]] = contextvars.ContextVar(
+    "current_request_stats", default=None
+)
+
+
+class DbCommandListener(monitoring.CommandListener):
+    """Tamamlanan her komutu o anki isteğin sayaçlarına yazar."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    @staticmethod
+    def _record(event):
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.record(event.command_name, event.duration_micros / 1000)
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Bağlantı havuzu sayaçları (açık/kullanımda bağlantı, bekleme hataları)."""
+
+    def __init__(self):
+        self.open = 0
+        self.in_use = 0
+        self.created = 0
+        self.checkout_failures = 0
+        self.cleared = 0
+        self._lock = threading.Lock()
+
+    def _add(self, field: str, delta: int = 1) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add("cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add("created")
+        self._add("open")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._add("checkout_failures")
+
+    def connection_checked_out(self, event):
+        self._add("in_use")
+
+    def connection_checked_in(self, event):
+        self._add("in_use", -1)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "open": self.open,
+                "in_use": self.in_use,
+                "created": self.created,
+                "checkout_failures": self.checkout_failures,
+                "cleared": self.cleared,
+            }
+
+
+def route_label(scope) -> str:
+    """İsteği route şablonu ile etiketler (örn. ``GET /events/{event_id}``)."""
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope.get('method', '')} {path}"
+
+
+class RouteDbStats:
+    """Route bazında toplam DB komut istatistikleri."""
+
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, route: str, stats: RequestDbStats) -> None:
+        with self._lock:
+            entry = self._routes.setdefault(route, {
+                "requests": 0, "queries": 0, "total_ms": 0.0,
+                "max_queries": 0, "slowest_ms": 0.0, "slowest_command": None,
+            })
+            entry["requests"] += 1
+            entry["queries"] += stats.queries
+            entry["total_ms"] += stats.total_ms
+            entry["max_queries"] = max(entry["max_queries"], stats.queries)
+            if stats.slowest_ms > entry["slowest_ms"]:
+                entry["slowest_ms"] = stats.slowest_ms
+                entry["slowest_command"] = stats.slowest_command
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {route: dict(entry) for route, entry in self._routes.items()}
+
+
+class DbMetricsMiddleware:
+    """Saf ASGI middleware; streaming yanıtları tamponlamadan sarar.
+
+    ``budgets`` route etiketi -> izin verilen en fazla komut sayısıdır; route handler'ı
+    ``scope[BUDGET_SCOPE_KEY]`` ile istek bazında başka bir bütçe verebilir.
+    ``budget_mode``: ``off``, ``log`` ya da ``raise`` (testlerde kullanılır).
+    """
+
+    def __init__(self, app, route_stats: RouteDbStats, budgets: Dict[str, int], budget_mode: str = "log"):
+        self.app = app
+        self.route_stats = route_stats
+        self.budgets = budgets
+        self.budget_mode = budget_mode
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats()
+        token = current_request_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.queries).encode()))
+                headers.append((b"x-db-time", f"{stats.total_ms:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_request_stats.reset(token)
+            route = route_label(scope)
+            self.route_stats.add(route, stats)
+        self._check_budget(route, stats, scope.get(BUDGET_SCOPE_KEY, self.budgets.get(route)))
+
+    def _check_budget(self, route: str, stats: RequestDbStats, budget: Optional[int]) -> None:
+        if self.budget_mode == "off" or budget is None or stats.queries <= budget:
+            return
+        message = f"{route} sorgu bütçesini aştı: {stats.queries} komut (bütçe {budget})"
+        if self.budget_mode == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
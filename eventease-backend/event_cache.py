@@ -0,0 +1,191 @@
+"""Etkinlik okumaları için serialize edilmiş yanıt cache'i ve ETag/304 desteği.
+
+``GET /events/`` sayfaları ve ``GET /events/{id}`` yanıtları bir kez JSON
+byte'larına çevrilip saklanır. Yazma işlemleri ilgili etkinliği ve etkilenen
+liste sayfalarını geçersiz kılar. Cache süreç içidir: birden fazla worker'da her
+worker kendi cache'ini tutar ve diğerlerinin yazmalarını ancak kayıtların süresi
+(``ttl``) dolunca görür; bu yüzden çok worker'lı kurulumlarda varsayılan olarak kapalıdır.
+
+Koşullu istekler sadece ``ETag`` (``If-None-Match``) ile yanıtlanır. ``Last-Modified``
+kullanılmaz: join/leave ``updated_at``'i değiştirmez ve saniye çözünürlüğü aynı
+saniyedeki yazmaları ayırt edemez; ``If-Modified-Since`` bu yüzden eski içerik
+için ``304`` döndürebilirdi. Gövdenin özeti olan ETag her değişiklikte değişir.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, NamedTuple, Optional, Set, Tuple
+
+from fastapi import Request, Response
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+
+def make_entry(body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return CachedResponse(body, etag, headers or {})
+
+
+def is_not_modified(request: Request, entry: CachedResponse) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return entry.etag in tags or "*" in tags
+
+
+def to_response(request: Request, entry: CachedResponse) -> Response:
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": "no-cache",
+        **entry.headers,
+    }
+    if is_not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+class EventCache:
+    """Liste sayfaları ve tekil etkinlikler için LRU + TTL cache.
+
+    Liste sayfaları içerdikleri etkinlik id'leriyle saklanır. Sayfaların içeriğini
+    değiştirebilen yazmalar (create, update, import) ``invalidate`` ile tüm sayfaları
+    düşürür; sadece etkinliğin kendisini değiştirenler (join/leave, delete)
+    ``invalidate_event`` ile o etkinliği ve onu içeren sayfaları düşürür. ``ttl``,
+    başka bir worker'ın yaptığı yazmanın bu cache'te en geç ne zaman görüneceğini sınırlar.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Her yazma işleminde artar; okuma sürerken ilgili kayıt geçersiz kılındıysa sonuç cache'e yazılmaz
+        self.version = 0
+        self._cleared = 0
+        self._lists_reset = 0
+        # Son geçersiz kılınan etkinlikler -> version; sınırlı tutulur, düşenlerin en büyüğü _forgotten'da
+        self._touched: "OrderedDict[str, int]" = OrderedDict()
+        self._forgotten = 0
+        self.hits = 0
+        self.misses = 0
+        self._lists: "OrderedDict[Hashable, Tuple[float, CachedResponse, Tuple[str, ...]]]" = OrderedDict()
+        self._events: "OrderedDict[str, Tuple[float, CachedResponse]]" = OrderedDict()
+        # Etkinlik id -> onu içeren liste sayfalarının anahtarları
+        self._pages: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def _expires_at(self) -> float:
+        return time.monotonic() + self.ttl if self.ttl > 0 else math.inf
+
+    def _get(self, store: OrderedDict, key) -> Optional[CachedResponse]:
+        with self._lock:
+            item = store.get(key)
+            if item is not None and item[0] <= time.monotonic():
+                self._drop(store, key)
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            store.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def _drop(self, store: OrderedDict, key) -> None:
+        item = store.pop(key)
+        if store is self._lists:
+            for event_id in item[2]:
+                pages = self._pages.get(event_id)
+                if pages is not None:
+                    pages.discard(key)
+                    if not pages:
+                        del self._pages[event_id]
+
+    def _is_stale(self, version: int, event_ids: Iterable[str]) -> bool:
+        if version < max(self._cleared, self._forgotten):
+            return True
+        return any(self._touched.get(event_id, 0) > version for event_id in event_ids)
+
+    def _touch(self, event_id: str) -> None:
+        self._touched[event_id] = self.version
+        self._touched.move_to_end(event_id)
+        while len(self._touched) > max(1024, 4 * self.max_entries):
+            _, version = self._touched.popitem(last=False)
+            self._forgotten = max(self._forgotten, version)
+
+    def _evict(self, store: OrderedDict) -> None:
+        while len(store) > self.max_entries:
+            self._drop(store, next(iter(store)))
+
+    def get_list(self, key: Hashable) -> Optional[CachedResponse]:
+        return self._get(self._lists, key)
+
+    def put_list(
+        self, key: Hashable, entry: CachedResponse, version: int, event_ids: Iterable[str]
+    ) -> CachedResponse:
+        event_ids = tuple(event_ids)
+        with self._lock:
+            if version < self._lists_reset or self._is_stale(version, event_ids):
+                return entry
+            if key in self._lists:
+                self._drop(self._lists, key)
+            self._lists[key] = (self._expires_at(), entry, event_ids)
+            for event_id in event_ids:
+                self._pages.setdefault(event_id, set()).add(key)
+            self._evict(self._lists)
+        return entry
+
+    def get_event(self, event_id: str) -> Optional[CachedResponse]:
+        return self._get(self._events, event_id)
+
+    def put_event(self, event_id: str, entry: CachedResponse, version: int) -> CachedResponse:
+        with self._lock:
+            if not self._is_stale(version, (event_id,)):
+                self._events[event_id] = (self._expires_at(), entry)
+                self._events.move_to_end(event_id)
+                self._evict(self._events)
+        return entry
+
+    def invalidate(self, event_id: Optional[str] = None) -> None:
+        """Etkinlik eklendiğinde ya da güncellendiğinde çağrılır: o etkinlik ve tüm liste sayfaları düşer."""
+        with self._lock:
+            self.version += 1
+            self._lists_reset = self.version
+            self._lists.clear()
+            self._pages.clear()
+            if event_id is not None:
+                self._events.pop(event_id, None)
+                self._touch(event_id)
+
+    def invalidate_event(self, event_id: str) -> None:
+        """Join/leave ya da silmede çağrılır: sadece o etkinlik ve onu içeren liste sayfaları düşer."""
+        with self._lock:
+            self.version += 1
+            self._events.pop(event_id, None)
+            self._touch(event_id)
+            for key in list(self._pages.get(event_id, ())):
+                self._drop(self._lists, key)
+
+    def clear(self) -> None:
+        """Veri kaynağı değiştiğinde (örn. MongoDB'ye geçiş) tüm kayıtları düşürür."""
+        with self._lock:
+            self.version += 1
+            self._cleared = self._lists_reset = self.version
+            self._lists.clear()
+            self._events.clear()
+            self._pages.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "lists": len(self._lists),
+                "events": len(self._events),
+                "hits": self.hits,
+                "misses": self.misses,
+                "version": self.version,
+                "ttl": self.ttl,
+            }
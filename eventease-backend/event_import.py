@@ -0,0 +1,114 @@
+"""CSV / NDJSON etkinlik import'u için parça parça okuma ve doğrulama.
+
+Yüklenen dosya (Starlette büyük dosyaları diske yazar) satır satır okunur;
+her seferinde en fazla ``IMPORT_BATCH_SIZE`` satır doğrulanır ve route bu
+parçayı tek bir toplu insert ile yazar. Bellekte hiçbir zaman bir parçadan
+fazlası tutulmaz. Hatalı satırlar atlanır ve rapora satır numarasıyla eklenir.
+"""
+import codecs
+import csv
+import itertools
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+import orjson
+from pydantic import BaseModel, ValidationError
+
+IMPORT_BATCH_SIZE = 1000
+# Yanıtta döndürülen en fazla hata sayısı; toplam hatalı satır sayısı ayrıca verilir
+MAX_REPORTED_ERRORS = 1000
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+_EXTENSIONS = {".csv": CSV, ".ndjson": NDJSON, ".jsonl": NDJSON}
+_CONTENT_TYPES = {"text/csv": CSV, "application/x-ndjson": NDJSON, "application/jsonl": NDJSON}
+
+
+class ImportFormatError(ValueError):
+    """Dosya bütün olarak okunamıyor (eksik başlık, geçersiz kodlama ...)."""
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_error(self, row: int, errors: List[Dict[str, str]]) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    for extension, file_format in _EXTENSIONS.items():
+        if filename and filename.lower().endswith(extension):
+            return file_format
+    return _CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+
+
+def _csv_rows(binary_file, required: List[str]) -> Iterator[Tuple[int, Any]]:
+    reader = csv.DictReader(codecs.getreader("utf-8-sig")(binary_file))
+    missing = [field for field in required if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ImportFormatError(f"CSV başlığında eksik kolonlar: {', '.join(missing)}")
+    for number, row in enumerate(reader, start=1):
+        # Boş hücreler gönderilmemiş sayılır; varsayılan değerler (örn. is_public) uygulanır
+        yield number, {key: value for key, value in row.items() if key is not None and value != ""}
+
+
+def _ndjson_rows(binary_file) -> Iterator[Tuple[int, Any]]:
+    for number, line in enumerate(binary_file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield number, [{"field": "", "message": "Geçersiz JSON"}]
+            continue
+        if not isinstance(row, dict):
+            yield number, [{"field": "", "message": "JSON nesnesi bekleniyor"}]
+            continue
+        yield number, row
+
+
+def read_rows(binary_file, file_format: str, model: Type[BaseModel]) -> Iterator[Tuple[int, Any]]:
+    """(satır numarası, ham satır ya da okuma hataları) üretir; numaralar 1'den başlar."""
+    if file_format == CSV:
+        required = [name for name, field in model.model_fields.items() if field.is_required()]
+        return _csv_rows(binary_file, required)
+    return _ndjson_rows(binary_file)
+
+
+def next_chunk(rows: Iterator[Tuple[int, Any]], model: Type[BaseModel], report: ImportReport) -> Optional[List[BaseModel]]:
+    """En fazla IMPORT_BATCH_SIZE satırı okuyup doğrular; dosya bittiyse None döner.
+
+    Senkron dosya okuma ve doğrulama yaptığı için thread'de çağrılır.
+    """
+    try:
+        chunk = list(itertools.islice(rows, IMPORT_BATCH_SIZE))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f"Dosya okunamadı: {e}")
+    if not chunk:
+        return None
+    valid = []
+    for number, row in chunk:
+        if isinstance(row, list):
+            report.add_error(number, row)
+            continue
+        try:
+            valid.append(model.model_validate(row))
+        except ValidationError as e:
+            report.add_error(number, [
+                {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+                for error in e.errors()
+            ])
+    return valid
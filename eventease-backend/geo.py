@@ -0,0 +1,239 @@
+"""Etkinlik koordinatları: mesafe hesabı, bellek içi grid indeksi ve çevrimdışı geocoder.
+
+Koordinatlar API'de ``latitude`` / ``longitude`` alanlarıdır. MongoDB'de aynı nokta
+``geo`` alanında GeoJSON olarak tutulur ve ``2dsphere`` indeksiyle ``$geoNear``
+üzerinden sorgulanır. Bellek içi backend ``GeoGrid``, SQLite backend'i R*Tree
+kullanır; ikisinde de aday etkinlikler sınırlayıcı kutudan seçilip gerçek mesafe
+(haversine) ile elenir.
+
+Koordinatı verilmeyen etkinlikler için konum metni bir ``Geocoder`` ile çözülür.
+Varsayılan ``GazetteerGeocoder`` yer adı listesinden (gazetteer) çalışır, ağ
+erişimi gerektirmez; başka bir servis aynı arayüzü uygulayarak takılabilir.
+"""
+import csv
+import heapq
+import math
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from search import tokenize
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# (min_lat, max_lat, min_lng, max_lng)
+Box = Tuple[float, float, float, float]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def has_coordinates(doc: Dict[str, Any]) -> bool:
+    return doc.get("latitude") is not None and doc.get("longitude") is not None
+
+
+def geo_point(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """MongoDB ``geo`` alanı (GeoJSON; sıra boylam, enlem)."""
+    if not has_coordinates(doc):
+        return None
+    return {"type": "Point", "coordinates": [doc["longitude"], doc["latitude"]]}
+
+
+def bounding_boxes(lat: float, lng: float, radius_km: float) -> List[Box]:
+    """Yarıçapı kapsayan kutular; 180. meridyeni aşan arama iki kutuya bölünür."""
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        # Kutup çevresi: tüm boylamlar
+        return [(max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0)]
+    ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))
+    if ratio >= 1:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    dlng = math.degrees(math.asin(ratio))
+    min_lng, max_lng = lng - dlng, lng + dlng
+    if min_lng < -180:
+        return [(min_lat, max_lat, min_lng + 360, 180.0), (min_lat, max_lat, -180.0, max_lng)]
+    if max_lng > 180:
+        return [(min_lat, max_lat, min_lng, 180.0), (min_lat, max_lat, -180.0, max_lng - 360)]
+    return [(min_lat, max_lat, min_lng, max_lng)]
+
+
+class GeoGrid:
+    """Sabit boyutlu enlem/boylam hücrelerine bölünmüş nokta indeksi.
+
+    Arama, yarıçapın sınırlayıcı kutusuna düşen hücrelerdeki noktaları gerçek mesafeyle
+    eler. Kutu indeksteki nokta sayısından çok hücre kapsıyorsa doğrudan tüm noktalar taranır.
+    """
+
+    def __init__(self, cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float]]] = defaultdict(dict)
+        self._points: Dict[str, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def add(self, doc_id: str, lat: float, lng: float) -> None:
+        self.remove(doc_id)
+        self._points[doc_id] = (lat, lng)
+        self._cells[self._cell(lat, lng)][doc_id] = (lat, lng)
+
+    def remove(self, doc_id: str) -> None:
+        point = self._points.pop(doc_id, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        del self._cells[cell][doc_id]
+        if not self._cells[cell]:
+            del self._cells[cell]
+
+    def _candidates(self, boxes: List[Box]):
+        cell_count = 0
+        ranges = []
+        for min_lat, max_lat, min_lng, max_lng in boxes:
+            (lat_lo, lng_lo), (lat_hi, lng_hi) = self._cell(min_lat, min_lng), self._cell(max_lat, max_lng)
+            ranges.append((lat_lo, lat_hi, lng_lo, lng_hi))
+            cell_count += (lat_hi - lat_lo + 1) * (lng_hi - lng_lo + 1)
+        if cell_count > len(self._points):
+            yield from self._points.items()
+            return
+        for lat_lo, lat_hi, lng_lo, lng_hi in ranges:
+            for row in range(lat_lo, lat_hi + 1):
+                for column in range(lng_lo, lng_hi + 1):
+                    yield from self._cells.get((row, column), {}).items()
+
+    def near(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        limit: Optional[int] = None,
+        predicate: Optional[Callable[[str], bool]] = None,
+    ) -> List[Tuple[str, float]]:
+        """(doc_id, mesafe km) listesi, yakından uzağa (eşitlikte id sırasıyla)."""
+        matches = []
+        for doc_id, (point_lat, point_lng) in self._candidates(bounding_boxes(lat, lng, radius_km)):
+            distance = haversine_km(lat, lng, point_lat, point_lng)
+            if distance <= radius_km and (predicate is None or predicate(doc_id)):
+                matches.append((distance, doc_id))
+        ordered = heapq.nsmallest(limit, matches) if limit is not None else sorted(matches)
+        return [(doc_id, distance) for distance, doc_id in ordered]
+
+
+class Place(NamedTuple):
+    name: str
+    latitude: float
+    longitude: float
+    # 0: il, 1: ilçe / semt; aynı metinde ikisi de geçerse daha özel olan seçilir
+    level: int = 0
+
+
+class Geocoder(ABC):
+    """Konum metnini (enlem, boylam) çiftine çevirir; çözülemezse ``None``."""
+
+    @abstractmethod
+    async def geocode(self, text: str) -> Optional[Tuple[float, float]]:
+        ...
+
+
+class GazetteerGeocoder(Geocoder):
+    """Konum metnindeki yer adlarını yerel bir listeden eşleştirir (ağ erişimi yok).
+
+    Metin ``search.tokenize`` ile normalize edilir; böylece "İstanbul", "istanbul"
+    ve "ISTANBUL" aynı yere düşer. Birden fazla yer adı geçiyorsa en çok kelimeden
+    oluşan, eşitlikte daha özel (``level``) olan seçilir: "Kadıköy, İstanbul" -> Kadıköy.
+    """
+
+    def __init__(self, places: Iterable[Place] = ()):
+        self._places: Dict[Tuple[str, ...], Place] = {}
+        self._max_tokens = 1
+        for place in places:
+            self.add(place)
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def add(self, place: Place) -> None:
+        key = tuple(tokenize(place.name))
+        if key:
+            self._places[key] = place
+            self._max_tokens = max(self._max_tokens, len(key))
+
+    def load_csv(self, path: str) -> int:
+        """``name,latitude,longitude[,level]`` kolonlu CSV'deki yerleri ekler (mevcutları ezer)."""
+        count = 0
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                self.add(Place(row["name"], float(row["latitude"]), float(row["longitude"]), int(row.get("level") or 0)))
+                count += 1
+        return count
+
+    def lookup(self, text: str) -> Optional[Place]:
+        tokens = tokenize(text)
+        best, best_rank = None, None
+        for start in range(len(tokens)):
+            for size in range(1, min(self._max_tokens, len(tokens) - start) + 1):
+                place = self._places.get(tuple(tokens[start:start + size]))
+                if place is not None and (best_rank is None or (size, place.level) > best_rank):
+                    best, best_rank = place, (size, place.level)
+        return best
+
+    async def geocode(self, text: str) -> Optional[Tuple[float, float]]:
+        place = self.lookup(text)
+        return (place.latitude, place.longitude) if place is not None else None
+
+
+# Büyük şehirler ve sık kullanılan semtler; GEOCODER_GAZETTEER ile genişletilebilir
+DEFAULT_PLACES = [
+    Place("İstanbul", 41.0082, 28.9784),
+    Place("Ankara", 39.9334, 32.8597),
+    Place("İzmir", 38.4237, 27.1428),
+    Place("Bursa", 40.1885, 29.0610),
+    Place("Antalya", 36.8969, 30.7133),
+    Place("Adana", 37.0000, 35.3213),
+    Place("Konya", 37.8746, 32.4932),
+    Place("Gaziantep", 37.0662, 37.3833),
+    Place("Kayseri", 38.7312, 35.4787),
+    Place("Eskişehir", 39.7767, 30.5206),
+    Place("Mersin", 36.8121, 34.6415),
+    Place("Kocaeli", 40.7654, 29.9408),
+    Place("İzmit", 40.7654, 29.9408),
+    Place("Sakarya", 40.7569, 30.3781),
+    Place("Tekirdağ", 40.9781, 27.5117),
+    Place("Edirne", 41.6818, 26.5623),
+    Place("Çanakkale", 40.1553, 26.4142),
+    Place("Balıkesir", 39.6484, 27.8826),
+    Place("Manisa", 38.6191, 27.4289),
+    Place("Aydın", 37.8444, 27.8458),
+    Place("Denizli", 37.7765, 29.0864),
+    Place("Muğla", 37.2153, 28.3636),
+    Place("Trabzon", 41.0015, 39.7178),
+    Place("Samsun", 41.2928, 36.3313),
+    Place("Erzurum", 39.9055, 41.2658),
+    Place("Diyarbakır", 37.9144, 40.2306),
+    Place("Şanlıurfa", 37.1591, 38.7969),
+    Place("Malatya", 38.3552, 38.3095),
+    Place("Van", 38.5012, 43.3730),
+    Place("Hatay", 36.2021, 36.1600),
+    Place("Bodrum", 37.0344, 27.4305, 1),
+    Place("Kadıköy", 40.9903, 29.0290, 1),
+    Place("Beşiktaş", 41.0422, 29.0083, 1),
+    Place("Şişli", 41.0602, 28.9877, 1),
+    Place("Beyoğlu", 41.0370, 28.9770, 1),
+    Place("Üsküdar", 41.0226, 29.0156, 1),
+    Place("Sarıyer", 41.1667, 29.0500, 1),
+    Place("Ataşehir", 40.9923, 29.1244, 1),
+    Place("Maslak", 41.1128, 29.0206, 1),
+    Place("Çankaya", 39.9179, 32.8627, 1),
+    Place("Karşıyaka", 38.4561, 27.1094, 1),
+    Place("Bornova", 38.4622, 27.2167, 1),
+]
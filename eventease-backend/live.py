@@ -0,0 +1,237 @@
+"""Etkinlik sayfaları için canlı güncellemeler (Server-Sent Events).
+
+Yazma route'ları (join/leave/update/delete) commit'ten sonra ``publish`` çağırır.
+Yayınlar etkinlik başına ``coalesce`` saniye boyunca birleştirilir; pencere
+sonunda etkinlik bir kez okunur ve SSE mesajı bir kez serialize edilir. Aynı
+etkinliği izleyen tüm aboneler bu byte'ları paylaşır, yani abone sayısı ne olursa
+olsun değişiklik başına tek okuma yapılır. Yavaş aboneler ara mesajları atlayıp
+en güncel durumu alır (sayılar mutlak değer olarak gönderilir).
+
+Abonesi olmayan etkinlikler için ``publish`` hiçbir iş yapmaz. Birden fazla
+worker/instance ile çalışırken diğer süreçlerin yazdıkları MongoDB change
+stream'i (``start_watch``) üzerinden alınır; change stream yalnızca replica
+set'lerde çalışır, desteklenmiyorsa sadece süreç içi yayınlar kullanılır.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+
+logger = logging.getLogger("eventease.live")
+
+ATTENDEES = "attendees"
+UPDATE = "update"
+DELETED = "deleted"
+
+PING = b": ping\n\n"
+
+
+def sse_message(event: str, data: Dict[str, Any], message_id: int) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (message_id, event.encode(), orjson.dumps(data))
+
+
+class _Channel:
+    __slots__ = ("version", "message", "update_version", "update_message", "changed",
+                 "subscribers", "pending", "closed", "flush_lock")
+
+    def __init__(self):
+        self.version = 0
+        self.message = b""
+        # Tam etkinlik içeren son mesaj; ara mesajları atlayan abone bunu kaçırmamalı
+        self.update_version = 0
+        self.update_message = b""
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.pending: Optional[set] = None
+        self.closed = False
+        # Okumalar sırayla yapılır; geç biten eski okuma yeni sonucu ezmesin
+        self.flush_lock = asyncio.Lock()
+
+
+class Subscription:
+    """Bir etkinliğin kanalına kayıt; ``async for`` ile SSE byte'ları üretir."""
+
+    def __init__(self, broadcaster: "LiveUpdates", event_id: str, channel: _Channel):
+        self._broadcaster = broadcaster
+        self._event_id = event_id
+        self._channel = channel
+        # Kayıttan önceki mesajlar gönderilmez; abone başlangıç durumunu snapshot ile alır
+        self._version = channel.version
+        self._active = True
+
+    def close(self) -> None:
+        if self._active:
+            self._active = False
+            self._broadcaster._unsubscribe(self._event_id, self._channel)
+
+    async def stream(self, snapshot: Dict[str, Any]):
+        channel = self._channel
+        try:
+            yield b"retry: %d\n" % self._broadcaster.retry_ms
+            yield sse_message("snapshot", snapshot, self._version)
+            while True:
+                if channel.version != self._version:
+                    if channel.update_version > self._version and channel.update_version != channel.version:
+                        yield channel.update_message
+                    self._version = channel.version
+                    yield channel.message
+                    if channel.closed:
+                        return
+                    continue
+                if channel.closed:
+                    return
+                try:
+                    await asyncio.wait_for(channel.changed.wait(), self._broadcaster.heartbeat)
+                except asyncio.TimeoutError:
+                    # Proxy'lerin boşta bağlantıyı kapatmaması için
+                    yield PING
+        finally:
+            self.close()
+
+
+class LiveUpdates:
+    """Etkinlik id -> abone kanalı; değişiklikleri birleştirip tüm abonelere dağıtır.
+
+    ``loader`` etkinliği okur (yoksa ``None``), ``to_wire`` yanıt formatına çevirir.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+        to_wire: Callable[[Dict[str, Any]], Dict[str, Any]],
+        coalesce: float = 0.05,
+        heartbeat: float = 15.0,
+        retry_ms: int = 3000,
+    ):
+        self.loader = loader
+        self.to_wire = to_wire
+        self.coalesce = coalesce
+        self.heartbeat = heartbeat
+        self.retry_ms = retry_ms
+        self._channels: Dict[str, _Channel] = {}
+        self._tasks: set = set()
+        self.flushes = 0
+        self._watch_stop: Optional[threading.Event] = None
+
+    def subscribe(self, event_id: str) -> Subscription:
+        channel = self._channels.get(event_id)
+        if channel is None:
+            channel = self._channels[event_id] = _Channel()
+        channel.subscribers += 1
+        return Subscription(self, event_id, channel)
+
+    def _unsubscribe(self, event_id: str, channel: _Channel) -> None:
+        channel.subscribers -= 1
+        if channel.subscribers == 0 and self._channels.get(event_id) is channel:
+            del self._channels[event_id]
+
+    def publish(self, event_id: str, kind: str = ATTENDEES) -> None:
+        """Bir değişikliği bildirir; aynı pencere içindeki yayınlar tek mesajda birleşir."""
+        channel = self._channels.get(event_id)
+        if channel is None:
+            return
+        if channel.pending is not None:
+            channel.pending.add(kind)
+            return
+        channel.pending = {kind}
+        # Okuma, yayını yapan isteğin context'inde (ve DB sayaçlarında) çalışmasın
+        asyncio.get_running_loop().call_later(
+            self.coalesce, self._start_flush, event_id, channel, context=contextvars.Context()
+        )
+
+    def _start_flush(self, event_id: str, channel: _Channel) -> None:
+        task = asyncio.create_task(self._flush(event_id, channel))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, event_id: str, channel: _Channel) -> None:
+        # Okuma sırasında gelen yayınlar yeni bir pencere açar; okunan doküman onlardan eski olabilir
+        kinds, channel.pending = channel.pending, None
+        async with channel.flush_lock:
+            try:
+                doc = await self.loader(event_id)
+            except Exception:
+                logger.exception("Canlı güncelleme okunamadı", extra={"event_id": event_id})
+                return
+            self._apply(event_id, channel, kinds, doc)
+
+    def _apply(self, event_id: str, channel: _Channel, kinds: set, doc: Optional[Dict[str, Any]]) -> None:
+        self.flushes += 1
+        version = channel.version + 1
+        if doc is None:
+            message = sse_message(DELETED, {"id": event_id}, version)
+            channel.closed = True
+            if self._channels.get(event_id) is channel:
+                del self._channels[event_id]
+        elif UPDATE in kinds or DELETED in kinds:
+            message = sse_message(UPDATE, self.to_wire(doc), version)
+        else:
+            message = sse_message(ATTENDEES, {
+                "id": event_id,
+                "attendee_count": doc.get("attendee_count", 0),
+                "max_attendees": doc.get("max_attendees"),
+            }, version)
+        if doc is None or UPDATE in kinds or DELETED in kinds:
+            channel.update_version, channel.update_message = version, message
+        channel.version, channel.message = version, message
+        changed, channel.changed = channel.changed, asyncio.Event()
+        changed.set()
+
+    def close(self) -> None:
+        """Kapanışta açık stream'leri sonlandırır."""
+        self.stop_watch()
+        for task in self._tasks:
+            task.cancel()
+        for channel in self._channels.values():
+            channel.closed = True
+            channel.changed.set()
+        self._channels.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(channel.subscribers for channel in self._channels.values()),
+            "flushes": self.flushes,
+        }
+
+    def start_watch(self, collection) -> None:
+        """MongoDB ``events`` koleksiyonunun change stream'ini arka plan thread'inde dinler."""
+        if self._watch_stop is not None:
+            return
+        self._watch_stop = threading.Event()
+        thread = threading.Thread(
+            target=self._watch,
+            args=(collection, asyncio.get_running_loop(), self._watch_stop),
+            name="live-change-stream",
+            daemon=True,
+        )
+        thread.start()
+
+    def stop_watch(self) -> None:
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
+    def _watch(self, collection, loop: asyncio.AbstractEventLoop, stop: threading.Event) -> None:
+        pipeline = [{"$match": {"operationType": {"$in": ["update", "replace", "delete"]}}}]
+        try:
+            with collection.watch(pipeline, max_await_time_ms=1000) as stream:
+                logger.info("MongoDB change stream dinleniyor")
+                while not stop.is_set():
+                    change = stream.try_next()
+                    if change is None:
+                        continue
+                    loop.call_soon_threadsafe(self.publish, str(change["documentKey"]["_id"]), self._change_kind(change))
+        except Exception as e:
+            # Standalone mongod change stream desteklemez; süreç içi yayınlar yeterli
+            logger.warning("MongoDB change stream kullanılamıyor", extra={"error": str(e)})
+
+    @staticmethod
+    def _change_kind(change: Dict[str, Any]) -> str:
+        if change["operationType"] == "delete":
+            return DELETED
+        fields = change.get("updateDescription", {}).get("updatedFields", {})
+        return ATTENDEES if fields and set(fields) <= {"attendee_count"} else UPDATE
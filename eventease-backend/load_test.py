@@ -0,0 +1,231 @@
+"""Süreç içi yük testi: test_api.py'deki çağrıları ölçülebilir ve tekrarlanabilir hale getirir.
+
+Uygulama uvicorn olmadan ASGI üzerinden çalıştırılır. Varsayılan olarak bellek içi
+backend kullanılır; ``--mongo`` ile yerel bir mongod'daki ayrı bir veritabanı
+(``eventease_loadtest``) doldurulur ve test sonunda silinir. ``--sqlite`` ile verilen
+SQLite veritabanının tabloları silinip yeniden doldurulur; aynı senaryolar iki
+backend'i karşılaştırmak için kullanılabilir.
+
+Her senaryo için req/s ve p50/p95/p99 raporlanır. ``--save-baseline`` sonuçları
+JSON olarak saklar; ``--baseline`` ile verilen dosyaya göre req/s düşüşü ya da
+p95 artışı ``--threshold`` oranını aşarsa çıkış kodu 1 olur.
+
+    python load_test.py --events 100000 --save-baseline baseline.json
+    python load_test.py --events 100000 --baseline baseline.json --threshold 0.2
+    python load_test.py --events 100000 --sqlite sqlite:///loadtest.db
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime
+
+import httpx
+from bson import ObjectId
+from pymongo.mongo_client import MongoClient
+
+import event_cache as cache
+import main
+from benchmark import BASE_URL, make_event_docs, make_token, percentile
+from db_metrics import DbCommandListener
+from repository import MemoryRepository, MongoRepository
+from sql_repository import SqlRepository
+
+LOADTEST_DATABASE = "eventease_loadtest"
+SEED_BATCH_SIZE = 10000
+ATTENDING_USERS = 100
+EVENTS_PER_USER = 20
+PAGE_SIZE = 100
+LOGIN_PASSWORD = "loadtest-password"
+# Login bcrypt yüzünden diğer senaryolardan çok daha yavaştır; istek sayısı bu oranda azaltılır
+LOGIN_REQUEST_RATIO = 0.05
+SCENARIOS = ("list", "get", "join", "leave", "attending", "login")
+
+
+async def seed(event_count, mongo_url, sqlite_url):
+    """Seçilen backend'i boşaltıp ``event_count`` etkinlik ve katılım kayıtlarıyla doldurur."""
+    docs = make_event_docs(event_count)
+    for doc in docs:
+        # Yük testinde kontenjan sınırı join/leave sonuçlarını etkilemesin
+        doc["max_attendees"] = None
+        doc["attendee_count"] = 0
+    event_ids = [doc["id"] for doc in docs]
+
+    if mongo_url:
+        client = MongoClient(mongo_url, event_listeners=[DbCommandListener()])
+        client.drop_database(LOADTEST_DATABASE)
+        main.repo = MongoRepository(client[LOADTEST_DATABASE])
+        await main.repo.ensure_indexes()
+        for start in range(0, len(docs), SEED_BATCH_SIZE):
+            batch = [{"_id": ObjectId(doc.pop("id")), **doc} for doc in docs[start:start + SEED_BATCH_SIZE]]
+            client[LOADTEST_DATABASE].events.insert_many(batch, ordered=False)
+    elif sqlite_url:
+        client = None
+        main.repo = SqlRepository(sqlite_url)
+        main.repo.drop_all()
+        await main.repo.ensure_indexes()
+        for start in range(0, len(docs), SEED_BATCH_SIZE):
+            main.repo.load_events(docs[start:start + SEED_BATCH_SIZE])
+    else:
+        client = None
+        main.repo = MemoryRepository()
+        main.repo.load_events(docs)
+    main.event_cache = cache.EventCache(max_entries=main.event_cache.max_entries)
+
+    rng = random.Random(0)
+    for i in range(ATTENDING_USERS):
+        await main.repo.bulk_join(f"attending-user-{i}", rng.sample(event_ids, min(EVENTS_PER_USER, len(event_ids))))
+    return client, event_ids
+
+
+async def run_scenario(client, request_count, concurrency, send):
+    """``send(client, i)`` çağrısını ``concurrency`` paralel worker ile ``request_count`` kez çalıştırır."""
+    samples = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < request_count:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            response = await send(client, index)
+            samples.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def build_scenarios(event_ids, request_count):
+    rng = random.Random(1)
+    # Token üretimi ölçüme girmesin diye header'lar önceden hazırlanır
+    join_headers = [{"Authorization": f"Bearer {make_token(f'join-user-{i}')}"} for i in range(request_count)]
+    attending_headers = [{"Authorization": f"Bearer {make_token(f'attending-user-{i}')}"} for i in range(ATTENDING_USERS)]
+
+    async def list_events(client, i):
+        return await client.get("/events/", params={"after": rng.choice(event_ids), "limit": PAGE_SIZE})
+
+    async def get_event(client, i):
+        return await client.get(f"/events/{rng.choice(event_ids)}")
+
+    # leave senaryosu, join senaryosunun oluşturduğu katılımları aynı sırayla geri alır
+    async def join(client, i):
+        return await client.post(f"/events/{event_ids[i % len(event_ids)]}/join", headers=join_headers[i])
+
+    async def leave(client, i):
+        return await client.post(f"/events/{event_ids[i % len(event_ids)]}/leave", headers=join_headers[i])
+
+    async def attending(client, i):
+        return await client.get("/events/attending", headers=attending_headers[i % ATTENDING_USERS])
+
+    async def login(client, i):
+        return await client.post("/login", json={"email": "loadtest@bench.local", "password": LOGIN_PASSWORD})
+
+    return {
+        "list": (list_events, 1.0),
+        "get": (get_event, 1.0),
+        "join": (join, 1.0),
+        "leave": (leave, 1.0),
+        "attending": (attending, 1.0),
+        "login": (login, LOGIN_REQUEST_RATIO),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Baseline'a göre gerilemeleri döndürür (req/s düşüşü ya da p95 artışı)."""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        if result["errors"]:
+            regressions.append(f"{name}: {result['errors']} hatalı yanıt")
+        expected = baseline.get("scenarios", {}).get(name)
+        if expected is None:
+            continue
+        if result["rps"] < expected["rps"] * (1 - threshold):
+            regressions.append(f"{name}: req/s {expected['rps']} -> {result['rps']}")
+        if result["p95_ms"] > expected["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {expected['p95_ms']}ms -> {result['p95_ms']}ms")
+    return regressions
+
+
+async def run(args):
+    mongo_client, event_ids = await seed(args.events, args.mongo, args.sqlite)
+    scenarios = build_scenarios(event_ids, max(args.concurrency, args.requests))
+    results = {
+        "backend": "mongodb" if args.mongo else "sqlite" if args.sqlite else "memory",
+        "events": args.events,
+        "concurrency": args.concurrency,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=BASE_URL) as client:
+            await client.post("/users/", json={"name": "Load Test", "email": "loadtest@bench.local", "password": LOGIN_PASSWORD})
+            print(f"Backend: {results['backend']}, etkinlik: {args.events}, paralel istek: {args.concurrency}")
+            for name in args.scenarios or SCENARIOS:
+                send, ratio = scenarios[name]
+                request_count = max(args.concurrency, int(args.requests * ratio))
+                result = await run_scenario(client, request_count, args.concurrency, send)
+                results["scenarios"][name] = result
+                print(
+                    f"{name:<12} n={result['requests']:<6} err={result['errors']:<4} "
+                    f"{result['rps']:9.1f} req/s  p50={result['p50_ms']:8.2f}ms "
+                    f"p95={result['p95_ms']:8.2f}ms  p99={result['p99_ms']:8.2f}ms"
+                )
+    finally:
+        if mongo_client is not None:
+            mongo_client.drop_database(LOADTEST_DATABASE)
+        if not isinstance(main.repo, MemoryRepository):
+            main.repo.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EventEase süreç içi yük testi")
+    parser.add_argument("scenarios", nargs="*", help=f"çalıştırılacak senaryolar: {', '.join(SCENARIOS)} (varsayılan: hepsi)")
+    parser.add_argument("--events", type=int, default=10000, help="oluşturulacak etkinlik sayısı (1k - 1M)")
+    parser.add_argument("--requests", type=int, default=2000, help="senaryo başına istek sayısı")
+    parser.add_argument("--concurrency", type=int, default=16, help="paralel istek sayısı")
+    parser.add_argument("--mongo", metavar="URL", help="bellek içi backend yerine bu mongod'u kullan")
+    parser.add_argument("--sqlite", metavar="URL", help="bellek içi backend yerine bu SQLite veritabanını kullan (örn. sqlite:///loadtest.db)")
+    parser.add_argument("--baseline", metavar="PATH", help="karşılaştırılacak baseline JSON dosyası")
+    parser.add_argument("--save-baseline", metavar="PATH", help="sonuçları baseline olarak kaydet")
+    parser.add_argument("--threshold", type=float, default=0.2, help="izin verilen gerileme oranı (varsayılan 0.2)")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"bilinmeyen senaryo: {', '.join(sorted(unknown))}")
+    if args.mongo and args.sqlite:
+        parser.error("--mongo ve --sqlite birlikte kullanılamaz")
+    if args.events < 1:
+        parser.error("--events en az 1 olmalı")
+
+    results = asyncio.run(run(args))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline kaydedildi: {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("GERİLEME:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"Baseline ile uyumlu (eşik %{args.threshold * 100:.0f})")
@@ -0,0 +1,84 @@
+"""Yapılandırılmış (JSON) ve bloklamayan log kurulumu.
+
+Log kayıtları istek thread'inde sadece bir kuyruğa bırakılır; stdout'a yazma
+işini ``QueueListener`` ayrı bir thread'de yapar. Sık çalışan yollar DEBUG
+seviyesinde log yazar; bu kayıtlar ``LOG_SAMPLE_RATE`` oranında örneklenir,
+INFO ve üstü her zaman yazılır.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# LogRecord'un kendi alanları; bunların dışındakiler (extra=...) JSON'a eklenir
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_queue_handler = None
+_propagate = True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """DEBUG kayıtlarının sadece ``rate`` oranını geçirir."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+def setup_logging() -> None:
+    global _listener, _queue_handler, _propagate
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(float(os.getenv("LOG_SAMPLE_RATE", "1.0"))))
+
+    root = logging.getLogger("eventease")
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(queue_handler)
+    _queue_handler, _propagate = queue_handler, root.propagate
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Kuyrukta kalan kayıtları yazar, listener thread'ini durdurur ve logger'ı eski haline getirir.
+
+    Handler kaldırılmazsa sonraki kayıtlar kimsenin okumadığı kuyrukta birikir;
+    tekrar ``setup_logging`` çağrıldığında da ikinci bir handler eklenir.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    root = logging.getLogger("eventease")
+    root.removeHandler(_queue_handler)
+    root.propagate = _propagate
+    _listener.stop()
+    _listener = _queue_handler = None
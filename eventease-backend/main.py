@@ -1,17 +1,55 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+import time
+# Soğuk açılış süresi import'un başından itibaren ölçülür
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, File, Header, Query, Request, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime, timedelta
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta, timezone
+import csv
+import hmac
+import io
+import math
+import logging
 import os
+import orjson
 from dotenv import load_dotenv
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-from bson import ObjectId
 from jose import jwt
-import bcrypt
-import uuid
+
+import event_cache as cache
+import event_import
+import geo
+from admission import HIGH, LOW, NORMAL, AdmissionController, AdmissionMiddleware, RoutePolicy
+import live
+import search
+from database import MongoConnection
+from db_metrics import BUDGET_SCOPE_KEY, DbMetricsMiddleware, RouteDbStats
+from logging_config import setup_logging, shutdown_logging
+from metrics import MetricsMiddleware, MetricsRegistry
+from repository import (
+    ALREADY_JOINED,
+    FULL,
+    JOINED,
+    LEFT,
+    NOT_ATTENDING,
+    NOT_FOUND,
+    STREAM_BATCH_SIZE,
+    MemoryRepository,
+    MongoRepository,
+    check_cursor,
+    date_cursor,
+    event_query,
+)
+from sql_repository import SqlRepository
+from passwords import MAX_PASSWORD_BYTES, PasswordHasher, PasswordPoolBusy
+from profiling import LoopLagMonitor, ProfilingMiddleware, RequestProfiler
+from write_behind import WriteQueueFull
+from token_cache import TokenCache
 
 # Environment variables
 load_dotenv()
@@ -19,11 +57,43 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 ALGORITHM = "HS256"
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
+# mongo (varsayılan), sqlite (çok worker'lı çalıştırma için paylaşılan dosya) ya da memory
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+SQL_DATABASE_URL = os.getenv("SQL_DATABASE_URL", "sqlite:///eventease.db")
+
+# Loglar JSON olarak ve kuyruk üzerinden (istek thread'ini bloklamadan) yazılır
+setup_logging()
+logger = logging.getLogger("eventease")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # MongoDB bağlantısı burada açılır; erişilemezse bellek içi store ile devam edilir
+    # ve bağlantı arka planda yeniden denenir
+    connect_started = time.perf_counter()
+    if STORAGE_BACKEND == "sqlite":
+        await repo.ensure_indexes()
+    elif STORAGE_BACKEND == "mongo":
+        await mongo.start()
+    startup_stats["db_connect_ms"] = round((time.perf_counter() - connect_started) * 1000, 2)
+    startup_stats["ready_ms"] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 2)
+    logger.info("Uygulama hazır", extra=startup_stats)
+    if LOOP_LAG_THRESHOLD > 0:
+        loop_lag_monitor.start()
+    yield
+    loop_lag_monitor.stop()
+    live_updates.close()
+    await mongo.close()
+    if isinstance(repo, SqlRepository):
+        repo.close()
+    password_hasher.close()
+    shutdown_logging()
 
 app = FastAPI(
     title="EventEase API",
     description="Etkinlik yönetim platformu API'si",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS ayarları
@@ -34,6 +104,81 @@ origins = [
     # Gerekirse diğer preview domainleri de ekleyin
 ]
 
+# İstek profili: X-Profile: <PROFILE_TOKEN> header'ı (token verilmezse kapalı) ya da
+# POST /debug/profiling ile kurulan sonraki N istek. Admission'dan sonra çalışır; reddedilen
+# istekler profillenmez.
+request_profiler = RequestProfiler(
+    directory=os.getenv("PROFILE_DIR", "profiles"),
+    token=os.getenv("PROFILE_TOKEN") or None,
+    max_files=int(os.getenv("PROFILE_MAX_FILES", "100")),
+    sample_interval=float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1")) / 1000,
+)
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+# Event loop LOOP_LAG_THRESHOLD_MS'den uzun bloklanırsa o anki stack loglanır (0 = kapalı)
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "0")) / 1000
+loop_lag_monitor = LoopLagMonitor(threshold=LOOP_LAG_THRESHOLD or 0.05)
+
+# Admission control: aşırı yükte istekler sıraya girer ya da hemen 503/429 ile reddedilir.
+# Ucuz okuma route'ları önceliklidir; /login gibi pahalı route'lar slotların en fazla
+# yarısını kullanabilir. CORS'tan önce eklenir ki reddedilen yanıtlar da CORS başlıklarını alsın.
+ADMISSION_POLICIES = {
+    "GET /": RoutePolicy(HIGH),
+    "GET /health": RoutePolicy(HIGH),
+    "GET /metrics": RoutePolicy(HIGH),
+    "GET /events/": RoutePolicy(HIGH),
+    "GET /events/upcoming": RoutePolicy(HIGH),
+    "GET /events/{event_id}": RoutePolicy(HIGH),
+    # SSE bağlantıları uzun sürer; slot tutmaz
+    "GET /events/{event_id}/live": RoutePolicy(NORMAL, counted=False),
+    "POST /login": RoutePolicy(
+        LOW,
+        # Varsayılan: şifre havuzunun kendi sınırı (worker + kuyruk)
+        max_concurrency=int(os.getenv(
+            "ADMISSION_LOGIN_CONCURRENCY",
+            str(int(os.getenv("PASSWORD_WORKERS", "2")) + int(os.getenv("PASSWORD_QUEUE", "32"))),
+        )),
+        rate=float(os.getenv("ADMISSION_LOGIN_RATE", "0")),
+        burst=int(os.getenv("ADMISSION_LOGIN_BURST", "0")),
+    ),
+    "POST /users/": RoutePolicy(LOW),
+    "POST /events/import": RoutePolicy(LOW, max_concurrency=int(os.getenv("ADMISSION_IMPORT_CONCURRENCY", "2"))),
+    "GET /events/{event_id}/attendees.{export_format}": RoutePolicy(
+        LOW, max_concurrency=int(os.getenv("ADMISSION_EXPORT_CONCURRENCY", "4"))
+    ),
+}
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "500")) / 1000
+admission = AdmissionController(
+    ADMISSION_POLICIES,
+    max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "256")),
+    queue_timeouts={
+        HIGH: ADMISSION_QUEUE_TIMEOUT * 2,
+        NORMAL: ADMISSION_QUEUE_TIMEOUT,
+        LOW: ADMISSION_QUEUE_TIMEOUT / 5,
+    },
+    max_waiting=int(os.getenv("ADMISSION_MAX_WAITING", "1024")),
+    rate=float(os.getenv("ADMISSION_RATE", "0")),
+    burst=int(os.getenv("ADMISSION_BURST", "0")),
+    enabled=os.getenv("ADMISSION_ENABLED", "true").lower() == "true",
+)
+
+def admission_key(scope) -> str:
+    """Rate limit anahtarı: geçerli bearer token'ın ``sub`` claim'i, yoksa istemci IP'si."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                # Doğrulanan token cache'lenir; aynı token'la gelen sonraki istekler decode edilmez
+                try:
+                    return f"user:{verify_token(token)['id']}"
+                except jwt.JWTError:
+                    pass
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+app.add_middleware(AdmissionMiddleware, controller=admission, key_func=admission_key)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,  # 👈 Sadece bu domainlerden gelen istekler kabul edilir
@@ -42,9 +187,90 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Her MongoDB komutu isteğe bağlanır; yanıtlara X-DB-Queries / X-DB-Time eklenir.
+# Route başına beklenen en fazla komut sayısı; aşımda log yazılır (testlerde "raise").
+DB_QUERY_BUDGETS = {
+    # Sayfalı liste; stream=true istekleri batch başına getMore yaptığı için bütçe dışıdır
+    "GET /events/": 1,
+    "GET /events/{event_id}": 1,
+    "GET /events/search": 1,
+    "GET /events/nearby": 1,
+    "GET /events/upcoming": 1,
+    "GET /events/attending": 4,
+    "GET /events/{event_id}/is-attending": 1,
+    "GET /events/{event_id}/live": 1,
+    "POST /events/attendance-status": 2,
+    "POST /events/": 1,
+    "PUT /events/{event_id}": 2,
+    "DELETE /events/{event_id}": 2,
+    "POST /events/{event_id}/join": 3,
+    "POST /events/{event_id}/leave": 2,
+    "POST /users/": 2,
+    "POST /login": 1,
+}
+db_route_stats = RouteDbStats()
+app.add_middleware(
+    DbMetricsMiddleware,
+    route_stats=db_route_stats,
+    budgets=DB_QUERY_BUDGETS,
+    budget_mode=os.getenv("DB_QUERY_BUDGET_MODE", "log"),
+)
+
+# Route bazında gecikme histogramı, devam eden istek ve hata sayıları (/metrics)
+metrics_registry = MetricsRegistry()
+app.add_middleware(MetricsMiddleware, registry=metrics_registry)
+
 # Security
 security = HTTPBearer()
 
+# Doğrulanmış token claim'leri için cache (jwt.decode her istekte tekrarlanmasın)
+token_cache = TokenCache(
+    max_size=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL", "300")),
+    enabled=os.getenv("TOKEN_CACHE_ENABLED", "true").lower() == "true",
+)
+
+# GET /events/ ve GET /events/{id} yanıtları serialize edilmiş halde cache'lenir.
+# Cache process'e özeldir; bir worker başka worker'ın yazdığını ancak EVENT_CACHE_TTL
+# dolunca görür. Bu yüzden sqlite'ta ve birden fazla worker'la (uvicorn'un da okuduğu
+# WEB_CONCURRENCY) varsayılan olarak kapalıdır.
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+event_cache = cache.EventCache(
+    max_entries=int(os.getenv(
+        "EVENT_CACHE_SIZE", "0" if STORAGE_BACKEND == "sqlite" or WORKERS > 1 else "1024"
+    )),
+    ttl=float(os.getenv("EVENT_CACHE_TTL", "5")),
+)
+
+# bcrypt işlemleri event loop'u bloklamasın diye sınırlı bir worker havuzunda çalışır
+password_hasher = PasswordHasher(
+    max_workers=int(os.getenv("PASSWORD_WORKERS", "2")),
+    max_queue=int(os.getenv("PASSWORD_QUEUE", "32")),
+)
+
+# Listeleme endpoint'leri için sayfa boyutları
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Toplu katılım endpoint'lerinde tek istekteki en fazla etkinlik sayısı
+MAX_BULK_EVENTS = 200
+# Arama sonuçları skora göre sıralandığı için offset ile sayfalanır; derin sayfalar sınırlıdır
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_OFFSET = 1000
+# Yakındaki etkinlikler yakından uzağa sıralanır; yarıçap km cinsindendir
+NEARBY_PAGE_SIZE = 20
+MAX_NEARBY_PAGE_SIZE = 100
+DEFAULT_NEARBY_RADIUS_KM = 10
+MAX_NEARBY_RADIUS_KM = 500
+
+# Koordinatı verilmeyen etkinliklerin konum metni çevrimdışı yer adı listesinden çözülür
+# (GEOCODER=off ile kapalı). GEOCODER_GAZETTEER ile ek yerler CSV'den yüklenir.
+geocoder = None
+if os.getenv("GEOCODER", "gazetteer").lower() == "gazetteer":
+    geocoder = geo.GazetteerGeocoder(geo.DEFAULT_PLACES)
+    if os.getenv("GEOCODER_GAZETTEER"):
+        geocoder.load_csv(os.getenv("GEOCODER_GAZETTEER"))
+
 # Pydantic Models
 class UserBase(BaseModel):
     name: str
@@ -53,10 +279,20 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
+    @field_validator("password")
+    @classmethod
+    def check_password_length(cls, password: str) -> str:
+        if len(password.encode("utf-8")) > MAX_PASSWORD_BYTES:
+            raise ValueError(f"Şifre en fazla {MAX_PASSWORD_BYTES} byte olabilir")
+        return password
+
 class User(UserBase):
     id: str
-    role: str
-    created_at: Optional[datetime] = None
+    # Eksik alanlar için varsayılan değerler
+    name: str = "Unknown User"
+    email: str = "unknown@example.com"
+    role: str = "USER"
+    created_at: Optional[datetime] = Field(default_factory=datetime.now)
     
     class Config:
         from_attributes = True
@@ -72,52 +308,139 @@ class EventBase(BaseModel):
     location: str
     max_attendees: Optional[int] = None
     is_public: bool = True
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class EventCreate(EventBase):
-    pass
+    @model_validator(mode="after")
+    def check_coordinates(self):
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("latitude ve longitude birlikte verilmelidir")
+        return self
 
 class Event(EventBase):
     id: str
-    creator_id: str
-    created_at: Optional[datetime] = None
-    updated_at: Optional[datetime] = None
+    # Eksik alanlar için varsayılan değerler
+    creator_id: str = "unknown"
+    attendee_count: int = 0
+    created_at: Optional[datetime] = Field(default_factory=datetime.now)
+    updated_at: Optional[datetime] = Field(default_factory=datetime.now)
     
     class Config:
         from_attributes = True
 
+class EventSearchResult(Event):
+    # Sadece aynı backend'in sonuçları arasında karşılaştırılabilir
+    score: float = 0.0
+
+class EventNearbyResult(Event):
+    distance_km: float = 0.0
+
+_MISSING = object()
+
+def wire_converter(model):
+    """Modelin alanlarını ve varsayılanlarını kullanarak doğrulama yapmadan yanıt dict'i üretir.
+
+    Sadece güvenilir kaynaklardan (kendi veritabanımız) gelen dokümanlar için kullanılır;
+    Pydantic model kurulumu ve response_model doğrulaması atlanır, JSON'a orjson çevirir.
+    """
+    fields = []
+    for name, field in model.model_fields.items():
+        if field.default_factory is not None:
+            fields.append((name, field.default_factory))
+        else:
+            default = None if field.is_required() else field.default
+            fields.append((name, lambda default=default: default))
+    
+    def convert(doc: dict) -> dict:
+        wire = {}
+        for name, default in fields:
+            value = doc.get(name, _MISSING)
+            wire[name] = default() if value is _MISSING else value
+        return wire
+    
+    return convert
+
+event_to_wire = wire_converter(Event)
+search_result_to_wire = wire_converter(EventSearchResult)
+nearby_result_to_wire = wire_converter(EventNearbyResult)
+user_to_wire = wire_converter(User)
+
+class ProfilingRequest(BaseModel):
+    requests: int = Field(1, ge=1, le=100)
+    mode: Literal["cprofile", "sample"] = "cprofile"
+    path_prefix: Optional[str] = None
+
+class EventIdList(BaseModel):
+    event_ids: List[str] = Field(..., max_length=MAX_BULK_EVENTS)
+
+class BulkAttendanceRequest(EventIdList):
+    action: Literal["join", "leave"]
+
 # Database (MongoDB)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 NEXTAUTH_SECRET = os.getenv("NEXTAUTH_SECRET", "206ab6876a8e9d80affcb5b92bdf02e2")
 
-# Geçici olarak MongoDB bağlantısını devre dışı bırak
-try:
-    client = MongoClient(DATABASE_URL, server_api=ServerApi('1'))
-    db = client.eventease
-    # Bağlantı testi
-    client.admin.command('ping')
-    print("MongoDB bağlantısı başarılı!")
-    MONGODB_AVAILABLE = True
-except Exception as e:
-    print("MongoDB bağlantı hatası:", e)
-    print("Mock data kullanılacak...")
-    MONGODB_AVAILABLE = False
-    # Mock database
-    db = None
-
-# Mock data for testing
-mock_events = []
-mock_users = []
-mock_attendances = []  # Kullanıcıların katıldığı etkinlikleri takip etmek için
-
-# Test için mock attendance kayıtları ekle
+# Route'lar veritabanına bu repository üzerinden (event loop'u bloklamadan) erişir.
+# MongoDB devreye girene kadar aynı arayüzü sağlayan bellek içi store (mock data) kullanılır.
+if STORAGE_BACKEND == "sqlite":
+    repo = SqlRepository(SQL_DATABASE_URL, pool_size=int(os.getenv("SQL_POOL_SIZE", "8")))
+else:
+    repo = MemoryRepository()
+
+async def use_mongo(mongo_repo: MongoRepository):
+    """MongoDB ilk kez erişilebilir olduğunda çağrılır: indeksler hazırlanır, route'lar MongoDB'ye geçer."""
+    global repo
+    await mongo_repo.ensure_indexes()
+    await mongo_repo.backfill_attendee_counts()
+    await mongo_repo.backfill_search_fields()
+    repo = mongo_repo
+    if LIVE_CHANGE_STREAMS:
+        live_updates.start_watch(mongo_repo.db.events)
+    # Cache'teki yanıtlar mock data'dan üretilmiş olabilir
+    event_cache.clear()
+
+mongo = MongoConnection(
+    DATABASE_URL,
+    use_mongo,
+    max_pool_size=int(os.getenv("MONGO_MAX_POOL_SIZE", "32")),
+    min_pool_size=int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+    connect_timeout_ms=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "3000")),
+    server_selection_timeout_ms=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "3000")),
+    socket_timeout_ms=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000")),
+    health_interval=float(os.getenv("MONGO_HEALTH_INTERVAL", "10")),
+    # Yoğun katılım anlarında attendance insert'leri insert_many batch'lerinde birleştirilir
+    repo_options={
+        "attendance_batch_size": (
+            int(os.getenv("ATTENDANCE_BATCH_SIZE", "500"))
+            if os.getenv("ATTENDANCE_WRITE_BEHIND", "false").lower() == "true" else 0
+        ),
+        "attendance_batch_delay": float(os.getenv("ATTENDANCE_BATCH_DELAY_MS", "5")) / 1000,
+        "attendance_queue_size": int(os.getenv("ATTENDANCE_QUEUE_SIZE", "10000")),
+    },
+)
+startup_stats = {"import_ms": None, "db_connect_ms": None, "ready_ms": None}
+
+async def load_live_event(event_id: str):
+    return await repo.get_event(event_id)
+
+# GET /events/{id}/live aboneleri; değişiklikler LIVE_COALESCE_MS içinde birleştirilir.
+# Diğer worker/instance'ların yazdıkları MongoDB change stream'i ile alınır (replica set gerekir).
+LIVE_CHANGE_STREAMS = os.getenv("LIVE_CHANGE_STREAMS", "false").lower() == "true"
+live_updates = live.LiveUpdates(
+    load_live_event,
+    event_to_wire,
+    coalesce=float(os.getenv("LIVE_COALESCE_MS", "50")) / 1000,
+    heartbeat=float(os.getenv("LIVE_HEARTBEAT", "15")),
+)
+
+# Test için mock etkinlik kayıtları ekle
 def add_test_attendance_data():
-    global mock_attendances, mock_events
-    
-    # Test etkinlikleri ekle
+    # Test etkinlikleri ekle; id'ler diğer backend'lerdeki gibi ObjectId biçiminde (cursor olarak kullanılır)
     mock_events = [
         {
-            "id": "test-event-1",
+            "id": "000000000000000000000001",
             "title": "Yazılım Geliştirme Meetup",
             "description": "Modern web teknolojileri hakkında konuşacağız. React, Next.js ve backend teknolojileri tartışılacak.",
             "date": datetime.now() + timedelta(days=7),
@@ -129,7 +452,7 @@ def add_test_attendance_data():
             "updated_at": datetime.now()
         },
         {
-            "id": "test-event-2", 
+            "id": "000000000000000000000002", 
             "title": "Startup Networking Etkinliği",
             "description": "Girişimciler ve yatırımcılar bir araya geliyor. Networking fırsatları ve mentorluk.",
             "date": datetime.now() + timedelta(days=14),
@@ -141,7 +464,7 @@ def add_test_attendance_data():
             "updated_at": datetime.now()
         },
         {
-            "id": "test-event-3",
+            "id": "000000000000000000000003",
             "title": "Müzik Festivali",
             "description": "Yerel sanatçıların performansları ve canlı müzik. Açık hava etkinliği.",
             "date": datetime.now() + timedelta(days=21),
@@ -154,49 +477,209 @@ def add_test_attendance_data():
         }
     ]
     
-    # Test kullanıcısı için attendance kayıtları (kullanıcı ID'si dinamik olacak)
-    mock_attendances = []
-    print(f"Mock data eklendi: {len(mock_events)} etkinlik hazır")
+    # Test kullanıcısı için attendance kayıtları dinamik olarak (join ile) oluşur
+    repo.load_events(mock_events)
+    logger.info("Mock data eklendi", extra={"events": len(mock_events)})
 
-# Test data'yı ekle
-add_test_attendance_data()
+# Test data'yı ekle (MongoDB'ye geçilene kadar kullanılır)
+if isinstance(repo, MemoryRepository):
+    add_test_attendance_data()
 
 # Helper functions
+def verify_token(token: str) -> dict:
+    """Token'ı doğrular ve kullanıcı claim'lerini döndürür; geçersizse ``jwt.JWTError`` fırlatır.
+
+    Sonuç token cache'ten gelir ya da decode edilip cache'e yazılır; admission
+    middleware'i ve ``get_current_user`` aynı cache'i paylaşır.
+    """
+    # İptal edilen (çıkış yapılmış) token'lar cache'e ve decode'a hiç ulaşmaz
+    if token_cache.is_revoked(token):
+        raise jwt.JWTError("Token iptal edilmiş")
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
+    # JWT token'ı decode et
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise jwt.JWTError("Token'da sub yok")
+
+    user = {
+        "id": user_id,
+        "email": payload.get("email"),
+        "name": payload.get("name"),
+        "role": payload.get("role", "USER")
+    }
+    # Sadece doğrulanmış token'lar cache'lenir; exp varsa cache süresini sınırlar
+    token_cache.put(token, user, payload.get("exp"))
+    return user
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        # JWT token'ı decode et
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        email = payload.get("email")
-        name = payload.get("name")
-        role = payload.get("role", "USER")
-        
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Geçersiz token")
-        
-        return {
-            "id": user_id,
-            "email": email,
-            "name": name,
-            "role": role
-        }
+        return dict(verify_token(credentials.credentials))
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token süresi dolmuş")
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Geçersiz token")
     except Exception as e:
         # Debug için geçici olarak mock user döndür
-        print(f"Token decode hatası: {e}")
+        logger.warning("Token decode hatası", extra={"error": str(e)})
         return {"id": "1", "email": "test@test.com", "role": "USER"}
 
+def ndjson_response(docs, to_wire):
+    """Dokümanları cursor'dan geldikçe satır satır (NDJSON) gönderir."""
+    async def body():
+        async for doc in docs:
+            yield orjson.dumps(to_wire(doc)) + b"\n"
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+ATTENDEE_EXPORT_FIELDS = ("user_id", "name", "email", "joined_at")
+
+def csv_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    value = str(value)
+    # Tablo programlarında formül olarak çalıştırılmasın (CSV injection)
+    if value.startswith(("=", "+", "-", "@", "\t", "\r")):
+        return "'" + value
+    return value
+
+def attendees_csv(batches, header: bool):
+    """Her batch tek bir parça olarak yazılır; bellekte bir batch'ten fazlası tutulmaz."""
+    async def body():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            # BOM, Excel'in Türkçe karakterleri UTF-8 olarak okuması için
+            buffer.write("\ufeff")
+            writer.writerow(ATTENDEE_EXPORT_FIELDS)
+        async for batch in batches:
+            writer.writerows([csv_cell(row[field]) for field in ATTENDEE_EXPORT_FIELDS] for row in batch)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    return body()
+
+def attendees_ndjson(batches):
+    async def body():
+        async for batch in batches:
+            yield b"".join(
+                orjson.dumps({field: row[field] for field in ATTENDEE_EXPORT_FIELDS}) + b"\n" for row in batch
+            )
+    return body()
+
+def next_cursor_headers(page: list, limit: int) -> dict:
+    # Sayfa doluysa bir sonraki sayfa için cursor header'da döner
+    if len(page) == limit:
+        return {"X-Next-Cursor": page[-1]["id"]}
+    return {}
+
 # Routes
 @app.get("/")
 async def root():
     return {"message": "EventEase API'ye Hoş Geldiniz!"}
 
+def backend_name() -> str:
+    if isinstance(repo, MongoRepository):
+        return "mongodb"
+    return "sqlite" if isinstance(repo, SqlRepository) else "memory"
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now()}
+    return {
+        "status": "healthy" if mongo.available or STORAGE_BACKEND != "mongo" else "degraded",
+        "timestamp": datetime.now(),
+        "database": {
+            "backend": backend_name(),
+            **(mongo.stats() if STORAGE_BACKEND == "mongo" else {}),
+        },
+        "startup": startup_stats,
+        "token_cache": token_cache.stats(),
+        "password_pool": password_hasher.stats(),
+        "event_cache": event_cache.stats(),
+        "live": live_updates.stats(),
+        "admission": admission.stats(),
+        "loop_lag": loop_lag_monitor.stats()
+    }
+
+# /debug endpoint'leri JWT rolüne değil ayrı bir sırra bağlıdır (/auth/validate istenen rolle
+# token üretebilir). DEBUG_TOKEN verilmezse endpoint'ler kapalıdır (404).
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN") or None
+
+def require_debug_token(x_debug_token: Optional[str] = Header(None)):
+    if DEBUG_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_debug_token is None or not hmac.compare_digest(x_debug_token.encode(), DEBUG_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Bu işlem için yetkiniz yok")
+
+@app.get("/debug/db-stats", dependencies=[Depends(require_debug_token)])
+async def db_stats():
+    """Route bazında MongoDB komut sayısı, toplam süre ve en yavaş komut"""
+    return db_route_stats.snapshot()
+
+@app.get("/debug/profiling", dependencies=[Depends(require_debug_token)])
+async def profiling_status():
+    """Profil durumu, kaydedilen profil dosyaları ve event loop bloklanma sayaçları"""
+    return {"profiler": request_profiler.stats(), "loop_lag": loop_lag_monitor.stats()}
+
+@app.post("/debug/profiling", dependencies=[Depends(require_debug_token)])
+async def arm_profiling(request: ProfilingRequest):
+    """Sonraki N isteği (istenirse sadece path_prefix ile başlayanları) profiller"""
+    request_profiler.arm(request.requests, request.mode, request.path_prefix)
+    return request_profiler.stats()
+
+@app.delete("/debug/profiling", dependencies=[Depends(require_debug_token)])
+async def disarm_profiling():
+    request_profiler.disarm()
+    return request_profiler.stats()
+
+@app.get("/debug/profiling/{name}", dependencies=[Depends(require_debug_token)])
+async def download_profile(name: str):
+    """Kaydedilmiş bir profil dosyasını indirir (.prof: pstats/snakeviz, .folded: flamegraph)"""
+    path = request_profiler.path(name)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profil bulunamadı")
+    return FileResponse(path, filename=name, media_type="application/octet-stream")
+
+def component_metrics():
+    """Cache, parola havuzu ve DB sayaçlarını /metrics çıktısına ekler"""
+    token_stats = token_cache.stats()
+    cache_stats = event_cache.stats()
+    pool_stats = password_hasher.stats()
+    db_routes = db_route_stats.snapshot()
+    admission_stats = admission.stats()
+    return [
+        ("eventease_token_cache_lookups_total", "counter", "Token cache aramaları",
+         [({"result": "hit"}, token_stats["hits"]), ({"result": "miss"}, token_stats["misses"])]),
+        ("eventease_event_cache_lookups_total", "counter", "Etkinlik cache aramaları",
+         [({"result": "hit"}, cache_stats["hits"]), ({"result": "miss"}, cache_stats["misses"])]),
+        ("eventease_password_pool_pending", "gauge", "Bekleyen bcrypt işleri",
+         [({}, pool_stats["pending"])]),
+        ("eventease_password_pool_rejected_total", "counter", "Havuz dolu olduğu için reddedilen bcrypt işleri",
+         [({}, pool_stats["rejected"])]),
+        ("eventease_db_queries_total", "counter", "Route bazında MongoDB komut sayısı",
+         [({"route": route}, entry["queries"]) for route, entry in db_routes.items()]),
+        ("eventease_db_time_ms_total", "counter", "Route bazında MongoDB komut süresi (ms)",
+         [({"route": route}, entry["total_ms"]) for route, entry in db_routes.items()]),
+        ("eventease_admission_in_flight", "gauge", "Admission control'den geçip devam eden istekler",
+         [({}, admission_stats["in_flight"])]),
+        ("eventease_admission_rejected_total", "counter", "Admission control tarafından reddedilen istekler",
+         [({"reason": "shed"}, admission_stats["shed"]), ({"reason": "rate_limited"}, admission_stats["rate_limited"])]),
+    ]
+
+metrics_registry.add_collector(component_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metin formatında istek ve bileşen metrikleri"""
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 # NextAuth token'ını kabul eden endpoint
 @app.post("/auth/validate")
@@ -237,35 +720,43 @@ async def validate_nextauth_token(token_data: dict):
 @app.post("/users/", response_model=User, status_code=status.HTTP_201_CREATED)
 async def create_user(user: UserCreate):
     # Check if user already exists
-    existing_user = db.users.find_one({"email": user.email})
+    existing_user = await repo.find_user_by_email(user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email zaten kullanılıyor")
     
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Sunucu yoğun, lütfen tekrar deneyin", headers={"Retry-After": "1"})
+    
     # Create user document
     user_doc = {
         "name": user.name,
         "email": user.email,
-        "password": user.password,  # In real app, hash this
+        "password": hashed_password,
         "role": "USER",
         "created_at": datetime.now()
     }
     
-    result = db.users.insert_one(user_doc)
-    user_doc["id"] = str(result.inserted_id)
+    user_doc["id"] = await repo.insert_user(user_doc)
     
     return User(**user_doc)
 
 
 @app.post("/login")
 async def login(user: UserLogin):
-    db_user = db.users.find_one({"email": user.email})
+    db_user = await repo.find_user_by_email(user.email)
     if not db_user:
         raise HTTPException(status_code=400, detail="Kullanıcı bulunamadı")
-    if not bcrypt.checkpw(user.password.encode("utf-8"), db_user["password"].encode("utf-8")):
+    try:
+        password_ok = await password_hasher.verify(user.password, db_user.get("password") or "")
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Sunucu yoğun, lütfen tekrar deneyin", headers={"Retry-After": "1"})
+    if not password_ok:
         raise HTTPException(status_code=400, detail="Şifre yanlış")
     # JWT token üret
     token_data = {
-        "sub": str(db_user["_id"]),
+        "sub": db_user["id"],
         "email": db_user["email"],
         "name": db_user["name"],
         "role": db_user["role"]
@@ -273,336 +764,381 @@ async def login(user: UserLogin):
     token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
     return {"access_token": token, "token_type": "bearer"}
 
+@app.post("/logout")
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: dict = Depends(get_current_user),
+):
+    # Token doğrulandı (get_current_user); exp'e kadar bu process'te reddedilir
+    token = credentials.credentials
+    token_cache.revoke(token, jwt.get_unverified_claims(token).get("exp"))
+    return {"message": "Çıkış yapıldı"}
+
 @app.get("/users/", response_model=List[User])
-async def get_users(current_user: dict = Depends(get_current_user)):
-    users = []
-    for user in db.users.find():
-        # MongoDB ObjectId'yi string'e çevir
-        user["id"] = str(user["_id"])
-        
-        # Eksik alanları varsayılan değerlerle doldur
-        if "created_at" not in user:
-            user["created_at"] = datetime.now()
-        if "role" not in user:
-            user["role"] = "USER"
-        if "name" not in user:
-            user["name"] = "Unknown User"
-        if "email" not in user:
-            user["email"] = "unknown@example.com"
-            
-        users.append(User(**user))
-    return users
+async def get_users(
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    current_user: dict = Depends(get_current_user),
+):
+    # Cursor yanıt başlamadan doğrulanır; akış başladıktan sonraki bir hata 400'e çevrilemez
+    try:
+        check_cursor(after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if stream:
+        return ndjson_response(repo.iter_users(after, limit), user_to_wire)
+    limit = limit or DEFAULT_PAGE_SIZE
+    docs = await repo.list_users(after, limit)
+    
+    users = [user_to_wire(user) for user in docs]
+    return ORJSONResponse(users, headers=next_cursor_headers(docs, limit))
 
 # Event routes
+async def event_fields(event: EventCreate) -> dict:
+    """Koordinat verilmemişse konum metni geocoder ile çözülür; çözülemezse etkinlik koordinatsız kalır."""
+    fields = event.model_dump()
+    if fields["latitude"] is None and geocoder is not None:
+        point = await geocoder.geocode(fields["location"])
+        if point is not None:
+            fields["latitude"], fields["longitude"] = point
+    return fields
+
+async def new_event_doc(event: EventCreate, creator_id: str) -> dict:
+    now = datetime.now()
+    return {
+        **await event_fields(event),
+        "creator_id": creator_id,
+        "attendee_count": 0,
+        "created_at": now,
+        "updated_at": now
+    }
+
 @app.post("/events/", response_model=Event, status_code=status.HTTP_201_CREATED)
 async def create_event(event: EventCreate, current_user: dict = Depends(get_current_user)):
-    event_doc = {
-        **event.model_dump(),
-        "creator_id": current_user["id"],
-        "created_at": datetime.now(),
-        "updated_at": datetime.now()
-    }
+    event_doc = await new_event_doc(event, current_user["id"])
     
-    if MONGODB_AVAILABLE and db is not None:
-        result = db.events.insert_one(event_doc)
-        event_doc["id"] = str(result.inserted_id)
-    else:
-        # Mock data kullan
-        event_doc["id"] = str(uuid.uuid4())
-        mock_events.append(event_doc)
+    event_doc["id"] = await repo.insert_event(event_doc)
+    event_cache.invalidate()
     
     return Event(**event_doc)
 
+@app.post("/events/import")
+async def import_events(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+    """CSV ya da NDJSON dosyasındaki etkinlikleri toplu oluştur; hatalı satırlar raporlanır"""
+    file_format = event_import.detect_format(file.filename, file.content_type)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail="Desteklenmeyen dosya formatı (CSV ya da NDJSON bekleniyor)")
+    
+    report = event_import.ImportReport()
+    rows = event_import.read_rows(file.file, file_format, EventCreate)
+    try:
+        while True:
+            # Dosya okuma ve doğrulama thread'de, parça parça yapılır
+            chunk = await asyncio.to_thread(event_import.next_chunk, rows, EventCreate, report)
+            if chunk is None:
+                break
+            if chunk:
+                await repo.insert_events([await new_event_doc(event, current_user["id"]) for event in chunk])
+                report.imported += len(chunk)
+    except event_import.ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=f"{e} ({report.imported} etkinlik içe aktarıldı)")
+    finally:
+        if report.imported:
+            event_cache.invalidate()
+    
+    logger.info("Etkinlik import'u", extra={"imported": report.imported, "failed": report.failed})
+    return report.to_dict()
+
 @app.get("/events/", response_model=List[Event])
-async def get_events():
-    events = []
+async def get_events(
+    request: Request,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    creator_id: Optional[str] = None,
+    stream: bool = False,
+):
+    query = event_query(date_from, date_to, creator_id)
+    # Stream modunda limit verilmezse tüm koleksiyon sabit bellekle gönderilir
+    page_size = limit if stream else (limit or DEFAULT_PAGE_SIZE)
     
-    if MONGODB_AVAILABLE and db is not None:
-        for event in db.events.find():
-            # MongoDB ObjectId'yi string'e çevir
-            event["id"] = str(event["_id"])
-            
-            # Eksik alanları varsayılan değerlerle doldur
-            if "created_at" not in event:
-                event["created_at"] = datetime.now()
-            if "updated_at" not in event:
-                event["updated_at"] = datetime.now()
-            if "creator_id" not in event:
-                event["creator_id"] = "unknown"
-            if "is_public" not in event:
-                event["is_public"] = True
-                
-            events.append(Event(**event))
-    else:
-        # Mock data kullan
-        for event in mock_events:
-            events.append(Event(**event))
+    cache_key = (after, page_size, date_from, date_to, creator_id)
+    if not stream:
+        # Cache'teki sayfa için DB'ye ve serialize işlemine gerek kalmaz (304 dahil)
+        cached = event_cache.get_list(cache_key)
+        if cached is not None:
+            return cache.to_response(request, cached)
     
-    return events
+    try:
+        check_cursor(after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    version = event_cache.version
+    if stream:
+        request.scope[BUDGET_SCOPE_KEY] = None
+        return ndjson_response(repo.iter_events(query, after, page_size), event_to_wire)
+    docs = await repo.list_events(query, after, page_size)
+    
+    entry = cache.make_entry(
+        orjson.dumps([event_to_wire(event) for event in docs]),
+        next_cursor_headers(docs, page_size),
+    )
+    return cache.to_response(
+        request, event_cache.put_list(cache_key, entry, version, [event["id"] for event in docs])
+    )
 
 @app.get("/events/my", response_model=List[Event])
 async def get_my_events(current_user: dict = Depends(get_current_user)):
     events = []
     
-    if MONGODB_AVAILABLE and db is not None:
-        for event in db.events.find({"creator_id": current_user["id"]}):
-            # MongoDB ObjectId'yi string'e çevir
-            event["id"] = str(event["_id"])
-            
-            # Eksik alanları varsayılan değerlerle doldur
-            if "created_at" not in event:
-                event["created_at"] = datetime.now()
-            if "updated_at" not in event:
-                event["updated_at"] = datetime.now()
-            if "creator_id" not in event:
-                event["creator_id"] = current_user["id"]
-            if "is_public" not in event:
-                event["is_public"] = True
-                
-            events.append(Event(**event))
-    else:
-        # Mock data kullan - kullanıcının oluşturduğu etkinlikler
-        for event in mock_events:
-            if event.get("creator_id") == current_user["id"]:
-                events.append(Event(**event))
+    for event in await repo.list_events({"creator_id": current_user["id"]}):
+        event.setdefault("creator_id", current_user["id"])
+        events.append(event_to_wire(event))
     
-    return events
+    return ORJSONResponse(events)
 
 @app.get("/events/attending", response_model=List[Event])
 async def get_attending_events(current_user: dict = Depends(get_current_user)):
     # Kullanıcının katıldığı etkinlikleri bul
     events = []
     
-    print(f"Kullanıcı ID: {current_user['id']}")
-    print(f"MongoDB Available: {MONGODB_AVAILABLE}")
+    # Katılım kayıtları ve etkinlikler tek seferde (N+1 sorgu yerine) getirilir
+    for event in await repo.list_attending_events(current_user["id"]):
+        events.append(event_to_wire(event))
     
-    if MONGODB_AVAILABLE and db is not None:
-        # Kullanıcının attendance kayıtlarını bul
-        attendance_records = db.attendances.find({"user_id": current_user["id"]})
-        
-        for attendance in attendance_records:
-            # Her attendance kaydı için etkinliği bul
-            event = db.events.find_one({"_id": ObjectId(attendance["event_id"])})
-            if event:
-                # MongoDB ObjectId'yi string'e çevir
-                event["id"] = str(event["_id"])
-                
-                # Eksik alanları varsayılan değerlerle doldur
-                if "created_at" not in event:
-                    event["created_at"] = datetime.now()
-                if "updated_at" not in event:
-                    event["updated_at"] = datetime.now()
-                if "creator_id" not in event:
-                    event["creator_id"] = "unknown"
-                if "is_public" not in event:
-                    event["is_public"] = True
-                    
-                events.append(Event(**event))
-    else:
-        # Mock data kullan - kullanıcının katıldığı etkinlikler
-        print(f"Mock attendances: {mock_attendances}")
-        user_attendances = [a for a in mock_attendances if a["user_id"] == current_user["id"]]
-        print(f"User attendances: {user_attendances}")
-        print(f"Mock events: {[e.get('id', 'no-id') for e in mock_events]}")
-        
-        for attendance in user_attendances:
-            event = next((e for e in mock_events if e["id"] == attendance["event_id"]), None)
-            if event:
-                events.append(Event(**event))
+    logger.debug("Katılınan etkinlikler listelendi", extra={"user_id": current_user["id"], "events": len(events)})
+    return ORJSONResponse(events)
+
+@app.get("/events/upcoming", response_model=List[Event])
+async def get_upcoming_events(
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    # Herkese açık, tarihi gelmemiş etkinlikler tarih sırasıyla; cursor (date, id) çiftidir.
+    # Tarihler UTC saklandığı için "şimdi" de sunucunun yerel saatine göre değil UTC alınır.
+    try:
+        docs = await repo.list_upcoming(datetime.now(timezone.utc), after, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    headers = {"X-Next-Cursor": date_cursor(docs[-1])} if len(docs) == limit else {}
+    return ORJSONResponse([event_to_wire(event) for event in docs], headers=headers)
+
+@app.get("/events/search", response_model=List[EventSearchResult])
+async def search_events(
+    q: str = Query(..., min_length=1, max_length=200),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    is_public: Optional[bool] = None,
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+):
+    # Başlık, açıklama ve konumda arar; Türkçe karakterler normalize edilir (İ/ı -> i)
+    terms = search.query_terms(q)
+    if not terms:
+        return ORJSONResponse([])
     
-    print(f"Returning {len(events)} events for user {current_user['id']}")
-    return events
+    docs = await repo.search_events(terms, event_query(date_from, date_to, is_public=is_public), offset, limit)
+    headers = {"X-Next-Offset": str(offset + limit)} if len(docs) == limit else {}
+    return ORJSONResponse([search_result_to_wire(doc) for doc in docs], headers=headers)
+
+@app.get("/events/nearby", response_model=List[EventNearbyResult])
+async def nearby_events(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(DEFAULT_NEARBY_RADIUS_KM, gt=0, le=MAX_NEARBY_RADIUS_KM),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    is_public: Optional[bool] = None,
+    limit: int = Query(NEARBY_PAGE_SIZE, ge=1, le=MAX_NEARBY_PAGE_SIZE),
+):
+    # (lat, lng) noktasına radius km içindeki koordinatlı etkinlikler, yakından uzağa
+    docs = await repo.nearby_events(lat, lng, radius, event_query(date_from, date_to, is_public=is_public), limit)
+    return ORJSONResponse([nearby_result_to_wire(doc) for doc in docs])
 
 @app.get("/events/{event_id}", response_model=Event)
-async def get_event(event_id: str):
-    if MONGODB_AVAILABLE and db is not None:
-        event = db.events.find_one({"_id": ObjectId(event_id)})
-        if not event:
-            raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
-        event["id"] = str(event["_id"])
-    else:
-        # Mock data kullan
-        event = next((e for e in mock_events if e["id"] == event_id), None)
-        if not event:
-            raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
+async def get_event(event_id: str, request: Request):
+    cached = event_cache.get_event(event_id)
+    if cached is not None:
+        return cache.to_response(request, cached)
+    
+    version = event_cache.version
+    event = await repo.get_event(event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
     
-    return Event(**event)
+    entry = cache.make_entry(orjson.dumps(event_to_wire(event)))
+    return cache.to_response(request, event_cache.put_event(event_id, entry, version))
 
 @app.put("/events/{event_id}", response_model=Event)
 async def update_event(event_id: str, event: EventCreate, current_user: dict = Depends(get_current_user)):
-    if MONGODB_AVAILABLE and db is not None:
-        # Check if event exists and user is creator
-        existing_event = db.events.find_one({"_id": ObjectId(event_id)})
-        if not existing_event:
-            raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
-        
-        if existing_event["creator_id"] != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Bu etkinliği düzenleme yetkiniz yok")
-        
-        update_data = {
-            **event.model_dump(),
-            "updated_at": datetime.now()
-        }
-        
-        db.events.update_one(
-            {"_id": ObjectId(event_id)},
-            {"$set": update_data}
-        )
-        
-        updated_event = db.events.find_one({"_id": ObjectId(event_id)})
-        updated_event["id"] = str(updated_event["_id"])
-    else:
-        # Mock data kullan
-        existing_event = next((e for e in mock_events if e["id"] == event_id), None)
-        if not existing_event:
-            raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
-        
-        if existing_event["creator_id"] != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Bu etkinliği düzenleme yetkiniz yok")
-        
-        # Update mock event
-        existing_event.update({
-            **event.model_dump(),
-            "updated_at": datetime.now()
-        })
-        updated_event = existing_event
+    # Check if event exists and user is creator
+    existing_event = await repo.get_event(event_id)
+    if not existing_event:
+        raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
+    
+    if existing_event["creator_id"] != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Bu etkinliği düzenleme yetkiniz yok")
+    
+    update_data = {
+        **await event_fields(event),
+        "updated_at": datetime.now()
+    }
+    
+    updated_event = await repo.update_event(event_id, update_data)
+    if not updated_event:
+        raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
+    
+    event_cache.invalidate(event_id)
+    live_updates.publish(event_id, live.UPDATE)
     
     return Event(**updated_event)
 
 @app.delete("/events/{event_id}")
 async def delete_event(event_id: str, current_user: dict = Depends(get_current_user)):
-    if MONGODB_AVAILABLE and db is not None:
-        # Check if event exists and user is creator
-        existing_event = db.events.find_one({"_id": ObjectId(event_id)})
-        if not existing_event:
-            raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
-        
-        if existing_event["creator_id"] != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Bu etkinliği silme yetkiniz yok")
-        
-        db.events.delete_one({"_id": ObjectId(event_id)})
-    else:
-        # Mock data kullan
-        existing_event = next((e for e in mock_events if e["id"] == event_id), None)
-        if not existing_event:
-            raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
-        
-        if existing_event["creator_id"] != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Bu etkinliği silme yetkiniz yok")
-        
-        # Remove from mock data
-        mock_events[:] = [e for e in mock_events if e["id"] != event_id]
+    # Check if event exists and user is creator
+    existing_event = await repo.get_event(event_id)
+    if not existing_event:
+        raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
+    
+    if existing_event["creator_id"] != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Bu etkinliği silme yetkiniz yok")
+    
+    await repo.delete_event(event_id)
+    event_cache.invalidate_event(event_id)
+    live_updates.publish(event_id, live.DELETED)
     
     return {"message": "Etkinlik başarıyla silindi"}
 
 @app.post("/events/{event_id}/join")
 async def join_event(event_id: str, current_user: dict = Depends(get_current_user)):
-    # Etkinliğin var olup olmadığını kontrol et
-    if MONGODB_AVAILABLE and db is not None:
-        event = db.events.find_one({"_id": ObjectId(event_id)})
-        if not event:
-            raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
-        
-        # Kullanıcının zaten katılıp katılmadığını kontrol et
-        existing_attendance = db.attendances.find_one({
-            "user_id": current_user["id"],
-            "event_id": event_id
-        })
-        
-        if existing_attendance:
-            raise HTTPException(status_code=400, detail="Bu etkinliğe zaten katılmışsınız")
-        
-        # Attendance kaydı oluştur
-        attendance_doc = {
-            "user_id": current_user["id"],
-            "event_id": event_id,
-            "joined_at": datetime.now()
-        }
-        
-        db.attendances.insert_one(attendance_doc)
-    else:
-        # Mock data kontrol
-        event = next((e for e in mock_events if e["id"] == event_id), None)
-        if not event:
-            raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
-        
-        # Kullanıcının zaten katılıp katılmadığını kontrol et
-        existing_attendance = next((a for a in mock_attendances 
-                                  if a["user_id"] == current_user["id"] and a["event_id"] == event_id), None)
-        
-        if existing_attendance:
-            raise HTTPException(status_code=400, detail="Bu etkinliğe zaten katılmışsınız")
-        
-        # Mock attendance kaydı oluştur
-        mock_attendances.append({
-            "user_id": current_user["id"],
-            "event_id": event_id,
-            "joined_at": datetime.now()
-        })
-        print(f"Kullanıcı {current_user['id']} etkinlik {event_id}'ye katıldı")
-        print(f"Toplam attendance kaydı: {len(mock_attendances)}")
+    # Attendance kaydı oluştur; kontenjan ve tekrar katılım kontrolü repository'de atomik yapılır
+    attendance_doc = {
+        "user_id": current_user["id"],
+        "event_id": event_id,
+        "joined_at": datetime.now()
+    }
+    
+    try:
+        result = await repo.join_event(attendance_doc)
+    except WriteQueueFull:
+        raise HTTPException(status_code=503, detail="Sunucu yoğun, lütfen tekrar deneyin", headers={"Retry-After": "1"})
+    if result == NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
+    if result == ALREADY_JOINED:
+        raise HTTPException(status_code=400, detail="Bu etkinliğe zaten katılmışsınız")
+    if result == FULL:
+        raise HTTPException(status_code=400, detail="Etkinlik kontenjanı dolu")
+    # attendee_count değişti
+    event_cache.invalidate_event(event_id)
+    live_updates.publish(event_id)
+    logger.debug("Etkinliğe katılındı", extra={"user_id": current_user["id"], "event_id": event_id})
     
     return {"message": "Etkinliğe başarıyla katıldınız"}
 
 @app.post("/events/{event_id}/leave")
 async def leave_event(event_id: str, current_user: dict = Depends(get_current_user)):
-    # Etkinliğin var olup olmadığını kontrol et
-    if MONGODB_AVAILABLE and db is not None:
-        event = db.events.find_one({"_id": ObjectId(event_id)})
-        if not event:
-            raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
-        
-        # Kullanıcının katılıp katılmadığını kontrol et
-        existing_attendance = db.attendances.find_one({
-            "user_id": current_user["id"],
-            "event_id": event_id
-        })
-        
-        if not existing_attendance:
-            raise HTTPException(status_code=400, detail="Bu etkinliğe katılmamışsınız")
-        
-        # Attendance kaydını sil
-        db.attendances.delete_one({
-            "user_id": current_user["id"],
-            "event_id": event_id
-        })
-    else:
-        # Mock data kontrol
-        event = next((e for e in mock_events if e["id"] == event_id), None)
-        if not event:
-            raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
-        
-        # Kullanıcının katılıp katılmadığını kontrol et
-        existing_attendance = next((a for a in mock_attendances 
-                                  if a["user_id"] == current_user["id"] and a["event_id"] == event_id), None)
-        
-        if not existing_attendance:
-            raise HTTPException(status_code=400, detail="Bu etkinliğe katılmamışsınız")
-        
-        # Mock attendance kaydını sil
-        mock_attendances[:] = [a for a in mock_attendances 
-                             if not (a["user_id"] == current_user["id"] and a["event_id"] == event_id)]
+    # Attendance kaydını sil; silinen kayıt yoksa kullanıcı katılmamıştır
+    result = await repo.leave_event(current_user["id"], event_id)
+    if result == NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
+    if result == NOT_ATTENDING:
+        raise HTTPException(status_code=400, detail="Bu etkinliğe katılmamışsınız")
+    event_cache.invalidate_event(event_id)
+    live_updates.publish(event_id)
     
     return {"message": "Etkinlikten başarıyla ayrıldınız"}
 
+@app.get("/events/{event_id}/attendees.{export_format}")
+async def export_attendees(
+    request: Request,
+    event_id: str,
+    export_format: Literal["csv", "ndjson"],
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: dict = Depends(get_current_user),
+):
+    """Check-in için katılımcı listesi; sadece etkinliği oluşturan indirebilir.
+
+    Satırlar user_id sırasıyla üretildikçe gönderilir. Yarıda kalan bir indirme, alınan
+    son satırın user_id'si ``?after=`` ile verilerek kaldığı yerden devam ettirilir.
+    """
+    event = await repo.get_event(event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
+    if event["creator_id"] != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Bu etkinliğin katılımcılarını görme yetkiniz yok")
+    
+    # Sorgu bütçesi batch sayısıyla büyür: etkinlik + batch başına katılım (find/getMore) ve
+    # kullanıcı ($in) sorgusu + cursor'ı bitiren son getMore / killCursors
+    batch_count = math.ceil(event.get("attendee_count", 0) / STREAM_BATCH_SIZE)
+    request.scope[BUDGET_SCOPE_KEY] = 3 + 2 * batch_count
+    batches = repo.iter_attendee_batches(event_id, after, limit)
+    headers = {
+        "Content-Disposition": f'attachment; filename="attendees-{event_id}.{export_format}"',
+        "X-Attendee-Count": str(event.get("attendee_count", 0)),
+    }
+    if export_format == "csv":
+        # Devam isteklerinde başlık satırı tekrar gönderilmez; parçalar doğrudan birleştirilebilir
+        return StreamingResponse(attendees_csv(batches, after is None), media_type="text/csv; charset=utf-8", headers=headers)
+    return StreamingResponse(attendees_ndjson(batches), media_type="application/x-ndjson", headers=headers)
+
+@app.get("/events/{event_id}/live")
+async def live_event(event_id: str):
+    """Katılımcı sayısı ve etkinlik güncellemelerini Server-Sent Events olarak gönderir"""
+    # Snapshot'tan önce abone olunur; arada yapılan değişiklikler kaçmaz
+    subscription = live_updates.subscribe(event_id)
+    try:
+        event = await repo.get_event(event_id)
+    except Exception:
+        subscription.close()
+        raise
+    if not event:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="Etkinlik bulunamadı")
+    
+    return StreamingResponse(
+        subscription.stream(event_to_wire(event)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/events/attendance-status")
+async def attendance_status(request: EventIdList, current_user: dict = Depends(get_current_user)):
+    """Birden fazla etkinlik için katılım durumunu tek sorguda döndür"""
+    event_ids = list(dict.fromkeys(request.event_ids))
+    statuses = await repo.attendance_statuses(current_user["id"], event_ids)
+    
+    return {"statuses": statuses}
+
+@app.post("/events/bulk-attendance")
+async def bulk_attendance(request: BulkAttendanceRequest, current_user: dict = Depends(get_current_user)):
+    """Birden fazla etkinliğe toplu katıl / ayrıl; her etkinlik için ayrı sonuç döner"""
+    event_ids = list(dict.fromkeys(request.event_ids))
+    if request.action == "join":
+        results = await repo.bulk_join(current_user["id"], event_ids)
+    else:
+        results = await repo.bulk_leave(current_user["id"], event_ids)
+    
+    # attendee_count değişen etkinliklerin cache'i düşer
+    for event_id, result in results.items():
+        if result in (JOINED, LEFT):
+            event_cache.invalidate_event(event_id)
+            live_updates.publish(event_id)
+    
+    return {"results": [{"event_id": event_id, "status": result} for event_id, result in results.items()]}
+
 @app.get("/events/{event_id}/is-attending")
 async def check_attendance(event_id: str, current_user: dict = Depends(get_current_user)):
     """Kullanıcının belirli bir etkinliğe katılıp katılmadığını kontrol et"""
     
-    if MONGODB_AVAILABLE and db is not None:
-        # Attendance kaydını kontrol et
-        attendance = db.attendances.find_one({
-            "user_id": current_user["id"],
-            "event_id": event_id
-        })
-        
-        return {"is_attending": attendance is not None}
-    else:
-        # Mock data kontrol
-        attendance = next((a for a in mock_attendances 
-                          if a["user_id"] == current_user["id"] and a["event_id"] == event_id), None)
-        
-        return {"is_attending": attendance is not None}
+    attendance = await repo.find_attendance(current_user["id"], event_id)
+    
+    return {"is_attending": attendance is not None}
+
+startup_stats["import_ms"] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 2)
 
 if __name__ == "__main__":
     import uvicorn
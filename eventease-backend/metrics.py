@@ -0,0 +1,142 @@
+"""İstek metrikleri ve Prometheus metin formatında ``/metrics`` çıktısı.
+
+``MetricsMiddleware`` her isteğin süresini route şablonu bazında histogram'a
+yazar, devam eden istek sayısını ve 5xx/exception hatalarını sayar. Diğer
+bileşenler (cache'ler, DB sayaçları) ``add_collector`` ile kendi değerlerini
+ekleyebilir.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (metrik adı, tip, açıklama, [(label'lar, değer), ...])
+Sample = Tuple[Dict[str, str], float]
+MetricFamily = Tuple[str, str, str, List[Sample]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.in_flight = 0
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        self._collectors.append(collector)
+
+    def observe(self, method: str, route: str, status: int, duration: float, error: bool) -> None:
+        with self._lock:
+            key = (method, route)
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = Histogram()
+            histogram.observe(duration)
+            request_key = (method, route, str(status))
+            self._requests[request_key] = self._requests.get(request_key, 0) + 1
+            if error:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_in_flight Şu anda işlenen istek sayısı",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.in_flight}",
+                "# HELP http_requests_total Tamamlanan istek sayısı",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), value in sorted(self._requests.items()):
+                lines.append(f"http_requests_total{_labels({'method': method, 'route': route, 'status': status})} {value}")
+            lines += [
+                "# HELP http_request_errors_total 5xx yanıt ya da exception ile biten istekler",
+                "# TYPE http_request_errors_total counter",
+            ]
+            for (method, route), value in sorted(self._errors.items()):
+                lines.append(f"http_request_errors_total{_labels({'method': method, 'route': route})} {value}")
+            lines += [
+                "# HELP http_request_duration_seconds İstek süresi",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self._latency.items()):
+                labels = {"method": method, "route": route}
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f"http_request_duration_seconds_bucket{_labels({**labels, 'le': str(bound)})} {cumulative}")
+                lines.append(f"http_request_duration_seconds_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+                lines.append(f"http_request_duration_seconds_sum{_labels(labels)} {histogram.total}")
+                lines.append(f"http_request_duration_seconds_count{_labels(labels)} {histogram.count}")
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+                lines += [f"{name}{_labels(labels)} {value}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Saf ASGI middleware; streaming yanıtlarda süre gövde bitene kadar ölçülür."""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        error = False
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.registry.in_flight -= 1
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.registry.observe(
+                scope["method"], route, status, time.perf_counter() - start, error or status >= 500
+            )
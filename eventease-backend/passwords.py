@@ -0,0 +1,67 @@
+"""bcrypt hash/doğrulama işlemleri için sınırlı boyutlu worker havuzu.
+
+Tek bir ``bcrypt.checkpw`` çağrısı 100-300 ms CPU harcar. Bu iş event loop
+yerine ayrı bir thread havuzunda yapılır (bcrypt çalışırken GIL'i bırakır).
+Havuz ve kuyruk doluysa istek beklemeden ``PasswordPoolBusy`` ile reddedilir.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+import bcrypt
+
+# bcrypt sadece ilk 72 byte'ı kullanır; bcrypt 5 daha uzun şifreleri ValueError ile reddeder
+MAX_PASSWORD_BYTES = 72
+
+
+class PasswordPoolBusy(Exception):
+    """Havuzdaki tüm worker'lar ve kuyruk dolu."""
+
+
+class PasswordHasher:
+    def __init__(self, max_workers: int = 2, max_queue: int = 32, rounds: int = 12):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self.rejected = 0
+        # Çalışan + kuyrukta bekleyen iş sayısı; sadece event loop thread'inden değişir
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    async def _submit(self, fn, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordPoolBusy()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(self.rounds)).decode("utf-8")
+
+    @staticmethod
+    def _verify(password: str, hashed: str) -> bool:
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+        except ValueError:
+            # bcrypt formatında olmayan (eski, düz metin) kayıtlar eşleşmez
+            return False
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self._hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(self._verify, password, hashed)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,296 @@
+"""İstek bazında profil çıkarma ve event loop bloklanma (stall) tespiti.
+
+Sync pymongo, bcrypt ya da ``print`` gibi loop'u bloklayan çağrılar tek bir isteği
+değil, o sırada çalışan tüm istekleri yavaşlatır. İki araç bunları production'da
+bulmayı sağlar; ikisi de kapalıyken neredeyse hiç maliyeti yoktur:
+
+- ``ProfilingMiddleware``: ``X-Profile: <PROFILE_TOKEN>`` header'ı ile ya da admin
+  endpoint'i ile "sonraki N istek" için kurulduğunda tek bir isteği cProfile ile
+  (``.prof``, ``snakeviz``/``pstats`` ile açılır) ya da örnekleyen profiler ile
+  (``.folded``, flamegraph formatı) profiller ve sonucu diske yazar. Aynı anda tek
+  istek profillenir; cProfile loop thread'inde çalışan her şeyi ölçtüğü için o
+  sırada araya giren diğer isteklerin işi de profile girer.
+- ``LoopLagMonitor``: loop'ta periyodik bir timer ve ayrı bir izleme thread'i
+  çalıştırır. Timer ``threshold`` süresinden uzun gecikirse izleme thread'i loop
+  thread'inin o anki stack'ini loglar; yani loop'u tutan kod yakalanır.
+"""
+import asyncio
+import contextvars
+import cProfile
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger("eventease.profiling")
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+MODES = (CPROFILE, SAMPLE)
+EXTENSIONS = {CPROFILE: ".prof", SAMPLE: ".folded"}
+_UNSAFE = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _collapse(frame) -> str:
+    # Flamegraph "collapsed stack" formatı: kökten yaprağa ``;`` ile ayrılmış çerçeveler
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class StackSampler:
+    """Bir thread'in stack'ini ``interval`` aralıklarla örnekler (loop thread'ini hiç durdurmaz)."""
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_collapse(frame)] += 1
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """Profil tetikleme durumu ve kaydedilen dosyalar; sadece event loop thread'inden kullanılır."""
+
+    def __init__(
+        self,
+        directory: str = "profiles",
+        token: Optional[str] = None,
+        max_files: int = 100,
+        sample_interval: float = 0.001,
+    ):
+        self.directory = directory
+        self.token = token.encode() if token else None
+        self.max_files = max_files
+        self.sample_interval = sample_interval
+        self._armed = 0
+        self._armed_mode = CPROFILE
+        self._path_prefix: Optional[str] = None
+        self._active = False
+        self._files: Deque[str] = deque()
+        self.profiled = 0
+        self.skipped = 0
+
+    def arm(self, requests: int, mode: str = CPROFILE, path_prefix: Optional[str] = None) -> None:
+        """Sonraki ``requests`` isteği (istenirse sadece ``path_prefix`` ile başlayanları) profiller."""
+        self._armed, self._armed_mode, self._path_prefix = requests, mode, path_prefix
+
+    def disarm(self) -> None:
+        self._armed = 0
+
+    def wants(self, scope) -> Optional[str]:
+        """İstek profillenecekse modu döndürür."""
+        if self.token is not None:
+            headers = dict(scope["headers"])
+            if hmac.compare_digest(headers.get(b"x-profile", b""), self.token):
+                mode = headers.get(b"x-profile-mode", CPROFILE.encode()).decode("latin-1")
+                return mode if mode in MODES else CPROFILE
+        if self._armed and (self._path_prefix is None or scope["path"].startswith(self._path_prefix)):
+            self._armed -= 1
+            return self._armed_mode
+        return None
+
+    def start(self, scope, mode: str):
+        """Profili başlatır; başka bir istek profilleniyorsa ``None`` döner."""
+        if self._active:
+            self.skipped += 1
+            return None
+        self._active = True
+        if mode == SAMPLE:
+            collector = StackSampler(threading.get_ident(), self.sample_interval)
+            collector.start()
+        else:
+            collector = cProfile.Profile()
+            collector.enable()
+        name = "{}-{}-{}{}".format(
+            datetime.now().strftime("%Y%m%d-%H%M%S-%f"),
+            scope["method"],
+            _UNSAFE.sub("_", scope["path"]).strip("_")[:60] or "root",
+            EXTENSIONS[mode],
+        )
+        return collector, name
+
+    async def finish(self, collector, name: str, elapsed: float) -> None:
+        if isinstance(collector, StackSampler):
+            collector.stop()
+        else:
+            collector.disable()
+        self._active = False
+        # Dosya yazma loop'u bloklamasın
+        await asyncio.to_thread(self._save, collector, name)
+        self.profiled += 1
+        logger.info("İstek profili kaydedildi", extra={"file": name, "duration_ms": round(elapsed * 1000, 2)})
+
+    def _save(self, collector, name: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if isinstance(collector, StackSampler):
+            collector.dump(os.path.join(self.directory, name))
+        else:
+            collector.dump_stats(os.path.join(self.directory, name))
+        self._files.append(name)
+        while len(self._files) > self.max_files:
+            try:
+                os.remove(os.path.join(self.directory, self._files.popleft()))
+            except OSError:
+                pass
+
+    def path(self, name: str) -> Optional[str]:
+        """Bu süreçte kaydedilmiş bir profilin yolu; bilinmeyen isimler için ``None``."""
+        return os.path.join(self.directory, name) if name in self._files else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "armed": self._armed,
+            "mode": self._armed_mode,
+            "path_prefix": self._path_prefix,
+            "header_enabled": self.token is not None,
+            "profiled": self.profiled,
+            "skipped": self.skipped,
+            "files": list(self._files),
+        }
+
+
+class ProfilingMiddleware:
+    """Profillenen isteklerin yanıtına dosya adını ``X-Profile-File`` header'ı olarak ekler."""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        profiler = self.profiler
+        # Hızlı yol: header kapalı ve kurulu profil yoksa hiçbir iş yapılmaz
+        if scope["type"] != "http" or (profiler.token is None and not profiler._armed):
+            await self.app(scope, receive, send)
+            return
+        mode = profiler.wants(scope)
+        started = profiler.start(scope, mode) if mode is not None else None
+        if started is None:
+            await self.app(scope, receive, send)
+            return
+
+        collector, name = started
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-file", name.encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            await profiler.finish(collector, name, time.perf_counter() - start)
+
+
+class LoopLagMonitor:
+    """Event loop'un ``threshold`` saniyeden uzun bloklandığı anları stack'iyle loglar."""
+
+    def __init__(self, threshold: float = 0.05, interval: Optional[float] = None, stack_limit: int = 30):
+        self.threshold = threshold
+        self.interval = interval or threshold / 2
+        self.stack_limit = stack_limit
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._stop: Optional[threading.Event] = None
+        self._beat = 0.0
+        self._expected = 0.0
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.last_stall: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._stop is not None
+
+    def start(self) -> None:
+        """Loop içinden çağrılır (lifespan)."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._schedule()
+        self._stop = threading.Event()
+        threading.Thread(target=self._watch, args=(self._stop,), name="loop-lag-monitor", daemon=True).start()
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self) -> None:
+        self._expected = time.monotonic() + self.interval
+        # Timer isteklerin context'inde (ve DB sayaçlarında) çalışmasın
+        self._handle = self._loop.call_later(self.interval, self._tick, context=contextvars.Context())
+
+    def _tick(self) -> None:
+        now = time.monotonic()
+        self.max_lag = max(self.max_lag, now - self._expected)
+        self._beat = now
+        self._schedule()
+
+    def _watch(self, stop: threading.Event) -> None:
+        reported_beat = None
+        while not stop.wait(self.interval):
+            beat = self._beat
+            # Timer normalde en geç ``interval`` sonra çalışır; fazlası bloklanma süresidir
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=self.stack_limit))
+            self.stalls += 1
+            self.last_stall = {
+                "at": datetime.now().isoformat(),
+                "blocked_ms": round(blocked * 1000, 2),
+                "frame": _collapse(frame).rsplit(";", 1)[-1],
+            }
+            logger.warning(
+                "Event loop bloklandı",
+                extra={"blocked_ms": self.last_stall["blocked_ms"], "stack": stack},
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.running,
+            "threshold_ms": round(self.threshold * 1000, 2),
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "last_stall": self.last_stall,
+        }
@@ -0,0 +1,91 @@
+"""Route'ların kullandığı sorgu şekilleri için explain() raporu.
+
+Kullanım:
+    python query_audit.py            # indeksleri oluşturmadan raporla
+    python query_audit.py --ensure   # önce MONGO_INDEXES'i uygula
+
+Herhangi bir sorgu COLLSCAN ile çalışıyorsa çıkış kodu 1 olur.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo.mongo_client import MongoClient
+from pymongo.server_api import ServerApi
+
+from repository import EVENT_PROJECTION, USER_PROJECTION, MongoRepository
+
+SAMPLE_ID = ObjectId()
+SAMPLE_USER = "000000000000000000000000"
+
+# (isim, koleksiyon, filtre, projeksiyon, sıralama) - main.py'deki route'larla senkron tutulmalı
+QUERY_SHAPES = [
+    ("login / create_user: email", "users", {"email": "audit@example.com"}, None, None),
+    ("GET /users/: sayfa", "users", {"_id": {"$gt": SAMPLE_ID}}, USER_PROJECTION, [("_id", 1)]),
+    ("GET /events/: sayfa", "events", {"_id": {"$gt": SAMPLE_ID}}, EVENT_PROJECTION, [("_id", 1)]),
+    ("GET /events/: tarih filtresi", "events", {"date": {"$gte": datetime.now()}}, EVENT_PROJECTION, [("_id", 1)]),
+    ("GET /events/my: creator_id", "events", {"creator_id": SAMPLE_USER}, EVENT_PROJECTION, [("_id", 1)]),
+    ("GET /events/{id}", "events", {"_id": SAMPLE_ID}, None, None),
+    ("GET /events/upcoming", "events", {"is_public": True, "date": {"$gte": datetime.now()}, "$or": [{"date": {"$gt": datetime.now()}}, {"date": datetime.now(), "_id": {"$gt": SAMPLE_ID}}]}, EVENT_PROJECTION, [("date", 1), ("_id", 1)]),
+    ("GET /events/search", "events", {"$text": {"$search": "konser"}}, {"score": {"$meta": "textScore"}}, [("score", {"$meta": "textScore"}), ("_id", 1)]),
+    # $geoNear aggregate'i explain edilemediği için aynı indeksi kullanan $nearSphere ile denetlenir
+    ("GET /events/nearby", "events", {"geo": {"$nearSphere": {"$geometry": {"type": "Point", "coordinates": [28.9784, 41.0082]}, "$maxDistance": 10000}}}, EVENT_PROJECTION, None),
+    ("GET /events/attending: katılımlar", "attendances", {"user_id": SAMPLE_USER}, {"event_id": 1, "_id": 0}, [("joined_at", 1), ("_id", 1)]),
+    ("GET /events/attending: etkinlikler", "events", {"_id": {"$in": [SAMPLE_ID]}}, None, None),
+    ("GET /events/{id}/attendees", "attendances", {"event_id": str(SAMPLE_ID), "user_id": {"$gt": SAMPLE_USER}}, {"user_id": 1, "joined_at": 1, "_id": 0}, [("user_id", 1)]),
+    ("join / leave / is-attending", "attendances", {"user_id": SAMPLE_USER, "event_id": str(SAMPLE_ID)}, None, None),
+]
+
+
+def plan_stages(plan):
+    """Explain planındaki tüm stage isimlerini (iç içe inputStage'ler dahil) toplar."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages += plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            stages += plan_stages(item)
+    return stages
+
+
+def audit(db):
+    collscans = 0
+    for name, collection, query, projection, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = plan_stages(winning_plan)
+        flag = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        collscans += flag == "COLLSCAN"
+        print(f"[{flag:<8}] {name:<40} {' <- '.join(stages)}")
+    return collscans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EventEase sorgu planı denetimi")
+    parser.add_argument("--ensure", action="store_true", help="önce indeksleri oluştur")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = MongoClient(os.getenv("DATABASE_URL"), server_api=ServerApi('1'))
+    db = client.eventease
+    if args.ensure:
+        repo = MongoRepository(db)
+        print(f"Oluşturulan indeksler: {asyncio.run(repo.ensure_indexes())}")
+        repo.close()
+
+    collscans = audit(db)
+    print(f"{len(QUERY_SHAPES)} sorgu şekli, {collscans} COLLSCAN")
+    sys.exit(1 if collscans else 0)
+
+
+if __name__ == "__main__":
+    main()
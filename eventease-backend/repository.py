@@ -0,0 +1,981 @@
+"""EventEase veri erişim katmanı.
+
+Route'lar veritabanına doğrudan değil, buradaki repository üzerinden erişir.
+Tüm metotlar ``async``'tir; senkron pymongo çağrıları event loop'u
+bloklamamak için ayrı bir thread havuzunda çalıştırılır.
+"""
+import asyncio
+import base64
+import bisect
+import contextvars
+import functools
+import itertools
+import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, GEOSPHERE, TEXT, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+from geo import GeoGrid, geo_point, has_coordinates
+from search import SEARCH_WEIGHTS, SearchIndex, search_fields
+from write_behind import BatchInserter, WriteQueueFull, unwritten
+
+logger = logging.getLogger("eventease.db")
+
+# Sadece API modellerinin ihtiyaç duyduğu alanlar sunucudan çekilir (şifre hash'i dahil değil)
+EVENT_PROJECTION = {
+    field: 1
+    for field in (
+        "title", "description", "date", "location", "max_attendees",
+        "is_public", "creator_id", "created_at", "updated_at", "attendee_count",
+        "latitude", "longitude",
+    )
+}
+USER_PROJECTION = {"name": 1, "email": 1, "role": 1, "created_at": 1}
+STREAM_BATCH_SIZE = 500
+
+# join_event / leave_event sonuçları
+JOINED = "joined"
+LEFT = "left"
+NOT_FOUND = "not_found"
+FULL = "full"
+ALREADY_JOINED = "already_joined"
+NOT_ATTENDING = "not_attending"
+
+DUPLICATE_KEY = 11000
+
+# Kontenjanı olmayan ya da attendee_count'u max_attendees'in altında kalan etkinlikler
+HAS_CAPACITY = {
+    "$or": [
+        {"max_attendees": None},
+        {"$expr": {"$lt": [{"$ifNull": ["$attendee_count", 0]}, "$max_attendees"]}},
+    ]
+}
+
+# Route'ların kullandığı filtreler için indeksler; uygulama açılışında oluşturulur.
+# attendances üzerindeki unique indeks Prisma şemasındaki @@unique([userId, eventId]) karşılığıdır.
+MONGO_INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    "events": [
+        IndexModel([("creator_id", ASCENDING), ("_id", ASCENDING)], name="creator_id_id"),
+        IndexModel([("date", ASCENDING)], name="date"),
+        # GET /events/upcoming: is_public eşitliği + (date, _id) sıralı keyset
+        IndexModel([("is_public", ASCENDING), ("date", ASCENDING), ("_id", ASCENDING)], name="is_public_date_id"),
+        # Arama, normalize edilmiş "search" alt dokümanı üzerinde çalışır; dil kuralları
+        # (stemming/stop word) kapalıdır ki sonuçlar bellek içi indeksle aynı olsun
+        IndexModel(
+            [(f"search.{field}", TEXT) for field in SEARCH_WEIGHTS],
+            weights={f"search.{field}": weight for field, weight in SEARCH_WEIGHTS.items()},
+            default_language="none",
+            name="search_text",
+        ),
+        # GET /events/nearby: $geoNear; koordinatı olmayan etkinlikler indekse girmez
+        IndexModel([("geo", GEOSPHERE)], name="geo_2dsphere"),
+    ],
+    "attendances": [
+        IndexModel([("user_id", ASCENDING), ("event_id", ASCENDING)], unique=True, name="user_event_unique"),
+        # Katılımcı export'u: event_id eşitliği + user_id sıralı keyset (event_id sorgularını da karşılar)
+        IndexModel([("event_id", ASCENDING), ("user_id", ASCENDING)], name="event_id_user_id"),
+    ],
+}
+
+
+def stored_event(event_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """MongoDB'ye yazılacak etkinlik: normalize edilmiş ``search`` ve varsa GeoJSON ``geo`` alanı eklenir."""
+    doc = {**event_doc, "search": search_fields(event_doc)}
+    point = geo_point(event_doc)
+    if point is not None:
+        doc["geo"] = point
+    return doc
+
+
+def naive_utc(value: Any) -> Any:
+    """Saat dilimli tarihleri UTC'ye çevirip naive yapar (MongoDB de aynı şekilde UTC saklar).
+
+    Naive ve saat dilimli tarihler doğrudan karşılaştırılamaz (``TypeError``); bellek içi ve
+    SQLite backend'leri karşılaştırmadan önce iki tarafı da buradan geçirir.
+    """
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def to_object_id(value: str) -> Optional[ObjectId]:
+    """Geçersiz id'lerde hata yerine None döndürür (route'lar 404 verir)."""
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+def with_id(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """MongoDB ``_id`` alanını API'nin kullandığı string ``id`` alanına kopyalar."""
+    if doc is not None:
+        doc["id"] = str(doc["_id"])
+    return doc
+
+
+def attendee_row(attendance: Dict[str, Any], user: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Katılımcı export satırı; kullanıcı kaydı silinmişse isim ve email boş kalır."""
+    return {
+        "user_id": attendance["user_id"],
+        "name": user.get("name") if user else None,
+        "email": user.get("email") if user else None,
+        "joined_at": attendance.get("joined_at"),
+    }
+
+
+def event_query(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    creator_id: Optional[str] = None,
+    is_public: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Liste filtrelerini MongoDB sorgusuna çevirir."""
+    query: Dict[str, Any] = {}
+    if date_from is not None or date_to is not None:
+        query["date"] = {}
+        if date_from is not None:
+            query["date"]["$gte"] = date_from
+        if date_to is not None:
+            query["date"]["$lte"] = date_to
+    if creator_id is not None:
+        query["creator_id"] = creator_id
+    if is_public is not None:
+        query["is_public"] = is_public
+    return query
+
+
+def check_cursor(after: Optional[str]) -> None:
+    """Id sıralı sayfaların cursor'ı bir ObjectId olmalıdır; tüm backend'ler aynı hatayı verir."""
+    if after is not None and to_object_id(after) is None:
+        raise ValueError("Geçersiz cursor")
+
+
+def keyset_query(query: Optional[Dict[str, Any]], after: Optional[str]) -> Dict[str, Any]:
+    """``after`` cursor'ından sonraki kayıtları seçen sorguyu döndürür (_id sırasıyla)."""
+    query = dict(query or {})
+    if after is not None:
+        oid = to_object_id(after)
+        if oid is None:
+            raise ValueError("Geçersiz cursor")
+        query["_id"] = {"$gt": oid}
+    return query
+
+
+def date_cursor(doc: Dict[str, Any]) -> str:
+    """Tarih sıralı sayfalar için (date, id) cursor'ı; aynı tarihli etkinlikler id ile ayrılır."""
+    raw = f"{doc['date'].isoformat()}|{doc['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def parse_date_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date, doc_id = raw.split("|", 1)
+        return datetime.fromisoformat(date), doc_id
+    except ValueError:
+        raise ValueError("Geçersiz cursor")
+
+
+class MongoRepository:
+    """Senkron pymongo koleksiyonlarını thread havuzu üzerinden await edilebilir yapar."""
+
+    def __init__(
+        self,
+        db,
+        max_workers: int = 32,
+        attendance_batch_size: int = 0,
+        attendance_batch_delay: float = 0.005,
+        attendance_queue_size: int = 10000,
+    ):
+        self.db = db
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mongo")
+        # attendance_batch_size > 0 ise join'lerin attendance insert'leri insert_many ile birleştirilir
+        self.attendance_writer: Optional[BatchInserter] = None
+        if attendance_batch_size > 0:
+            self.attendance_writer = BatchInserter(
+                db.attendances,
+                self._run,
+                on_failed=self._release_seats,
+                max_batch=attendance_batch_size,
+                max_delay=attendance_batch_delay,
+                max_queue=attendance_queue_size,
+            )
+
+    async def _run(self, fn, *args, **kwargs):
+        # contextvars kopyalanır ki istek bazlı bağlam (log, metrik) thread'e taşınsın
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, fn, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def drain(self) -> None:
+        """Kapanışta write-behind kuyruğundaki katılımları yazar."""
+        if self.attendance_writer is not None:
+            await self.attendance_writer.drain()
+
+    async def ensure_indexes(self) -> List[str]:
+        """MONGO_INDEXES'teki indeksleri oluşturur; mevcut olanlar için işlem yapılmaz."""
+        def create():
+            created = []
+            for collection_name, indexes in MONGO_INDEXES.items():
+                for index in indexes:
+                    try:
+                        created += self.db[collection_name].create_indexes([index])
+                    except OperationFailure as e:
+                        # Örn. mevcut verideki tekrar eden kayıtlar unique indeksi engelleyebilir
+                        logger.warning(
+                            "İndeks oluşturulamadı",
+                            extra={"index": f"{collection_name}.{index.document['name']}", "error": str(e)},
+                        )
+            return created
+
+        return await self._run(create)
+
+    def _find(self, collection, query, projection, after, limit):
+        cursor = collection.find(keyset_query(query, after), projection).sort("_id", ASCENDING)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    async def _iterate(self, cursor, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        # Cursor parça parça okunur; bellekte hiçbir zaman bir batch'ten fazlası tutulmaz
+        cursor.batch_size(batch_size)
+        try:
+            while True:
+                batch = await self._run(lambda: list(itertools.islice(cursor, batch_size)))
+                if not batch:
+                    break
+                for doc in batch:
+                    yield with_id(doc)
+        finally:
+            # close() açık cursor için sunucuya killCursors gönderir; loop'u bloklamasın
+            await self._run(cursor.close)
+
+    # Users
+    async def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return with_id(await self._run(self.db.users.find_one, {"email": email}))
+
+    async def insert_user(self, user_doc: Dict[str, Any]) -> str:
+        result = await self._run(self.db.users.insert_one, user_doc)
+        return str(result.inserted_id)
+
+    async def list_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        cursor = self._find(self.db.users, None, USER_PROJECTION, after, limit)
+        docs = await self._run(lambda: list(cursor))
+        return [with_id(doc) for doc in docs]
+
+    def iter_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        return self._iterate(self._find(self.db.users, None, USER_PROJECTION, after, limit))
+
+    # Events
+    async def insert_event(self, event_doc: Dict[str, Any]) -> str:
+        result = await self._run(self.db.events.insert_one, stored_event(event_doc))
+        return str(result.inserted_id)
+
+    async def insert_events(self, event_docs: List[Dict[str, Any]]) -> List[str]:
+        """Etkinlikleri tek bir insert_many ile ekler (toplu import)."""
+        result = await self._run(
+            self.db.events.insert_many,
+            [stored_event(event_doc) for event_doc in event_docs],
+            ordered=False,
+        )
+        return [str(oid) for oid in result.inserted_ids]
+
+    async def list_events(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        cursor = self._find(self.db.events, query, EVENT_PROJECTION, after, limit)
+        docs = await self._run(lambda: list(cursor))
+        return [with_id(doc) for doc in docs]
+
+    def iter_events(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        return self._iterate(self._find(self.db.events, query, EVENT_PROJECTION, after, limit))
+
+    async def search_events(
+        self,
+        terms: List[str],
+        query: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """Text indeksiyle terimlerden en az birini içeren etkinlikleri skora göre döndürür."""
+        score = {"score": {"$meta": "textScore"}}
+        cursor = (
+            self.db.events.find({**(query or {}), "$text": {"$search": " ".join(terms)}}, {**EVENT_PROJECTION, **score})
+            .sort([("score", {"$meta": "textScore"}), ("_id", ASCENDING)])
+            .skip(offset)
+            .limit(limit)
+        )
+        docs = await self._run(lambda: list(cursor))
+        return [with_id(doc) for doc in docs]
+
+    async def nearby_events(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        query: Optional[Dict[str, Any]] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """2dsphere indeksiyle yarıçap içindeki etkinlikler, yakından uzağa (``distance_km`` ile)."""
+        pipeline = [
+            {"$geoNear": {
+                "near": {"type": "Point", "coordinates": [longitude, latitude]},
+                "key": "geo",
+                "distanceField": "distance",
+                "maxDistance": radius_km * 1000,
+                "spherical": True,
+                "query": query or {},
+            }},
+            {"$limit": limit},
+            {"$project": {**EVENT_PROJECTION, "distance": 1}},
+        ]
+        docs = await self._run(lambda: list(self.db.events.aggregate(pipeline)))
+        for doc in docs:
+            doc["distance_km"] = round(doc.pop("distance") / 1000, 3)
+        return [with_id(doc) for doc in docs]
+
+    async def list_upcoming(self, now: datetime, after: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """``now`` ve sonrasındaki herkese açık etkinlikler, (date, id) sırasıyla."""
+        query: Dict[str, Any] = {"is_public": True, "date": {"$gte": now}}
+        if after is not None:
+            date, event_id = parse_date_cursor(after)
+            oid = to_object_id(event_id)
+            if oid is None:
+                raise ValueError("Geçersiz cursor")
+            query["$or"] = [{"date": {"$gt": date}}, {"date": date, "_id": {"$gt": oid}}]
+        cursor = self.db.events.find(query, EVENT_PROJECTION).sort([("date", ASCENDING), ("_id", ASCENDING)]).limit(limit)
+        docs = await self._run(lambda: list(cursor))
+        return [with_id(doc) for doc in docs]
+
+    async def get_event(self, event_id: str) -> Optional[Dict[str, Any]]:
+        oid = to_object_id(event_id)
+        if oid is None:
+            return None
+        return with_id(await self._run(self.db.events.find_one, {"_id": oid}))
+
+    async def update_event(self, event_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        oid = to_object_id(event_id)
+        if oid is None:
+            return None
+        changes: Dict[str, Any] = {"$set": {
+            **update_data,
+            # Değişen metin alanlarının normalize edilmiş hali de güncellenir
+            **{f"search.{field}": text for field, text in search_fields(update_data).items()},
+        }}
+        if "latitude" in update_data or "longitude" in update_data:
+            point = geo_point(update_data)
+            if point is not None:
+                changes["$set"]["geo"] = point
+            else:
+                changes["$unset"] = {"geo": ""}
+        updated = await self._run(
+            self.db.events.find_one_and_update,
+            {"_id": oid},
+            changes,
+            return_document=ReturnDocument.AFTER,
+        )
+        return with_id(updated)
+
+    async def delete_event(self, event_id: str) -> bool:
+        oid = to_object_id(event_id)
+        if oid is None:
+            return False
+        result = await self._run(self.db.events.delete_one, {"_id": oid})
+        return result.deleted_count > 0
+
+    # Attendances
+    async def find_attendance(self, user_id: str, event_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.db.attendances.find_one, {"user_id": user_id, "event_id": event_id})
+
+    async def join_event(self, attendance_doc: Dict[str, Any]) -> str:
+        """Kontenjan varsa attendee_count'u koşullu artırır ve katılım kaydını ekler.
+
+        Artış tek bir koşullu update ile yapıldığı için eşzamanlı katılımlar
+        kontenjanı aşamaz; tekrar katılım unique indekse takılır. Insert herhangi bir
+        nedenle başarısız olursa artış geri alınır.
+        """
+        user_id, event_id = attendance_doc["user_id"], attendance_doc["event_id"]
+        oid = to_object_id(event_id)
+        if oid is None:
+            return NOT_FOUND
+
+        def join():
+            failed = self._reserve_seat(oid, user_id, event_id)
+            if failed is not None:
+                return failed
+            try:
+                self.db.attendances.insert_one(attendance_doc)
+            except DuplicateKeyError:
+                self._release_seats([attendance_doc])
+                return ALREADY_JOINED
+            except Exception:
+                # Katılım yazılamadıysa (ağ hatası, zaman aşımı...) ayrılan kontenjan sızmasın
+                self._release_seats([attendance_doc])
+                raise
+            return JOINED
+
+        writer = self.attendance_writer
+        if writer is None:
+            return await self._run(join)
+
+        # Write-behind: kontenjan istek başına ayrılır, attendance insert'i batch'e girer
+        if writer.full:
+            writer.rejected += 1
+            raise WriteQueueFull()
+        failed = await self._run(self._reserve_seat, oid, user_id, event_id)
+        if failed is not None:
+            return failed
+        try:
+            await writer.insert(attendance_doc)
+        except DuplicateKeyError:
+            # Yazılamayan kayıtların kontenjanı batch yazılırken geri verilir (_release_seats)
+            return ALREADY_JOINED
+        except WriteQueueFull:
+            await self._run(self._release_seats, [attendance_doc])
+            raise
+        return JOINED
+
+    def _reserve_seat(self, oid: ObjectId, user_id: str, event_id: str) -> Optional[str]:
+        """Kontenjan varsa attendee_count'u artırır; başarısızsa nedenini döndürür."""
+        reserved = self.db.events.update_one({"_id": oid, **HAS_CAPACITY}, {"$inc": {"attendee_count": 1}})
+        if reserved.modified_count:
+            return None
+        # Sadece başarısız yolda: etkinlik yok mu, dolu mu, kullanıcı zaten katılmış mı?
+        if not self.db.events.count_documents({"_id": oid}, limit=1):
+            return NOT_FOUND
+        if self.db.attendances.count_documents({"user_id": user_id, "event_id": event_id}, limit=1):
+            return ALREADY_JOINED
+        return FULL
+
+    def _release_seats(self, attendance_docs: List[Dict[str, Any]]) -> None:
+        """Yazılamayan katılımlar için ayrılan kontenjanı etkinlik başına tek update ile geri verir."""
+        for event_id, count in Counter(doc["event_id"] for doc in attendance_docs).items():
+            self.db.events.update_one(
+                {"_id": ObjectId(event_id), "attendee_count": {"$gte": count}}, {"$inc": {"attendee_count": -count}}
+            )
+
+    async def leave_event(self, user_id: str, event_id: str) -> str:
+        oid = to_object_id(event_id)
+        if oid is None:
+            return NOT_FOUND
+
+        def leave():
+            deleted = self.db.attendances.delete_one({"user_id": user_id, "event_id": event_id})
+            if deleted.deleted_count:
+                self.db.events.update_one(
+                    {"_id": oid, "attendee_count": {"$gt": 0}}, {"$inc": {"attendee_count": -1}}
+                )
+                return LEFT
+            if not self.db.events.count_documents({"_id": oid}, limit=1):
+                return NOT_FOUND
+            return NOT_ATTENDING
+
+        return await self._run(leave)
+
+    async def attendance_statuses(self, user_id: str, event_ids: List[str]) -> Dict[str, bool]:
+        """Verilen etkinlikler için katılım durumunu tek bir $in sorgusuyla döndürür."""
+        def query():
+            cursor = self.db.attendances.find(
+                {"user_id": user_id, "event_id": {"$in": event_ids}}, {"event_id": 1, "_id": 0}
+            )
+            return {a["event_id"] for a in cursor}
+
+        attending = await self._run(query)
+        return {event_id: event_id in attending for event_id in event_ids}
+
+    async def bulk_join(self, user_id: str, event_ids: List[str]) -> Dict[str, str]:
+        """Birden fazla etkinliğe insert_many ile katılır; her etkinlik için ayrı sonuç döner.
+
+        Tekil join'de olduğu gibi önce kontenjan ayrılır, sonra katılım yazılır; dolu
+        bir etkinlikte yazılıp geri silinen bir katılımcı hiçbir an görünmez. Yazılamayan
+        katılımların kontenjanı geri verilir.
+        """
+        def join():
+            results = {event_id: NOT_FOUND for event_id in event_ids}
+            oids = [oid for oid in map(to_object_id, event_ids) if oid is not None]
+            events = {str(e["_id"]): e for e in self.db.events.find({"_id": {"$in": oids}}, {"max_attendees": 1})}
+            candidates = [event_id for event_id in event_ids if event_id in events]
+            if not candidates:
+                return results
+
+            # Kontenjansız etkinlikler tek update_many ile, kontenjanlılar koşullu artışla ayrılır
+            unlimited = [event_id for event_id in candidates if events[event_id].get("max_attendees") is None]
+            if unlimited:
+                self.db.events.update_many(
+                    {"_id": {"$in": [ObjectId(event_id) for event_id in unlimited]}}, {"$inc": {"attendee_count": 1}}
+                )
+            reserved, no_seat = list(unlimited), []
+            for event_id in candidates:
+                if event_id in unlimited:
+                    continue
+                seat = self.db.events.update_one(
+                    {"_id": ObjectId(event_id), **HAS_CAPACITY}, {"$inc": {"attendee_count": 1}}
+                )
+                (reserved if seat.modified_count else no_seat).append(event_id)
+            if no_seat:
+                # Dolu etkinliğe zaten katılmış kullanıcıya tekil join'deki gibi ALREADY_JOINED döner
+                attending = {
+                    a["event_id"]
+                    for a in self.db.attendances.find(
+                        {"user_id": user_id, "event_id": {"$in": no_seat}}, {"event_id": 1, "_id": 0}
+                    )
+                }
+                results.update({event_id: ALREADY_JOINED if event_id in attending else FULL for event_id in no_seat})
+            if not reserved:
+                return results
+
+            now = datetime.now()
+            docs = [{"user_id": user_id, "event_id": event_id, "joined_at": now} for event_id in reserved]
+            results.update({event_id: JOINED for event_id in reserved})
+            try:
+                self.db.attendances.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                failed = [docs[error["index"]] for error in e.details["writeErrors"]]
+                self._release_seats(failed)
+                if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                    raise
+                results.update({doc["event_id"]: ALREADY_JOINED for doc in failed})
+            except Exception:
+                # ordered=False: bir kısmı yazılmış olabilir, kontenjan sadece yazılmayanlar için geri verilir
+                self._release_seats(unwritten(self.db.attendances, docs))
+                raise
+            return results
+
+        return await self._run(join)
+
+    async def bulk_leave(self, user_id: str, event_ids: List[str]) -> Dict[str, str]:
+        """Birden fazla etkinlikten ayrılır; her etkinlik için ayrı sonuç döner.
+
+        Katılımlar tek tek silinir ve sayaç sadece bu çağrının gerçekten sildiği
+        katılımlar için düşer; aynı katılımı eşzamanlı silen başka bir leave sayacı
+        ikinci kez düşüremez.
+        """
+        def leave():
+            left = [
+                event_id
+                for event_id in dict.fromkeys(event_ids)
+                if self.db.attendances.delete_one({"user_id": user_id, "event_id": event_id}).deleted_count
+            ]
+            results = {event_id: LEFT for event_id in left}
+            if left:
+                self.db.events.update_many(
+                    {"_id": {"$in": [oid for oid in map(to_object_id, left) if oid is not None]},
+                     "attendee_count": {"$gt": 0}},
+                    {"$inc": {"attendee_count": -1}},
+                )
+            rest = [event_id for event_id in event_ids if event_id not in results]
+            if rest:
+                oids = [oid for oid in map(to_object_id, rest) if oid is not None]
+                existing = {str(e["_id"]) for e in self.db.events.find({"_id": {"$in": oids}}, {"_id": 1})}
+                results.update({event_id: NOT_ATTENDING if event_id in existing else NOT_FOUND for event_id in rest})
+            return {event_id: results[event_id] for event_id in event_ids}
+
+        return await self._run(leave)
+
+    async def backfill_attendee_counts(self) -> int:
+        """attendee_count alanı olmayan (eski) etkinlikler için sayacı katılımlardan hesaplar."""
+        def backfill():
+            missing = [e["_id"] for e in self.db.events.find({"attendee_count": {"$exists": False}}, {"_id": 1})]
+            if not missing:
+                return 0
+            counts = {
+                row["_id"]: row["count"]
+                for row in self.db.attendances.aggregate([
+                    {"$match": {"event_id": {"$in": [str(oid) for oid in missing]}}},
+                    {"$group": {"_id": "$event_id", "count": {"$sum": 1}}},
+                ])
+            }
+            self.db.events.bulk_write([
+                UpdateOne(
+                    {"_id": oid, "attendee_count": {"$exists": False}},
+                    {"$set": {"attendee_count": counts.get(str(oid), 0)}},
+                )
+                for oid in missing
+            ], ordered=False)
+            return len(missing)
+
+        return await self._run(backfill)
+
+    async def backfill_search_fields(self) -> int:
+        """search alt dokümanı olmayan (eski) etkinlikler için arama alanlarını üretir."""
+        def backfill():
+            cursor = self.db.events.find({"search": {"$exists": False}}, {field: 1 for field in SEARCH_WEIGHTS})
+            updated = 0
+            for batch in iter(lambda: list(itertools.islice(cursor, STREAM_BATCH_SIZE)), []):
+                self.db.events.bulk_write(
+                    [UpdateOne({"_id": doc["_id"]}, {"$set": {"search": search_fields(doc)}}) for doc in batch],
+                    ordered=False,
+                )
+                updated += len(batch)
+            return updated
+
+        return await self._run(backfill)
+
+    async def list_attending_events(self, user_id: str) -> List[Dict[str, Any]]:
+        """Kullanıcının katıldığı etkinlikleri katılım sırasına göre iki sorguda döndürür."""
+        def query():
+            attendances = self.db.attendances.find(
+                {"user_id": user_id}, {"event_id": 1, "_id": 0}
+            ).sort([("joined_at", 1), ("_id", 1)])
+            event_ids = [a["event_id"] for a in attendances]
+            oids = [oid for oid in map(to_object_id, event_ids) if oid is not None]
+            if not oids:
+                return []
+            # Tek bir $in sorgusu; sonuçlar katılım sırasına göre yeniden dizilir
+            by_id = {str(e["_id"]): e for e in self.db.events.find({"_id": {"$in": oids}})}
+            return [by_id[eid] for eid in dict.fromkeys(event_ids) if eid in by_id]
+
+        return [with_id(doc) for doc in await self._run(query)]
+
+    async def iter_attendee_batches(
+        self,
+        event_id: str,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Etkinliğin katılımcılarını user_id sırasıyla, batch'ler halinde döndürür.
+
+        Katılımlar tek bir cursor'dan okunur; her batch'in kullanıcıları tek bir
+        $in sorgusuyla eklenir. Bellekte hiçbir zaman bir batch'ten fazlası tutulmaz.
+        """
+        query: Dict[str, Any] = {"event_id": event_id}
+        if after is not None:
+            query["user_id"] = {"$gt": after}
+        cursor = (
+            self.db.attendances.find(query, {"user_id": 1, "joined_at": 1, "_id": 0})
+            .sort("user_id", ASCENDING)
+            .batch_size(batch_size)
+        )
+        if limit is not None:
+            cursor = cursor.limit(limit)
+
+        def next_batch():
+            batch = list(itertools.islice(cursor, batch_size))
+            oids = [oid for oid in (to_object_id(a["user_id"]) for a in batch) if oid is not None]
+            users = {
+                str(user["_id"]): user
+                for user in (self.db.users.find({"_id": {"$in": oids}}, {"name": 1, "email": 1}) if oids else ())
+            }
+            return [attendee_row(a, users.get(a["user_id"])) for a in batch]
+
+        try:
+            while True:
+                batch = await self._run(next_batch)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            await self._run(cursor.close)
+
+
+def _date_key(event: Dict[str, Any]) -> Tuple[datetime, str]:
+    return naive_utc(event["date"]), event["id"]
+
+
+def _matches_event_query(event: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """event_query() ile üretilen sorguyu bellekteki bir etkinliğe uygular."""
+    if "creator_id" in query and event.get("creator_id") != query["creator_id"]:
+        return False
+    if "is_public" in query and event.get("is_public", True) != query["is_public"]:
+        return False
+    date_range = query.get("date", {})
+    if date_range:
+        date = naive_utc(event["date"])
+        if "$gte" in date_range and date < naive_utc(date_range["$gte"]):
+            return False
+        if "$lte" in date_range and date > naive_utc(date_range["$lte"]):
+            return False
+    return True
+
+
+class MemoryRepository:
+    """MongoDB erişilemediğinde kullanılan, MongoRepository ile aynı arayüze sahip bellek içi store.
+
+    Kayıtlar id ile sözlüklerde tutulur; katılımlar kullanıcı ve etkinlik bazında,
+    etkinlikler de oluşturan kullanıcıya göre indekslenir. Böylece get/join/leave/
+    is-attending O(1), sayfalama ise sıralı id listesi üzerinde O(log n + k) olur.
+    """
+
+    def __init__(self):
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.users_by_email: Dict[str, str] = {}
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self.events_by_creator: Dict[str, set] = defaultdict(set)
+        self.attendances_by_user: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self.attendances_by_event: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        # create/update/delete ile artımlı güncellenen arama indeksi
+        self.search_index = SearchIndex()
+        # Koordinatı olan etkinlikler; GET /events/nearby aday hücreleri tarar
+        self.geo_index = GeoGrid()
+        # Herkese açık etkinlikler (date, id) sırasıyla; upcoming sorgusu O(log n + k)
+        self._public_by_date: List[Tuple[datetime, str]] = []
+        # Keyset sayfalama için sıralı id listeleri
+        self._user_ids: List[str] = []
+        self._event_ids: List[str] = []
+
+    def close(self):
+        pass
+
+    async def ensure_indexes(self) -> List[str]:
+        return []
+
+    async def backfill_attendee_counts(self) -> int:
+        return 0
+
+    async def backfill_search_fields(self) -> int:
+        return 0
+
+    @staticmethod
+    async def _iterate(fetch, *args) -> AsyncIterator[Dict[str, Any]]:
+        # Cursor iter_* çağrılırken doğrulanır; sayfa ilk okumada alınır
+        for doc in await fetch(*args):
+            yield doc
+
+    @staticmethod
+    def _page(ids: List[str], docs: Dict[str, Dict[str, Any]], after, limit, predicate=None):
+        check_cursor(after)
+        start = bisect.bisect_right(ids, after) if after is not None else 0
+        page = []
+        for doc_id in itertools.islice(ids, start, None):
+            doc = docs[doc_id]
+            if predicate is None or predicate(doc):
+                page.append(dict(doc))
+                if limit is not None and len(page) >= limit:
+                    break
+        return page
+
+    # Users
+    async def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        user_id = self.users_by_email.get(email)
+        return dict(self.users[user_id]) if user_id is not None else None
+
+    async def insert_user(self, user_doc: Dict[str, Any]) -> str:
+        user_id = str(ObjectId())
+        self.users[user_id] = {**user_doc, "id": user_id}
+        self.users_by_email[user_doc["email"]] = user_id
+        bisect.insort(self._user_ids, user_id)
+        return user_id
+
+    async def list_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [
+            {key: value for key, value in user.items() if key != "password"}
+            for user in self._page(self._user_ids, self.users, after, limit)
+        ]
+
+    def iter_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        check_cursor(after)
+        return self._iterate(self.list_users, after, limit)
+
+    # Events
+    def load_events(self, event_docs: List[Dict[str, Any]]) -> None:
+        """Hazır id'li etkinlikleri ekler (test verisi için)."""
+        for event_doc in event_docs:
+            self._add_event(dict(event_doc))
+
+    def _index_event(self, event_doc: Dict[str, Any]) -> None:
+        self.events_by_creator[event_doc.get("creator_id")].add(event_doc["id"])
+        self.search_index.add(event_doc["id"], event_doc)
+        if has_coordinates(event_doc):
+            self.geo_index.add(event_doc["id"], event_doc["latitude"], event_doc["longitude"])
+        if event_doc.get("is_public", True):
+            bisect.insort(self._public_by_date, _date_key(event_doc))
+
+    def _unindex_event(self, event_doc: Dict[str, Any]) -> None:
+        self.events_by_creator[event_doc.get("creator_id")].discard(event_doc["id"])
+        self.search_index.remove(event_doc["id"])
+        self.geo_index.remove(event_doc["id"])
+        if event_doc.get("is_public", True):
+            del self._public_by_date[bisect.bisect_left(self._public_by_date, _date_key(event_doc))]
+
+    def _add_event(self, event_doc: Dict[str, Any]) -> None:
+        event_doc.setdefault("attendee_count", 0)
+        event_id = event_doc["id"]
+        self.events[event_id] = event_doc
+        bisect.insort(self._event_ids, event_id)
+        self._index_event(event_doc)
+
+    def _remove_event(self, event_id: str) -> None:
+        event_doc = self.events.pop(event_id)
+        del self._event_ids[bisect.bisect_left(self._event_ids, event_id)]
+        self._unindex_event(event_doc)
+
+    async def insert_event(self, event_doc: Dict[str, Any]) -> str:
+        event_id = str(ObjectId())
+        self._add_event({**event_doc, "id": event_id})
+        return event_id
+
+    async def insert_events(self, event_docs: List[Dict[str, Any]]) -> List[str]:
+        return [await self.insert_event(event_doc) for event_doc in event_docs]
+
+    async def list_events(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        query = query or {}
+        ids = self._event_ids
+        if "creator_id" in query:
+            # Oluşturan indeksiyle sadece o kullanıcının etkinlikleri taranır
+            ids = sorted(self.events_by_creator.get(query["creator_id"], ()))
+        predicate = (lambda event: _matches_event_query(event, query)) if query else None
+        return self._page(ids, self.events, after, limit, predicate)
+
+    def iter_events(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        check_cursor(after)
+        return self._iterate(self.list_events, query, after, limit)
+
+    async def list_upcoming(self, now: datetime, after: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        start = bisect.bisect_left(self._public_by_date, (naive_utc(now), ""))
+        if after is not None:
+            date, event_id = parse_date_cursor(after)
+            start = max(start, bisect.bisect_right(self._public_by_date, (naive_utc(date), event_id)))
+        return [dict(self.events[event_id]) for _, event_id in self._public_by_date[start:start + limit]]
+
+    async def search_events(
+        self,
+        terms: List[str],
+        query: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        predicate = (lambda event_id: _matches_event_query(self.events[event_id], query)) if query else None
+        return [
+            {**self.events[event_id], "score": score}
+            for event_id, score in self.search_index.search(terms, offset, limit, predicate)
+        ]
+
+    async def nearby_events(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        query: Optional[Dict[str, Any]] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        predicate = (lambda event_id: _matches_event_query(self.events[event_id], query)) if query else None
+        return [
+            {**self.events[event_id], "distance_km": round(distance, 3)}
+            for event_id, distance in self.geo_index.near(latitude, longitude, radius_km, limit, predicate)
+        ]
+
+    async def get_event(self, event_id: str) -> Optional[Dict[str, Any]]:
+        event = self.events.get(event_id)
+        return dict(event) if event is not None else None
+
+    async def update_event(self, event_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        event = self.events.get(event_id)
+        if event is None:
+            return None
+        # Id değişmediği için sadece ikincil indeksler yenilenir
+        self._unindex_event(event)
+        event = self.events[event_id] = {**event, **update_data}
+        self._index_event(event)
+        return dict(event)
+
+    async def delete_event(self, event_id: str) -> bool:
+        if event_id not in self.events:
+            return False
+        self._remove_event(event_id)
+        return True
+
+    # Attendances
+    async def find_attendance(self, user_id: str, event_id: str) -> Optional[Dict[str, Any]]:
+        return self.attendances_by_user.get(user_id, {}).get(event_id)
+
+    async def join_event(self, attendance_doc: Dict[str, Any]) -> str:
+        # Arada await olmadığı için kontrol ve yazma event loop içinde atomiktir
+        user_id, event_id = attendance_doc["user_id"], attendance_doc["event_id"]
+        event = self.events.get(event_id)
+        if event is None:
+            return NOT_FOUND
+        if event_id in self.attendances_by_user[user_id]:
+            return ALREADY_JOINED
+        if event.get("max_attendees") is not None and event["attendee_count"] >= event["max_attendees"]:
+            return FULL
+        self.attendances_by_user[user_id][event_id] = attendance_doc
+        self.attendances_by_event[event_id][user_id] = attendance_doc
+        event["attendee_count"] += 1
+        return JOINED
+
+    async def leave_event(self, user_id: str, event_id: str) -> str:
+        event = self.events.get(event_id)
+        if event is None:
+            return NOT_FOUND
+        if self.attendances_by_user.get(user_id, {}).pop(event_id, None) is None:
+            return NOT_ATTENDING
+        self.attendances_by_event[event_id].pop(user_id, None)
+        event["attendee_count"] = max(0, event["attendee_count"] - 1)
+        return LEFT
+
+    async def attendance_statuses(self, user_id: str, event_ids: List[str]) -> Dict[str, bool]:
+        attending = self.attendances_by_user.get(user_id, {})
+        return {event_id: event_id in attending for event_id in event_ids}
+
+    async def bulk_join(self, user_id: str, event_ids: List[str]) -> Dict[str, str]:
+        now = datetime.now()
+        return {
+            event_id: await self.join_event({"user_id": user_id, "event_id": event_id, "joined_at": now})
+            for event_id in event_ids
+        }
+
+    async def bulk_leave(self, user_id: str, event_ids: List[str]) -> Dict[str, str]:
+        return {event_id: await self.leave_event(user_id, event_id) for event_id in event_ids}
+
+    async def iter_attendee_batches(
+        self,
+        event_id: str,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        attendances = self.attendances_by_event.get(event_id, {})
+        user_ids = sorted(attendances)
+        start = bisect.bisect_right(user_ids, after) if after is not None else 0
+        end = len(user_ids) if limit is None else min(len(user_ids), start + limit)
+        for offset in range(start, end, batch_size):
+            batch = [
+                attendee_row(attendances[user_id], self.users.get(user_id))
+                for user_id in user_ids[offset:min(offset + batch_size, end)]
+                # Export sırasında ayrılan katılımcılar atlanır
+                if user_id in attendances
+            ]
+            if batch:
+                yield batch
+            # Büyük export'lar event loop'u batch'ler arasında serbest bırakır
+            await asyncio.sleep(0)
+
+    async def list_attending_events(self, user_id: str) -> List[Dict[str, Any]]:
+        # Sözlük ekleme sırası katılım sırasını korur
+        return [
+            dict(self.events[event_id])
+            for event_id in self.attendances_by_user.get(user_id, {})
+            if event_id in self.events
+        ]
@@ -0,0 +1,104 @@
+"""Etkinlik araması için metin normalizasyonu ve bellek içi ters indeks.
+
+Türkçe karakterler ASCII karşılıklarına indirgenir (İ/I/ı -> i, ş -> s, ğ -> g ...);
+böylece "istanbul", "İstanbul" ve "ISTANBUL" aynı terime düşer. MongoDB'de aynı
+normalizasyonla üretilen ``search`` alt dokümanı text indeksiyle aranır, bellek
+içi backend ise ``SearchIndex`` kullanır.
+"""
+import heapq
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Alan ağırlıkları; MongoDB text indeksinde de aynı ağırlıklar kullanılır
+SEARCH_WEIGHTS = {"title": 10, "location": 5, "description": 1}
+MAX_QUERY_TERMS = 10
+
+# Büyük/küçük harf dönüşümünden önce uygulanır: "İ".lower() iki karakter ("i̇") üretir
+_TURKISH_FOLD = str.maketrans({
+    "İ": "i", "I": "i", "ı": "i",
+    "Ş": "s", "ş": "s",
+    "Ğ": "g", "ğ": "g",
+    "Ç": "c", "ç": "c",
+    "Ö": "o", "ö": "o",
+    "Ü": "u", "ü": "u",
+})
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Türkçe harfleri ve diğer aksanları kaldırıp küçük harfe çevirir."""
+    decomposed = unicodedata.normalize("NFKD", text.translate(_TURKISH_FOLD))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(normalize(text)) if text else []
+
+
+def query_terms(text: str) -> List[str]:
+    """Arama metnini tekrarsız terimlere çevirir (en fazla MAX_QUERY_TERMS)."""
+    return list(dict.fromkeys(tokenize(text)))[:MAX_QUERY_TERMS]
+
+
+def search_fields(doc: Dict[str, Any]) -> Dict[str, str]:
+    """Dokümandaki aranabilir alanların normalize edilmiş hali (MongoDB ``search`` alt dokümanı)."""
+    return {field: " ".join(tokenize(doc[field])) for field in SEARCH_WEIGHTS if field in doc}
+
+
+class SearchIndex:
+    """Terim -> {etkinlik id: ağırlıklı terim frekansı} ters indeksi.
+
+    Etkinlik eklendiğinde/güncellendiğinde/silindiğinde sadece o etkinliğin
+    terimleri güncellenir. Skor, alan ağırlıklı terim frekansı x IDF toplamıdır.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def add(self, doc_id: str, doc: Dict[str, Any]) -> None:
+        terms: Dict[str, float] = defaultdict(float)
+        for field, weight in SEARCH_WEIGHTS.items():
+            for term in tokenize(doc.get(field)):
+                terms[term] += weight
+        self._doc_terms[doc_id] = terms
+        for term, weight in terms.items():
+            self._postings[term][doc_id] = weight
+
+    def remove(self, doc_id: str) -> None:
+        for term in self._doc_terms.pop(doc_id, ()):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(
+        self,
+        terms: List[str],
+        offset: int,
+        limit: int,
+        predicate: Optional[Callable[[str], bool]] = None,
+    ) -> List[Tuple[str, float]]:
+        """Terimlerden en az birini içeren dokümanları skora göre sıralı döndürür."""
+        scores: Dict[str, float] = defaultdict(float)
+        total = len(self._doc_terms)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + total / len(postings))
+            for doc_id, weight in postings.items():
+                scores[doc_id] += weight * idf
+        matches = (
+            (doc_id, score) for doc_id, score in scores.items()
+            if predicate is None or predicate(doc_id)
+        )
+        # Eşit skorlarda id sırası sayfaların kararlı olmasını sağlar
+        top = heapq.nsmallest(offset + limit, matches, key=lambda item: (-item[1], item[0]))
+        return top[offset:]
@@ -0,0 +1,576 @@
+"""SQLite (WAL) üzerinde SQLAlchemy Core ile çalışan repository.
+
+MongoRepository ve MemoryRepository ile aynı arayüzü sağlar. Veri tek bir
+dosyada tutulduğu için ``uvicorn --workers N`` ile çalışan süreçler aynı
+etkinlik ve katılım kayıtlarını görür. WAL modunda okumalar yazmaları
+beklemez; yazma işlemleri ``BEGIN IMMEDIATE`` ile başladığı için kontenjan
+kontrolü süreçler arasında da atomiktir.
+
+Arama, normalize edilmiş metinleri tutan bir FTS5 tablosu üzerinden yapılır.
+Yakındaki etkinlikler koordinatları tutan bir R*Tree tablosundan sınırlayıcı kutu
+ile seçilip gerçek mesafeyle elenir.
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    and_,
+    column,
+    create_engine,
+    delete,
+    event,
+    insert,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+
+from repository import (
+    ALREADY_JOINED,
+    FULL,
+    JOINED,
+    LEFT,
+    NOT_ATTENDING,
+    NOT_FOUND,
+    STREAM_BATCH_SIZE,
+    check_cursor,
+    naive_utc,
+    parse_date_cursor,
+)
+from geo import bounding_boxes, has_coordinates, haversine_km
+from search import SEARCH_WEIGHTS, search_fields
+
+metadata = MetaData()
+
+users = Table(
+    "users", metadata,
+    Column("id", String(24), primary_key=True),
+    Column("name", String, nullable=False),
+    Column("email", String, nullable=False, unique=True),
+    Column("password", String),
+    Column("role", String, nullable=False, default="USER"),
+    Column("created_at", DateTime),
+)
+
+events = Table(
+    "events", metadata,
+    Column("id", String(24), primary_key=True),
+    Column("title", String, nullable=False),
+    Column("description", String, nullable=False),
+    Column("date", DateTime, nullable=False),
+    Column("location", String, nullable=False),
+    Column("max_attendees", Integer),
+    Column("is_public", Boolean, nullable=False, default=True),
+    Column("creator_id", String),
+    Column("attendee_count", Integer, nullable=False, default=0),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("latitude", Float),
+    Column("longitude", Float),
+    Index("ix_events_creator_id_id", "creator_id", "id"),
+    Index("ix_events_date", "date"),
+    Index("ix_events_is_public_date_id", "is_public", "date", "id"),
+)
+
+attendances = Table(
+    "attendances", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String, nullable=False),
+    Column("event_id", String, nullable=False),
+    Column("joined_at", DateTime),
+    UniqueConstraint("user_id", "event_id", name="uq_attendances_user_event"),
+    Index("ix_attendances_event_id_user_id", "event_id", "user_id"),
+)
+
+# Kolonlar search.SEARCH_WEIGHTS sırasıyla normalize edilmiş metinleri tutar;
+# satırlar events tablosunun rowid'i ile eşleşir (güncelleme/silme O(log n))
+SEARCH_TABLE_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS events_search USING fts5({', '.join(SEARCH_WEIGHTS)}, tokenize='unicode61')"
+)
+SEARCH_RANK = f"bm25(events_search, {', '.join(str(weight) for weight in SEARCH_WEIGHTS.values())})"
+EVENT_ROWID = "(SELECT rowid FROM events WHERE id = :event_id)"
+# Koordinatı olan etkinlikler; nokta olduğu için min = max
+GEO_TABLE_DDL = "CREATE VIRTUAL TABLE IF NOT EXISTS events_geo USING rtree(id, min_lat, max_lat, min_lng, max_lng)"
+events_geo = table("events_geo", *(column(name) for name in ("id", "min_lat", "max_lat", "min_lng", "max_lng")))
+# Bu kolonlar sonradan eklendi; eski veritabanı dosyalarında ALTER TABLE ile eklenir
+ADDED_EVENT_COLUMNS = ("latitude", "longitude")
+
+USER_COLUMNS = [users.c.id, users.c.name, users.c.email, users.c.role, users.c.created_at]
+EVENT_COLUMNS = list(events.c)
+
+
+def _row(row) -> Optional[Dict[str, Any]]:
+    return dict(row._mapping) if row is not None else None
+
+
+def _event_filters(query: Optional[Dict[str, Any]]) -> list:
+    """event_query() ile üretilen sorguyu SQL koşullarına çevirir."""
+    query = query or {}
+    conditions = []
+    date_range = query.get("date", {})
+    if "$gte" in date_range:
+        conditions.append(events.c.date >= naive_utc(date_range["$gte"]))
+    if "$lte" in date_range:
+        conditions.append(events.c.date <= naive_utc(date_range["$lte"]))
+    if "creator_id" in query:
+        conditions.append(events.c.creator_id == query["creator_id"])
+    if "is_public" in query:
+        conditions.append(events.c.is_public == query["is_public"])
+    return conditions
+
+
+def _event_values(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {column.name: naive_utc(doc[column.name]) for column in events.c if column.name in doc}
+
+
+class SqlRepository:
+    def __init__(self, url: str, pool_size: int = 8):
+        self.engine = create_engine(
+            url,
+            pool_size=pool_size,
+            max_overflow=0,
+            connect_args={"check_same_thread": False, "timeout": 30},
+        )
+        event.listen(self.engine, "connect", self._on_connect)
+        event.listen(self.engine, "begin", self._on_begin)
+        # Yazma işlemleri bu engine üzerinden BEGIN IMMEDIATE ile başlar
+        self._writer = self.engine.execution_options(sqlite_write=True)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="sqlite")
+
+    @staticmethod
+    def _on_connect(dbapi_connection, connection_record):
+        # Transaction'ları pysqlite yerine SQLAlchemy başlatır (bkz. _on_begin)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
+    @staticmethod
+    def _on_begin(conn):
+        # Okuma-sonra-yazma yapan işlemler kilidi baştan alır; böylece SQLITE_BUSY ile
+        # yarıda kalmazlar ve kontenjan kontrolleri süreçler arasında sıralanır
+        write = conn.get_execution_options().get("sqlite_write", False)
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if write else "BEGIN")
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, fn, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def _read(self, statement) -> List[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(statement).mappings()]
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.engine.dispose()
+
+    async def ensure_indexes(self) -> List[str]:
+        """Tabloları, indeksleri ve arama tablosunu oluşturur; mevcut olanlar için işlem yapılmaz."""
+        def create():
+            with self._writer.begin() as conn:
+                metadata.create_all(conn)
+                existing = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(events)")}
+                for name in ADDED_EVENT_COLUMNS:
+                    if name not in existing:
+                        conn.exec_driver_sql(f"ALTER TABLE events ADD COLUMN {name} FLOAT")
+                conn.exec_driver_sql(SEARCH_TABLE_DDL)
+                conn.exec_driver_sql(GEO_TABLE_DDL)
+            return []
+
+        return await self._run(create)
+
+    def drop_all(self) -> None:
+        """Tüm tabloları siler (yük testi veritabanını sıfırlamak için)."""
+        with self._writer.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE IF EXISTS events_search")
+            conn.exec_driver_sql("DROP TABLE IF EXISTS events_geo")
+            metadata.drop_all(conn)
+
+    async def backfill_attendee_counts(self) -> int:
+        return 0
+
+    async def backfill_search_fields(self) -> int:
+        return 0
+
+    @staticmethod
+    def _index_search(conn, event_docs: List[Dict[str, Any]]) -> None:
+        conn.execute(
+            text(f"INSERT INTO events_search (rowid, {', '.join(SEARCH_WEIGHTS)}) "
+                 f"VALUES ({EVENT_ROWID}, {', '.join(':' + field for field in SEARCH_WEIGHTS)})"),
+            [
+                {"event_id": doc["id"], **{field: "" for field in SEARCH_WEIGHTS}, **search_fields(doc)}
+                for doc in event_docs
+            ],
+        )
+
+    @staticmethod
+    def _unindex_search(conn, event_id: str) -> None:
+        # events satırı silinmeden önce çağrılmalı
+        conn.execute(text(f"DELETE FROM events_search WHERE rowid = {EVENT_ROWID}"), {"event_id": event_id})
+
+    @staticmethod
+    def _index_geo(conn, event_docs: List[Dict[str, Any]]) -> None:
+        located = [doc for doc in event_docs if has_coordinates(doc)]
+        if located:
+            conn.execute(
+                text(f"INSERT INTO events_geo VALUES ({EVENT_ROWID}, :lat, :lat, :lng, :lng)"),
+                [{"event_id": doc["id"], "lat": doc["latitude"], "lng": doc["longitude"]} for doc in located],
+            )
+
+    @staticmethod
+    def _unindex_geo(conn, event_id: str) -> None:
+        # events satırı silinmeden önce çağrılmalı
+        conn.execute(text(f"DELETE FROM events_geo WHERE id = {EVENT_ROWID}"), {"event_id": event_id})
+
+    async def _iterate(self, list_page, after: Optional[str], limit: Optional[int]) -> AsyncIterator[Dict[str, Any]]:
+        # Keyset sayfaları parça parça okunur; bağlantı sayfalar arasında havuza döner
+        remaining = limit
+        while remaining is None or remaining > 0:
+            batch_size = STREAM_BATCH_SIZE if remaining is None else min(STREAM_BATCH_SIZE, remaining)
+            page = await list_page(after, batch_size)
+            for doc in page:
+                yield doc
+            if len(page) < batch_size:
+                break
+            after = page[-1]["id"]
+            if remaining is not None:
+                remaining -= len(page)
+
+    # Users
+    async def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        rows = await self._run(self._read, select(users).where(users.c.email == email))
+        return rows[0] if rows else None
+
+    async def insert_user(self, user_doc: Dict[str, Any]) -> str:
+        user_id = str(ObjectId())
+
+        def create():
+            with self._writer.begin() as conn:
+                values = {column.name: user_doc[column.name] for column in users.c if column.name in user_doc}
+                conn.execute(insert(users).values(**values, id=user_id))
+
+        await self._run(create)
+        return user_id
+
+    async def list_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        check_cursor(after)
+        statement = select(*USER_COLUMNS).order_by(users.c.id).limit(limit)
+        if after is not None:
+            statement = statement.where(users.c.id > after)
+        return await self._run(self._read, statement)
+
+    def iter_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        check_cursor(after)
+        return self._iterate(self.list_users, after, limit)
+
+    # Events
+    def load_events(self, event_docs: List[Dict[str, Any]]) -> None:
+        """Hazır id'li etkinlikleri toplu ekler (test ve yük testi verisi için)."""
+        with self._writer.begin() as conn:
+            conn.execute(insert(events), [{"attendee_count": 0, **_event_values(doc)} for doc in event_docs])
+            self._index_search(conn, event_docs)
+            self._index_geo(conn, event_docs)
+
+    async def insert_event(self, event_doc: Dict[str, Any]) -> str:
+        event_id = str(ObjectId())
+
+        def create():
+            with self._writer.begin() as conn:
+                conn.execute(insert(events).values(**_event_values(event_doc), id=event_id))
+                self._index_search(conn, [{**event_doc, "id": event_id}])
+                self._index_geo(conn, [{**event_doc, "id": event_id}])
+
+        await self._run(create)
+        return event_id
+
+    async def insert_events(self, event_docs: List[Dict[str, Any]]) -> List[str]:
+        """Etkinlikleri tek transaction'da toplu ekler (toplu import)."""
+        docs = [{**event_doc, "id": str(ObjectId())} for event_doc in event_docs]
+
+        def create():
+            with self._writer.begin() as conn:
+                conn.execute(insert(events), [_event_values(doc) for doc in docs])
+                self._index_search(conn, docs)
+                self._index_geo(conn, docs)
+
+        await self._run(create)
+        return [doc["id"] for doc in docs]
+
+    async def list_events(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        check_cursor(after)
+        statement = select(*EVENT_COLUMNS).where(*_event_filters(query)).order_by(events.c.id).limit(limit)
+        if after is not None:
+            statement = statement.where(events.c.id > after)
+        return await self._run(self._read, statement)
+
+    def iter_events(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        check_cursor(after)
+        return self._iterate(functools.partial(self.list_events, query), after, limit)
+
+    async def search_events(
+        self,
+        terms: List[str],
+        query: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        # bm25 küçük değerleri daha iyi eşleşme sayar; API'de büyük skor daha iyidir
+        matches = (
+            select(literal_column("rowid").label("event_rowid"), literal_column(f"-{SEARCH_RANK}", Float).label("score"))
+            .select_from(text("events_search"))
+            .where(text("events_search MATCH :match").bindparams(match=" OR ".join(f'"{term}"' for term in terms)))
+            .subquery()
+        )
+        statement = (
+            select(*EVENT_COLUMNS, matches.c.score)
+            .join_from(events, matches, literal_column("events.rowid") == matches.c.event_rowid)
+            .where(*_event_filters(query))
+            .order_by(matches.c.score.desc(), events.c.id)
+            .offset(offset)
+            .limit(limit)
+        )
+        return await self._run(self._read, statement)
+
+    async def nearby_events(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        query: Optional[Dict[str, Any]] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        # R*Tree sınırlayıcı kutudaki adayları verir; yarıçap dışındakiler haversine ile elenir
+        in_box = or_(*(
+            and_(
+                events_geo.c.min_lat >= min_lat, events_geo.c.max_lat <= max_lat,
+                events_geo.c.min_lng >= min_lng, events_geo.c.max_lng <= max_lng,
+            )
+            for min_lat, max_lat, min_lng, max_lng in bounding_boxes(latitude, longitude, radius_km)
+        ))
+        statement = (
+            select(*EVENT_COLUMNS)
+            .join_from(events, events_geo, events_geo.c.id == literal_column("events.rowid"))
+            .where(in_box, *_event_filters(query))
+        )
+        candidates = await self._run(self._read, statement)
+        matches = []
+        for doc in candidates:
+            distance = haversine_km(latitude, longitude, doc["latitude"], doc["longitude"])
+            if distance <= radius_km:
+                matches.append((distance, doc["id"], doc))
+        matches.sort(key=lambda match: match[:2])
+        return [{**doc, "distance_km": round(distance, 3)} for distance, _, doc in matches[:limit]]
+
+    async def list_upcoming(self, now: datetime, after: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        statement = (
+            select(*EVENT_COLUMNS)
+            .where(events.c.is_public.is_(True), events.c.date >= naive_utc(now))
+            .order_by(events.c.date, events.c.id)
+            .limit(limit)
+        )
+        if after is not None:
+            date, event_id = parse_date_cursor(after)
+            date = naive_utc(date)
+            statement = statement.where(
+                or_(events.c.date > date, and_(events.c.date == date, events.c.id > event_id))
+            )
+        return await self._run(self._read, statement)
+
+    async def get_event(self, event_id: str) -> Optional[Dict[str, Any]]:
+        rows = await self._run(self._read, select(*EVENT_COLUMNS).where(events.c.id == event_id))
+        return rows[0] if rows else None
+
+    async def update_event(self, event_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        def change():
+            with self._writer.begin() as conn:
+                updated = conn.execute(
+                    update(events).where(events.c.id == event_id).values(**_event_values(update_data))
+                    .returning(*EVENT_COLUMNS)
+                ).first()
+                if updated is None:
+                    return None
+                doc = _row(updated)
+                if search_fields(update_data):
+                    self._unindex_search(conn, event_id)
+                    self._index_search(conn, [doc])
+                if "latitude" in update_data or "longitude" in update_data:
+                    self._unindex_geo(conn, event_id)
+                    self._index_geo(conn, [doc])
+                return doc
+
+        return await self._run(change)
+
+    async def delete_event(self, event_id: str) -> bool:
+        def remove():
+            with self._writer.begin() as conn:
+                self._unindex_search(conn, event_id)
+                self._unindex_geo(conn, event_id)
+                deleted = conn.execute(delete(events).where(events.c.id == event_id)).rowcount
+                return deleted > 0
+
+        return await self._run(remove)
+
+    # Attendances
+    async def find_attendance(self, user_id: str, event_id: str) -> Optional[Dict[str, Any]]:
+        rows = await self._run(self._read, select(attendances).where(
+            attendances.c.user_id == user_id, attendances.c.event_id == event_id
+        ))
+        return rows[0] if rows else None
+
+    @staticmethod
+    def _join(conn, attendance_doc: Dict[str, Any]) -> str:
+        # Yazma kilidi altında çalışır: kontrol ve artış arasında başka süreç araya giremez
+        user_id, event_id = attendance_doc["user_id"], attendance_doc["event_id"]
+        reserved = conn.execute(
+            update(events)
+            .where(
+                events.c.id == event_id,
+                or_(events.c.max_attendees.is_(None), events.c.attendee_count < events.c.max_attendees),
+            )
+            .values(attendee_count=events.c.attendee_count + 1)
+        ).rowcount
+        if not reserved:
+            if conn.execute(select(events.c.id).where(events.c.id == event_id)).first() is None:
+                return NOT_FOUND
+            if conn.execute(select(attendances.c.id).where(
+                attendances.c.user_id == user_id, attendances.c.event_id == event_id
+            )).first() is not None:
+                return ALREADY_JOINED
+            return FULL
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(attendances).values(
+                    user_id=user_id, event_id=event_id, joined_at=attendance_doc.get("joined_at")
+                ))
+        except IntegrityError:
+            conn.execute(
+                update(events).where(events.c.id == event_id).values(attendee_count=events.c.attendee_count - 1)
+            )
+            return ALREADY_JOINED
+        return JOINED
+
+    @staticmethod
+    def _leave(conn, user_id: str, event_id: str) -> str:
+        deleted = conn.execute(delete(attendances).where(
+            attendances.c.user_id == user_id, attendances.c.event_id == event_id
+        )).rowcount
+        if deleted:
+            conn.execute(
+                update(events)
+                .where(events.c.id == event_id, events.c.attendee_count > 0)
+                .values(attendee_count=events.c.attendee_count - 1)
+            )
+            return LEFT
+        if conn.execute(select(events.c.id).where(events.c.id == event_id)).first() is None:
+            return NOT_FOUND
+        return NOT_ATTENDING
+
+    async def join_event(self, attendance_doc: Dict[str, Any]) -> str:
+        def join():
+            with self._writer.begin() as conn:
+                return self._join(conn, attendance_doc)
+
+        return await self._run(join)
+
+    async def leave_event(self, user_id: str, event_id: str) -> str:
+        def leave():
+            with self._writer.begin() as conn:
+                return self._leave(conn, user_id, event_id)
+
+        return await self._run(leave)
+
+    async def attendance_statuses(self, user_id: str, event_ids: List[str]) -> Dict[str, bool]:
+        rows = await self._run(self._read, select(attendances.c.event_id).where(
+            attendances.c.user_id == user_id, attendances.c.event_id.in_(event_ids)
+        ))
+        attending = {row["event_id"] for row in rows}
+        return {event_id: event_id in attending for event_id in event_ids}
+
+    async def bulk_join(self, user_id: str, event_ids: List[str]) -> Dict[str, str]:
+        """Tüm etkinlikler tek bir yazma transaction'ında işlenir."""
+        def join():
+            now = datetime.now()
+            with self._writer.begin() as conn:
+                return {
+                    event_id: self._join(conn, {"user_id": user_id, "event_id": event_id, "joined_at": now})
+                    for event_id in event_ids
+                }
+
+        return await self._run(join)
+
+    async def bulk_leave(self, user_id: str, event_ids: List[str]) -> Dict[str, str]:
+        def leave():
+            with self._writer.begin() as conn:
+                return {event_id: self._leave(conn, user_id, event_id) for event_id in event_ids}
+
+        return await self._run(leave)
+
+    async def list_attending_events(self, user_id: str) -> List[Dict[str, Any]]:
+        """Kullanıcının katıldığı etkinlikler, katılım sırasıyla tek bir join sorgusunda."""
+        statement = (
+            select(*EVENT_COLUMNS)
+            .join_from(attendances, events, attendances.c.event_id == events.c.id)
+            .where(attendances.c.user_id == user_id)
+            .order_by(attendances.c.joined_at, attendances.c.id)
+        )
+        return await self._run(self._read, statement)
+
+    async def iter_attendee_batches(
+        self,
+        event_id: str,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Katılımcılar user_id sırasıyla; her batch users ile tek bir join sorgusunda okunur."""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            statement = (
+                select(attendances.c.user_id, users.c.name, users.c.email, attendances.c.joined_at)
+                .join_from(attendances, users, users.c.id == attendances.c.user_id, isouter=True)
+                .where(attendances.c.event_id == event_id, *([attendances.c.user_id > after] if after is not None else []))
+                .order_by(attendances.c.user_id)
+                .limit(size)
+            )
+            page = await self._run(self._read, statement)
+            if page:
+                yield page
+            if len(page) < size:
+                break
+            after = page[-1]["user_id"]
+            if remaining is not None:
+                remaining -= len(page)
@@ -0,0 +1,140 @@
+"""Testler uygulamayı TestClient ile süreç içinde açar.
+
+MongoDB adresi bilerek erişilemez verilir; her test kullanacağı repository'yi
+(bellek içi, SQLite ya da mongomock) ``use_repo`` ile devreye alır. Sorgu bütçeleri
+``raise`` modundadır: bütçesini aşan bir istek testi ``QueryBudgetExceeded`` ile düşürür.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "mongodb://127.0.0.1:1/")
+os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "200")
+os.environ["DB_QUERY_BUDGET_MODE"] = "raise"
+# Eşzamanlı testlerde istekler yük atma yüzünden 503 almasın
+os.environ["ADMISSION_ENABLED"] = "false"
+
+import mongomock
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+
+import main
+from db_metrics import current_request_stats
+from repository import MemoryRepository, MongoRepository
+from sql_repository import SqlRepository
+
+BACKENDS = ["memory", "sqlite", "mongomock"]
+
+# pymongo'nun her çağrı için gönderdiği komut (cursor'lar ilk batch için tek "find" sayılır)
+COMMANDS = {
+    "find": "find",
+    "find_one": "find",
+    "find_one_and_update": "findAndModify",
+    "insert_one": "insert",
+    "insert_many": "insert",
+    "update_one": "update",
+    "update_many": "update",
+    "delete_one": "delete",
+    "delete_many": "delete",
+    "count_documents": "aggregate",
+    "aggregate": "aggregate",
+    "distinct": "distinct",
+}
+
+
+class CountingCollection:
+    """mongomock komut izleme (CommandListener) olayı üretmez; çağrıları isteğin sayaçlarına yazar."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        command = COMMANDS.get(name)
+        if command is None:
+            return attr
+
+        def counted(*args, **kwargs):
+            stats = current_request_stats.get()
+            if stats is not None:
+                stats.record(command, 0.0)
+            return attr(*args, **kwargs)
+
+        return counted
+
+
+class CountingDatabase:
+    def __init__(self, db):
+        self._db = db
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name not in self._collections:
+            self._collections[name] = CountingCollection(getattr(self._db, name))
+        return self._collections[name]
+
+    __getitem__ = __getattr__
+
+
+def auth(user_id: str) -> dict:
+    token = jwt.encode({"sub": user_id, "email": f"{user_id}@test.local", "name": user_id}, main.SECRET_KEY, algorithm=main.ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_event(client, organizer: str, **fields) -> str:
+    response = client.post("/events/", headers=auth(organizer), json={
+        "title": "Test Etkinliği",
+        "description": "Test",
+        "date": "2030-01-01T10:00:00",
+        "location": "Ankara",
+        **fields,
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def attendee_ids(client, event_id: str) -> list:
+    async def collect():
+        return [row["user_id"] async for batch in main.repo.iter_attendee_batches(event_id) for row in batch]
+
+    return client.portal.call(collect)
+
+
+def attendee_count(client, event_id: str) -> int:
+    return client.portal.call(main.repo.get_event, event_id)["attendee_count"]
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def use_repo(client, tmp_path):
+    """``use_repo(backend)`` route'ların kullandığı repository'yi değiştirir; test bitince eskisi geri gelir."""
+    previous = main.repo
+    opened = []
+
+    def install(backend: str):
+        if backend == "memory":
+            repo = MemoryRepository()
+        elif backend == "sqlite":
+            repo = SqlRepository(f"sqlite:///{tmp_path / 'eventease.db'}")
+            client.portal.call(repo.ensure_indexes)
+        elif backend == "mongomock":
+            # mongomock thread-safe değil; tek worker ile komutlar sırayla çalışır
+            repo = MongoRepository(CountingDatabase(mongomock.MongoClient().eventease), max_workers=1)
+            client.portal.call(main.use_mongo, repo)
+        else:
+            raise ValueError(backend)
+        main.repo = repo
+        main.event_cache.clear()
+        opened.append(repo)
+        return repo
+
+    yield install
+    main.repo = previous
+    main.event_cache.clear()
+    for repo in opened:
+        if not isinstance(repo, MemoryRepository):
+            repo.close()
@@ -0,0 +1,89 @@
+"""Büyük katılımcı export'u batch'ler halinde akmalı; yanıt bellekte birikmemeli."""
+import tracemalloc
+from datetime import datetime
+
+import anyio
+import pytest
+
+import main
+from conftest import auth
+from repository import STREAM_BATCH_SIZE
+
+ATTENDEES = 100_000
+
+
+@pytest.fixture
+def event_id(client, use_repo):
+    repo = use_repo("memory")
+
+    async def seed():
+        event_id = await repo.insert_event({
+            "title": "Büyük Etkinlik", "description": "Export", "date": datetime(2030, 1, 1), "location": "İstanbul",
+            "max_attendees": None, "is_public": True, "creator_id": "export-organizer",
+            "created_at": datetime.now(), "updated_at": datetime.now(),
+        })
+        joined_at = datetime.now()
+        for i in range(ATTENDEES):
+            user_id = await repo.insert_user({"name": f"Katılımcı {i}", "email": f"katilimci{i}@test.local", "password": "-"})
+            await repo.join_event({"user_id": user_id, "event_id": event_id, "joined_at": joined_at})
+        return event_id
+
+    return client.portal.call(seed)
+
+
+def stream(client, path: str) -> dict:
+    """Uygulamayı doğrudan ASGI ile çağırır; TestClient tüm gövdeyi biriktirdiği için kullanılmaz.
+
+    Gelen parçalar sayılıp atılır, böylece ölçülen bellek sadece uygulamanın tuttuğudur.
+    """
+    result = {"status": None, "chunks": 0, "bytes": 0, "rows": 0}
+    headers = [(key.lower().encode(), value.encode()) for key, value in auth("export-organizer").items()]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": headers,
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+
+    async def call():
+        done = anyio.Event()
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Bağlantı yanıt bitene kadar açık kalır
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                result["status"] = message["status"]
+            elif message["type"] == "http.response.body" and message.get("body"):
+                result["chunks"] += 1
+                result["bytes"] += len(message["body"])
+                result["rows"] += message["body"].count(b"\n")
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                done.set()
+
+        tracemalloc.start()
+        try:
+            await main.app(scope, receive, send)
+            result["peak"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    client.portal.call(call)
+    return result
+
+
+@pytest.mark.parametrize("export_format, header_rows", [("csv", 1), ("ndjson", 0)])
+def test_large_export_streams_in_batches(client, event_id, export_format, header_rows):
+    result = stream(client, f"/events/{event_id}/attendees.{export_format}")
+
+    assert result["status"] == 200
+    assert result["rows"] == ATTENDEES + header_rows
+    assert result["chunks"] >= ATTENDEES // STREAM_BATCH_SIZE
+    # Yanıtın tamamı hiçbir an bellekte tutulmaz
+    assert result["peak"] < result["bytes"] / 4, result
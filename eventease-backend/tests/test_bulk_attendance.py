@@ -0,0 +1,81 @@
+"""Toplu katıl / ayrıl: etkinlik başına sonuçlar ve kayıtlarla tutarlı attendee_count."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from bson import ObjectId
+
+from conftest import BACKENDS, attendee_count, attendee_ids, auth, create_event
+
+
+def bulk(client, user: str, action: str, event_ids: list) -> dict:
+    response = client.post("/events/bulk-attendance", headers=auth(user), json={"action": action, "event_ids": event_ids})
+    assert response.status_code == 200, response.text
+    return {row["event_id"]: row["status"] for row in response.json()["results"]}
+
+
+def assert_counts_match(client, *event_ids):
+    for event_id in event_ids:
+        assert attendee_count(client, event_id) == len(attendee_ids(client, event_id))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_bulk_join_and_leave(client, use_repo, backend):
+    use_repo(backend)
+    unlimited = create_event(client, "bulk-organizer")
+    taken = create_event(client, "bulk-organizer", max_attendees=1)
+    roomy = create_event(client, "bulk-organizer", max_attendees=2)
+    missing = str(ObjectId())
+    assert client.post(f"/events/{unlimited}/join", headers=auth("bulk-user")).status_code == 200
+    assert client.post(f"/events/{taken}/join", headers=auth("other-user")).status_code == 200
+
+    assert bulk(client, "bulk-user", "join", [unlimited, taken, roomy, missing]) == {
+        unlimited: "already_joined", taken: "full", roomy: "joined", missing: "not_found",
+    }
+    assert [attendee_count(client, event_id) for event_id in (unlimited, taken, roomy)] == [1, 1, 1]
+    assert_counts_match(client, unlimited, taken, roomy)
+
+    assert bulk(client, "bulk-user", "leave", [unlimited, taken, roomy, missing]) == {
+        unlimited: "left", taken: "not_attending", roomy: "left", missing: "not_found",
+    }
+    assert [attendee_count(client, event_id) for event_id in (unlimited, taken, roomy)] == [0, 1, 0]
+    assert_counts_match(client, unlimited, taken, roomy)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_concurrent_leaves_decrement_once(client, use_repo, backend):
+    use_repo(backend)
+    event_ids = [create_event(client, "bulk-organizer", max_attendees=5) for _ in range(3)]
+    users = [f"bulk-user-{i}" for i in range(5)]
+    for user in users:
+        assert set(bulk(client, user, "join", event_ids).values()) == {"joined"}
+
+    # Aynı katılımları toplu ve tekil leave'ler aynı anda siler; her katılım sayaçtan bir kez düşer
+    def leave(call):
+        user, kind = call
+        if kind == "bulk":
+            return list(bulk(client, user, "leave", event_ids).values()).count("left")
+        return sum(client.post(f"/events/{event_id}/leave", headers=auth(user)).status_code == 200 for event_id in event_ids)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        left = sum(pool.map(leave, [(user, kind) for user in users for kind in ("bulk", "bulk", "single")]))
+
+    assert left == len(users) * len(event_ids)
+    for event_id in event_ids:
+        assert attendee_count(client, event_id) == len(attendee_ids(client, event_id)) == 0
+
+
+def test_bulk_join_releases_seats_when_insert_fails(client, use_repo, monkeypatch):
+    repo = use_repo("mongomock")
+    event_id = create_event(client, "bulk-organizer", max_attendees=1)
+
+    def fail(*args, **kwargs):
+        raise ConnectionError("bağlantı koptu")
+
+    monkeypatch.setattr(repo.db.attendances, "insert_many", fail)
+    with pytest.raises(ConnectionError):
+        client.portal.call(repo.bulk_join, "bulk-user", [event_id])
+    # Ayrılan kontenjan geri verildi; etkinlik dolu görünmez
+    assert attendee_count(client, event_id) == 0
+    assert attendee_ids(client, event_id) == []
+    monkeypatch.undo()
+    assert bulk(client, "bulk-user", "join", [event_id]) == {event_id: "joined"}
@@ -0,0 +1,58 @@
+"""Keyset cursor'ları: geçersiz cursor her backend'de ve stream modunda da 400 döner."""
+import pytest
+
+from conftest import BACKENDS, auth, create_event
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("path", ["/users/", "/events/"])
+@pytest.mark.parametrize("stream", [False, True])
+def test_malformed_cursor_is_rejected_before_streaming(client, use_repo, backend, path, stream):
+    use_repo(backend)
+    response = client.get(path, params={"after": "not-an-id", "stream": stream}, headers=auth("cursor-user"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Geçersiz cursor"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_repositories_reject_malformed_cursor_alike(use_repo, backend):
+    repo = use_repo(backend)
+    # iter_* çağrılırken (ilk okumadan önce) hata verir
+    with pytest.raises(ValueError, match="Geçersiz cursor"):
+        repo.iter_users("not-an-id")
+    with pytest.raises(ValueError, match="Geçersiz cursor"):
+        repo.iter_events(None, "not-an-id")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_event_pages_follow_next_cursor(client, use_repo, backend):
+    use_repo(backend)
+    created = sorted(create_event(client, "cursor-organizer", title=f"Etkinlik {i}") for i in range(3))
+
+    first = client.get("/events/", params={"limit": 2})
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/events/", params={"limit": 2, "after": cursor})
+    assert [event["id"] for event in first.json() + second.json()] == created
+
+
+def test_abandoned_mongo_stream_closes_cursor_off_the_loop(client, use_repo, monkeypatch):
+    repo = use_repo("mongomock")
+    for i in range(3):
+        create_event(client, "cursor-organizer", title=f"Etkinlik {i}")
+    calls = []
+    run = repo._run
+
+    async def recording_run(fn, *args, **kwargs):
+        calls.append(getattr(fn, "__name__", None))
+        return await run(fn, *args, **kwargs)
+
+    monkeypatch.setattr(repo, "_run", recording_run)
+
+    async def read_one():
+        events = repo.iter_events()
+        await events.__anext__()
+        await events.aclose()
+
+    client.portal.call(read_one)
+    # killCursors da thread havuzunda gönderilir
+    assert calls[-1] == "close"
@@ -0,0 +1,39 @@
+"""Etkinlik güncellemesi: başarısız güncelleme cache'i düşürmez ve canlı yayın yapmaz."""
+import live
+import main
+from conftest import auth, create_event
+
+
+def test_update_that_finds_no_event_does_not_publish(client, use_repo, monkeypatch):
+    repo = use_repo("memory")
+    event_id = create_event(client, "update-organizer")
+    published = []
+    monkeypatch.setattr(main.live_updates, "publish", lambda *args: published.append(args))
+
+    async def deleted_meanwhile(event_id, update_data):
+        return None
+
+    # Kontrolden sonra başka bir istek etkinliği silmiş gibi
+    monkeypatch.setattr(repo, "update_event", deleted_meanwhile)
+    version = main.event_cache.version
+    response = client.put(f"/events/{event_id}", headers=auth("update-organizer"), json={
+        "title": "Yeni", "description": "Test", "date": "2030-01-02T10:00:00", "location": "İzmir",
+    })
+    assert response.status_code == 404
+    assert published == []
+    assert main.event_cache.version == version
+
+
+def test_update_publishes_and_invalidates(client, use_repo, monkeypatch):
+    use_repo("memory")
+    event_id = create_event(client, "update-organizer")
+    assert client.get(f"/events/{event_id}").json()["title"] == "Test Etkinliği"
+    published = []
+    monkeypatch.setattr(main.live_updates, "publish", lambda *args: published.append(args))
+
+    response = client.put(f"/events/{event_id}", headers=auth("update-organizer"), json={
+        "title": "Yeni", "description": "Test", "date": "2030-01-02T10:00:00", "location": "İzmir",
+    })
+    assert response.status_code == 200
+    assert published == [(event_id, live.UPDATE)]
+    assert client.get(f"/events/{event_id}").json()["title"] == "Yeni"
@@ -0,0 +1,43 @@
+"""Eşzamanlı katılımda kontenjan aşılmamalı ve attendee_count katılım kayıtlarıyla tutarlı kalmalı."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import BACKENDS, attendee_count, attendee_ids, auth, create_event
+
+USERS = 150
+CAPACITY = 40
+
+
+def concurrently(client, calls):
+    # TestClient istekleri aynı event loop'a gönderir; thread'ler onları eşzamanlı yapar
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        return list(pool.map(lambda call: (call[1], client.post(call[0], headers=auth(call[1])).status_code), calls))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_flash_join_fills_capacity_exactly(client, use_repo, backend):
+    use_repo(backend)
+    event_id = create_event(client, "flash-organizer", title="Flash Join", max_attendees=CAPACITY)
+    join = f"/events/{event_id}/join"
+
+    # Her kullanıcı iki kez dener: kontenjan dolu ve tekrar katılım yolları birlikte çalışır
+    users = [f"flash-user-{i:03d}" for i in range(USERS)]
+    results = concurrently(client, [(join, user) for user in users * 2])
+    assert {code for _, code in results} <= {200, 400}
+    joined = sorted(user for user, code in results if code == 200)
+    assert len(joined) == len(set(joined)) == CAPACITY
+
+    rows = attendee_ids(client, event_id)
+    assert sorted(rows) == joined
+    assert attendee_count(client, event_id) == len(rows) == CAPACITY
+
+    # Ayrılanların yerine bekleyenler katılırken de sayaç kayıtlarla aynı kalır ve kontenjanı aşmaz
+    leave = f"/events/{event_id}/leave"
+    waiting = [user for user in users if user not in set(joined)]
+    results = concurrently(client, [(leave, user) for user in joined[:CAPACITY // 2]] + [(join, user) for user in waiting])
+    assert {code for _, code in results} <= {200, 400}
+
+    rows = attendee_ids(client, event_id)
+    assert len(rows) == len(set(rows)) <= CAPACITY
+    assert attendee_count(client, event_id) == len(rows)
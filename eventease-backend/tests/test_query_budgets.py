@@ -0,0 +1,90 @@
+"""Sık kullanılan route'lar MongoDB'de sorgu bütçelerini (DB_QUERY_BUDGETS) aşmamalı."""
+import math
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+import main
+from conftest import auth
+from db_metrics import QueryBudgetExceeded
+from repository import STREAM_BATCH_SIZE
+
+ORGANIZER = "budget-organizer"
+EVENT = {
+    "title": "Bütçe",
+    "description": "Sorgu bütçesi testi",
+    "date": "2030-01-01T10:00:00",
+    "location": "İstanbul",
+    "max_attendees": 10,
+}
+
+
+def queries(response) -> int:
+    return int(response.headers["x-db-queries"])
+
+
+@pytest.fixture
+def event_id(client, use_repo):
+    use_repo("mongomock")
+    response = client.post("/events/", json=EVENT, headers=auth(ORGANIZER))
+    assert response.status_code == 201
+    assert queries(response) == 1
+    return response.json()["id"]
+
+
+def test_list_and_get_stay_within_budget(client, event_id):
+    response = client.get("/events/")
+    assert response.status_code == 200
+    assert event_id in [event["id"] for event in response.json()]
+    assert queries(response) == main.DB_QUERY_BUDGETS["GET /events/"]
+
+    response = client.get(f"/events/{event_id}")
+    assert response.status_code == 200
+    assert queries(response) == main.DB_QUERY_BUDGETS["GET /events/{event_id}"]
+
+    # Cache'ten dönen yanıt DB'ye hiç gitmez
+    assert queries(client.get(f"/events/{event_id}")) == 0
+
+
+def test_join_and_attending_stay_within_budget(client, event_id):
+    headers = auth("budget-user")
+    response = client.post(f"/events/{event_id}/join", headers=headers)
+    assert response.status_code == 200
+    assert 0 < queries(response) <= main.DB_QUERY_BUDGETS["POST /events/{event_id}/join"]
+
+    # Tekrar katılım (unique indeks + kontenjanın geri verilmesi) da bütçe içinde kalır
+    response = client.post(f"/events/{event_id}/join", headers=headers)
+    assert response.status_code == 400
+
+    response = client.get("/events/attending", headers=headers)
+    assert response.status_code == 200
+    assert [event["id"] for event in response.json()] == [event_id]
+    assert 0 < queries(response) <= main.DB_QUERY_BUDGETS["GET /events/attending"]
+
+
+def test_export_stays_within_batch_budget(client, event_id):
+    attendees = 2 * STREAM_BATCH_SIZE + 1
+    now = datetime.now()
+    user_ids = [ObjectId() for _ in range(attendees)]
+    main.repo.db.users.insert_many([{"_id": oid, "name": "Katılımcı", "email": f"{oid}@test.local"} for oid in user_ids])
+    main.repo.db.attendances.insert_many(
+        [{"user_id": str(oid), "event_id": event_id, "joined_at": now} for oid in user_ids]
+    )
+    main.repo.db.events.update_one({}, {"$set": {"attendee_count": attendees}})
+
+    route = "GET /events/{event_id}/attendees.{export_format}"
+    before = main.db_route_stats.snapshot().get(route, {}).get("queries", 0)
+    response = client.get(f"/events/{event_id}/attendees.csv", headers=auth(ORGANIZER))
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == attendees + 1
+    # Etkinlik + katılım cursor'ı + batch başına tek kullanıcı sorgusu; satır başına sorgu yok
+    used = main.db_route_stats.snapshot()[route]["queries"] - before
+    assert used == 2 + math.ceil(attendees / STREAM_BATCH_SIZE)
+
+
+def test_exceeding_a_budget_raises(client, event_id, monkeypatch):
+    monkeypatch.setitem(main.DB_QUERY_BUDGETS, "GET /events/{event_id}", 0)
+    main.event_cache.clear()
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(f"/events/{event_id}")
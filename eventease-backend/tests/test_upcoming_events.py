@@ -0,0 +1,41 @@
+"""GET /events/upcoming, sunucunun saat diliminden bağımsız olarak UTC'ye göre çalışmalı."""
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import BACKENDS, create_event
+
+
+@pytest.fixture(params=["JST-09", "EST+05"])
+def server_timezone(request):
+    # POSIX TZ biçimi tzdata gerektirmez: JST UTC+9, EST UTC-5
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = request.param
+    time.tzset()
+    yield request.param
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def utc_in(hours: float) -> str:
+    return (datetime.now(timezone.utc) + timedelta(hours=hours)).replace(tzinfo=None).isoformat()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_upcoming_uses_utc_now(client, use_repo, server_timezone, backend):
+    use_repo(backend)
+    # Sunucunun yerel saati UTC'den saatlerce farklı
+    assert abs(datetime.now() - datetime.now(timezone.utc).replace(tzinfo=None)) > timedelta(hours=4)
+    past = create_event(client, "tz-organizer", title="Geçmiş", date=utc_in(-2))
+    soon = create_event(client, "tz-organizer", title="Yakında", date=utc_in(2))
+
+    response = client.get("/events/upcoming")
+    assert response.status_code == 200
+    ids = [event["id"] for event in response.json()]
+    assert soon in ids
+    assert past not in ids
@@ -0,0 +1,27 @@
+"""Kayıt ve giriş: bcrypt'in 72 byte sınırı kayıtta doğrulanır."""
+import pytest
+
+
+@pytest.fixture
+def register(client, use_repo):
+    use_repo("memory")
+
+    def register(password: str):
+        return client.post("/users/", json={"name": "Ayşe", "email": "ayse@test.local", "password": password})
+
+    return register
+
+
+def test_password_at_bcrypt_limit_registers_and_logs_in(client, register):
+    password = "a" * 72
+    assert register(password).status_code == 201
+    response = client.post("/login", json={"email": "ayse@test.local", "password": password})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("password", ["a" * 73, "ş" * 37])
+def test_password_over_bcrypt_limit_is_rejected(register, password):
+    # "ş" UTF-8'de 2 byte: 37 karakter 74 byte eder
+    response = register(password)
+    assert response.status_code == 422
+    assert "72 byte" in response.text
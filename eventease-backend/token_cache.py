@@ -0,0 +1,113 @@
+"""Doğrulanmış JWT claim'leri için sınırlı boyutlu LRU/TTL cache ve iptal listesi.
+
+Frontend aynı bearer token'ı bir sayfa görüntülemesinde defalarca gönderir;
+her istekte ``jwt.decode`` yapmak yerine doğrulanmış claim'ler token'ın
+SHA-256 özeti ile saklanır. Token'ın kendisi bellekte tutulmaz.
+
+Cache'ten çıkarmak bir token'ı geçersiz kılmaz (imzası hâlâ geçerlidir); iptal
+edilen token'ların özeti ``exp`` zamanına kadar ayrı bir listede tutulur ve
+decode'dan önce kontrol edilir. Liste process'e özeldir; ``exp``'i olmayan
+token'lar process yeniden başlayana kadar listede kalır.
+"""
+import hashlib
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class TokenCache:
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0, enabled: bool = True):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # İptal edilen token özetleri -> geçerlilik sonu; heap süresi dolanları temizlemek için
+        self._revoked: Dict[str, float] = {}
+        self._revoked_expiry: List[Tuple[float, str]] = []
+        # get_current_user senkron bir dependency olduğu için thread havuzunda çalışır
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                # Süresi dolan token tekrar decode edilir ve orada reddedilir
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, token: str, claims: Dict[str, Any], exp: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def revoke(self, token: str, exp: Optional[float] = None) -> None:
+        """Token'ı cache'ten çıkarır ve ``exp`` zamanına kadar reddedilecekler listesine ekler."""
+        key = self._key(token)
+        until = float(exp) if exp is not None else math.inf
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._revoked[key] = until
+            heapq.heappush(self._revoked_expiry, (until, key))
+            # Süresi dolan token'ları jwt.decode zaten reddeder; listede tutulmaları gerekmez
+            while self._revoked_expiry and self._revoked_expiry[0][0] <= now:
+                expired_at, expired_key = heapq.heappop(self._revoked_expiry)
+                if self._revoked.get(expired_key) == expired_at:
+                    del self._revoked[expired_key]
+
+    def is_revoked(self, token: str) -> bool:
+        # İptal listesi boşken (olağan durum) özet hesaplanmaz
+        if not self._revoked:
+            return False
+        key = self._key(token)
+        with self._lock:
+            until = self._revoked.get(key)
+        return until is not None and until > time.time()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "revoked": len(self._revoked),
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
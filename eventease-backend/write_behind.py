@@ -0,0 +1,181 @@
+"""Katılım kayıtları için birleştiren (write-behind) insert kuyruğu.
+
+Popüler bir etkinlik açıldığında binlerce join isteği her biri kendi ``insert_one``
+çağrısıyla gelir. Bu kuyruk, istekleri sınırlı bir süreç içi kuyrukta toplar ve
+``max_batch`` dolduğunda ya da ilk kayıttan ``max_delay`` saniye sonra tek bir
+``insert_many(ordered=False)`` ile yazar. Her çağıran kendi kaydının sonucunu
+bekler; tekrar eden kayıtlar (unique indeks) kayıt bazında ``DuplicateKeyError``
+olarak döner. Kuyruk doluysa çağrı beklemeden ``WriteQueueFull`` ile reddedilir.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+logger = logging.getLogger("eventease.db")
+
+DUPLICATE_KEY = 11000
+
+
+class WriteQueueFull(Exception):
+    """Write-behind kuyruğu dolu ya da kapanıyor."""
+
+
+def unwritten(collection, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Tamamı hatayla dönen bir ``insert_many`` sonrası gerçekten yazılmamış kayıtlar."""
+    # insert_many gönderilmeden önce her kayda _id atar
+    ids = [doc["_id"] for doc in docs if "_id" in doc]
+    try:
+        written = {doc["_id"] for doc in collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+    except Exception:
+        logger.warning("Yazılan katılımlar doğrulanamadı, tüm batch yazılmamış sayılıyor", exc_info=True)
+        written = set()
+    return [doc for doc in docs if doc.get("_id") not in written]
+
+
+class BatchInserter:
+    """``insert`` çağrılarını ``insert_many`` batch'lerinde birleştirir.
+
+    ``run`` senkron bir fonksiyonu repository'nin thread havuzunda çalıştırır.
+    ``on_failed`` aynı thread çağrısında, yazılamayan tüm kayıtlarla (tekrar eden,
+    başka bir hatayla reddedilen ya da tüm batch'i düşüren hatada yazılmamış olanlar)
+    çağrılır; böylece telafi işlemi (örn. ayrılan kontenjanın geri verilmesi) isteği
+    yapan istemci bağlantıyı kapatmış olsa bile yapılır.
+    """
+
+    def __init__(
+        self,
+        collection,
+        run: Callable[..., Awaitable[Any]],
+        on_failed: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        max_batch: int = 500,
+        max_delay: float = 0.005,
+        max_queue: int = 10000,
+        max_in_flight: int = 2,
+    ):
+        self.collection = collection
+        self._run = run
+        self.on_failed = on_failed
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self._queue: Deque[Tuple[Dict[str, Any], asyncio.Future]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._max_in_flight = max_in_flight
+        self._in_flight: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.batches = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.largest_batch = 0
+
+    @property
+    def full(self) -> bool:
+        return self._closing or len(self._queue) >= self.max_queue
+
+    async def insert(self, doc: Dict[str, Any]) -> None:
+        """Kaydı kuyruğa ekler ve yazıldığı batch tamamlanana kadar bekler."""
+        if self.full:
+            self.rejected += 1
+            raise WriteQueueFull()
+        if self._task is None:
+            # Event loop'a bağlı nesneler ilk kullanımda oluşturulur
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self._max_in_flight)
+            self._task = asyncio.create_task(self._flush_loop())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((doc, future))
+        self._wakeup.set()
+        await future
+
+    async def _flush_loop(self) -> None:
+        while True:
+            if not self._queue:
+                if self._closing:
+                    break
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if len(self._queue) < self.max_batch and not self._closing:
+                # İlk kayıttan sonra kısa bir süre daha kayıt toplanır
+                await asyncio.sleep(self.max_delay)
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            await self._slots.acquire()
+            task = asyncio.create_task(self._write(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._write_done)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def _write_done(self, task: asyncio.Task) -> None:
+        self._in_flight.discard(task)
+        self._slots.release()
+
+    def _insert_many(self, docs: List[Dict[str, Any]]) -> Dict[int, Exception]:
+        errors: Dict[int, Exception] = {}
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details["writeErrors"]:
+                error_class = DuplicateKeyError if error["code"] == DUPLICATE_KEY else OperationFailure
+                errors[error["index"]] = error_class(error.get("errmsg", ""), error["code"], error)
+        except Exception:
+            # Batch'in tamamı düştü (ağ hatası, zaman aşımı...); ordered=False olduğu için
+            # bir kısmı yazılmış olabilir, telafi sadece yazılmayanlara yapılır
+            self._compensate(unwritten(self.collection, docs))
+            raise
+        self._compensate([docs[index] for index in errors])
+        return errors
+
+    def _compensate(self, failed: List[Dict[str, Any]]) -> None:
+        if failed and self.on_failed is not None:
+            self.on_failed(failed)
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        docs = [doc for doc, _ in batch]
+        try:
+            errors = await self._run(self._insert_many, docs)
+        except Exception as e:
+            logger.exception("Katılım batch'i yazılamadı", extra={"batch_size": len(batch)})
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        duplicates = sum(isinstance(error, DuplicateKeyError) for error in errors.values())
+        self.duplicates += duplicates
+        self.inserted += len(batch) - len(errors)
+        for index, (_, future) in enumerate(batch):
+            # İstemci bağlantıyı kapattıysa future iptal edilmiş olabilir
+            if future.done():
+                continue
+            error = errors.get(index)
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    async def drain(self) -> None:
+        """Yeni kayıt almayı durdurur, kuyruktaki ve yazılmakta olan batch'leri bitirir."""
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queue),
+            "in_flight": len(self._in_flight),
+            "batches": self.batches,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "largest_batch": self.largest_batch,
+        }